@@ -108,13 +108,11 @@ export default function Configuracoes() {
       const response = await configAPI.exportarDados(user.id);
       
       // Criar e baixar arquivo
-      const blob = new Blob([JSON.stringify(response.data, null, 2)], {
-        type: 'application/json'
-      });
+      const blob = response.data;
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
       a.href = url;
-      a.download = `chave-financeira-backup-${new Date().toISOString().split('T')[0]}.json`;
+      a.download = `chave-financeira-backup-${new Date().toISOString().split('T')[0]}.ndjson`;
       document.body.appendChild(a);
       a.click();
       window.URL.revokeObjectURL(url);
@@ -2,7 +2,7 @@
 import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../hooks/useAuth.jsx';
-import { transacaoAPI, metaAPI } from '../lib/api';
+import { homeAPI } from '../lib/api';
 import { Button } from '../components/ui/button';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '../components/ui/card';
 import { Progress } from '../components/ui/progress';
@@ -33,18 +33,12 @@ export default function Dashboard() {
       try {
         setLoading(true);
         
-        // Buscar dados do dashboard
-        const dashboardResponse = await transacaoAPI.getDashboard(user.id);
-        setDashboardData(dashboardResponse.data);
+        // Buscar dashboard e meta atual em uma única requisição
+        const homeResponse = await homeAPI.getHome(user.id);
+        setDashboardData(homeResponse.data.dashboard);
         
-        // Buscar meta atual
-        try {
-          const metaResponse = await metaAPI.getMetaAtual(user.id);
-          setMetaData(metaResponse.data);
-        } catch (metaError) {
-          // Se não há meta definida, não é um erro crítico
-          console.log('Nenhuma meta definida para o mês atual');
-        }
+        // Se não há meta definida, não é um erro crítico
+        setMetaData(homeResponse.data.meta_atual);
         
       } catch (error) {
         setError('Erro ao carregar dados do dashboard');
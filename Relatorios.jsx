@@ -34,7 +34,11 @@ export default function Relatorios() {
     const fetchTransacoes = async () => {
       try {
         setLoading(true);
-        const response = await transacaoAPI.listar(user.id);
+        const response = await transacaoAPI.listar(user.id, {
+          mes: filtroMes,
+          ano: filtroAno,
+          limit: 500
+        });
         setTransacoes(response.data.transacoes || []);
       } catch (error) {
         setError('Erro ao carregar transações');
@@ -47,7 +51,7 @@ export default function Relatorios() {
     if (user) {
       fetchTransacoes();
     }
-  }, [user]);
+  }, [user, filtroMes, filtroAno]);
 
   const formatCurrency = (value) => {
     return new Intl.NumberFormat('pt-BR', {
@@ -60,12 +64,8 @@ export default function Relatorios() {
     return new Date(dateString).toLocaleDateString('pt-BR');
   };
 
-  // Filtrar transações por mês/ano
-  const transacoesFiltradas = transacoes.filter(transacao => {
-    const dataTransacao = new Date(transacao.data);
-    return dataTransacao.getMonth() + 1 === filtroMes && 
-           dataTransacao.getFullYear() === filtroAno;
-  });
+  // Transações já chegam filtradas por mês/ano pelo servidor
+  const transacoesFiltradas = transacoes;
 
   // Dados para gráfico de pizza (despesas por categoria)
   const despesasPorCategoria = transacoesFiltradas
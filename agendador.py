@@ -0,0 +1,38 @@
+import threading
+import time
+
+# Tarefas periódicas em processo. No servidor de produção a thread roda no
+# master do gunicorn (uma vez por máquina, não por worker); em cron, use os
+# comandos flask equivalentes.
+
+_tarefas = []
+
+def registrar(nome, intervalo, funcao):
+    if intervalo > 0:
+        _tarefas.append({'nome': nome, 'intervalo': intervalo, 'funcao': funcao, 'proxima': time.monotonic() + intervalo})
+
+def tarefas():
+    return [tarefa['nome'] for tarefa in _tarefas]
+
+def _executar(app):
+    from src.models.user import db
+    while True:
+        tarefa = min(_tarefas, key=lambda item: item['proxima'])
+        time.sleep(max(0, tarefa['proxima'] - time.monotonic()))
+
+        with app.app_context():
+            inicio = time.perf_counter()
+            try:
+                resultado = tarefa['funcao']()
+                app.logger.info('tarefa %s: %s (%.2fs)', tarefa['nome'], resultado, time.perf_counter() - inicio)
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('tarefa %s falhou', tarefa['nome'])
+            finally:
+                db.session.remove()
+
+        tarefa['proxima'] = time.monotonic() + tarefa['intervalo']
+
+def iniciar(app):
+    if _tarefas:
+        threading.Thread(target=_executar, args=(app,), name='agendador', daemon=True).start()
@@ -0,0 +1,60 @@
+from datetime import datetime
+from sqlalchemy import event, insert, select, literal, inspect
+from sqlalchemy.orm import Session
+from src.models.user import Transacao, Meta, Missao, Configuracao, Recorrencia, Alteracao, db
+
+# Registro de alterações para sincronização incremental. Escritas feitas
+# pelo ORM são capturadas no flush; operações em massa (delete() de query,
+# insert em lote) chamam registrar_em_massa explicitamente.
+
+ENTIDADES = {
+    Transacao: 'transacao',
+    Meta: 'meta',
+    Missao: 'missao',
+    Configuracao: 'configuracao',
+    Recorrencia: 'recorrencia',
+}
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_flush(session, contexto):
+    agora = datetime.utcnow()
+    linhas = []
+
+    for operacao, objetos in (
+        ('upsert', session.new),
+        ('upsert', [obj for obj in session.dirty if session.is_modified(obj)]),
+        ('delete', session.deleted),
+    ):
+        for obj in objetos:
+            entidade = ENTIDADES.get(type(obj))
+            if entidade is None:
+                continue
+            linhas.append({
+                'id_usuario': obj.id_usuario,
+                'entidade': entidade,
+                'id_registro': obj.id,
+                'operacao': operacao,
+                'data_alteracao': agora
+            })
+
+    if linhas:
+        # bind_arguments leva o mapper para que o log vá para o mesmo shard
+        conexao = session.connection(bind_arguments={'mapper': inspect(Alteracao)})
+        conexao.execute(insert(Alteracao.__table__), linhas)
+
+def registrar_em_massa(modelo, operacao, *filtros):
+    # Deve ser chamado antes de um delete() em massa, ou depois de um insert em massa
+    origem = select(
+        modelo.id_usuario,
+        literal(ENTIDADES[modelo]),
+        modelo.id,
+        literal(operacao),
+        literal(datetime.utcnow())
+    ).where(*filtros)
+
+    db.session.execute(
+        insert(Alteracao).from_select(
+            ['id_usuario', 'entidade', 'id_registro', 'operacao', 'data_alteracao'],
+            origem
+        )
+    )
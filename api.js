@@ -30,11 +30,17 @@ export const authAPI = {
 // Transações API
 export const transacaoAPI = {
   getTransacoes: (userId) => api.get(`/transacoes/${userId}`),
+  listar: (userId, params) => api.get(`/transacoes/${userId}`, { params }),
   criarTransacao: (data) => api.post('/transacoes', data),
   atualizarTransacao: (transacaoId, data) => api.put(`/transacoes/${transacaoId}`, data),
   deletarTransacao: (transacaoId) => api.delete(`/transacoes/${transacaoId}`),
   getDashboard: (userId) => api.get(`/dashboard/${userId}`),
   getRelatorios: (userId) => api.get(`/relatorios/${userId}`),
+  importarTransacoes: (userId, arquivo) => {
+    const form = new FormData();
+    form.append('arquivo', arquivo);
+    return api.post(`/import/${userId}`, form, { headers: { 'Content-Type': 'multipart/form-data' } });
+  },
 };
 
 // Metas API
@@ -61,6 +67,23 @@ export const configAPI = {
   atualizarConfiguracoes: (userId, data) => api.put(`/configuracoes/${userId}`, data),
   resetDados: (userId) => api.post(`/configuracoes/${userId}/reset`),
   getCategorias: () => api.get('/categorias'),
+  exportarDados: (userId, formato = 'ndjson') =>
+    api.get(`/export/${userId}`, { params: { formato }, responseType: 'blob' }),
+};
+
+// Tela inicial (dashboard, meta atual, missões ativas e configurações)
+export const homeAPI = {
+  getHome: (userId) => api.get(`/home/${userId}`),
+};
+
+// Sincronização incremental
+export const syncAPI = {
+  sincronizar: (userId, since = 0) => api.get(`/sync/${userId}`, { params: { since } }),
+};
+
+// Tendências: séries de receitas, despesas e saldo por dia, semana, mês ou ano
+export const tendenciasAPI = {
+  getTendencias: (userId, params = {}) => api.get(`/tendencias/${userId}`, { params }),
 };
 
 // Health check
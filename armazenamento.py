@@ -0,0 +1,105 @@
+from flask import g
+from sqlalchemy import event, make_url
+from sqlalchemy.orm import scoped_session, sessionmaker
+from src.models.user import db
+from src.utils import shards
+import os
+
+# Perfil de armazenamento SQLite aplicado a cada conexão nova. As rotas
+# somente leitura usam um pool separado (bind 'leitura') com query_only,
+# para que relatórios não disputem conexões com as escritas; em modo WAL
+# leitores e o escritor não se bloqueiam.
+
+def perfil_sqlite():
+    return {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 268435456)),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        # Desligado por padrão, como antes do perfil: com ON, configurações e
+        # missões de id_usuario inexistente falham no commit em vez de serem criadas
+        'foreign_keys': os.environ.get('SQLITE_FOREIGN_KEYS', 'OFF'),
+    }
+
+def _em_memoria(uri):
+    url = make_url(uri)
+    return url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+
+def opcoes_engine(uri):
+    if not uri.startswith('sqlite'):
+        return {}
+    # Em memória o SQLAlchemy usa uma única conexão (StaticPool), sem pool_size
+    if _em_memoria(uri):
+        return {'connect_args': {'check_same_thread': False}}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_pre_ping': False,
+        'connect_args': {'check_same_thread': False},
+    }
+
+def binds(uri, diretorio_banco):
+    if not uri.startswith('sqlite'):
+        return {}
+    
+    # Com shards, cada arquivo tem seu próprio pool e as leituras usam a sessão principal
+    if shards.ativo():
+        return shards.binds(os.path.join(diretorio_banco, 'shards'), opcoes_engine(uri))
+    
+    # Pool somente leitura sobre o mesmo arquivo; um banco em memória não é
+    # compartilhado entre conexões, o pool de leitura abriria outro vazio
+    if os.environ.get('DB_LEITURA_SEPARADA', '1') != '1' or _em_memoria(uri):
+        return {}
+    return {
+        'leitura': {
+            'url': uri,
+            **opcoes_engine(uri),
+            'pool_size': int(os.environ.get('DB_LEITURA_POOL_SIZE', 10)),
+        }
+    }
+
+def registrar_pragmas(engine, perfil, somente_leitura=False):
+    @event.listens_for(engine, 'connect')
+    def aplicar(conexao, registro):
+        cursor = conexao.cursor()
+        if not somente_leitura:
+            cursor.execute(f"PRAGMA journal_mode={perfil['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous={perfil['synchronous']}")
+        cursor.execute(f"PRAGMA cache_size={perfil['cache_size']}")
+        cursor.execute(f"PRAGMA mmap_size={perfil['mmap_size']}")
+        cursor.execute(f"PRAGMA busy_timeout={perfil['busy_timeout']}")
+        cursor.execute(f"PRAGMA foreign_keys={perfil['foreign_keys']}")
+        if somente_leitura:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+
+_sessao_leitura = None
+
+def configurar(app):
+    global _sessao_leitura
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        return
+
+    perfil = perfil_sqlite()
+    with app.app_context():
+        registrar_pragmas(db.engine, perfil, somente_leitura=False)
+
+        # A tabela usuarios fica no diretório global, fora dos arquivos de shard
+        for indice in range(shards.total()):
+            registrar_pragmas(db.engines[f'shard_{indice}'], dict(perfil, foreign_keys='OFF'))
+        
+        if 'leitura' in db.engines:
+            registrar_pragmas(db.engines['leitura'], perfil, somente_leitura=True)
+            _sessao_leitura = scoped_session(
+                sessionmaker(bind=db.engines['leitura']),
+                scopefunc=lambda: id(g._get_current_object())
+            )
+
+    @app.teardown_appcontext
+    def encerrar_sessao_leitura(exc):
+        if _sessao_leitura is not None:
+            _sessao_leitura.remove()
+
+def sessao_leitura():
+    return _sessao_leitura() if _sessao_leitura is not None else db.session
@@ -0,0 +1,255 @@
+import os
+import sys
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import re
+import time
+from contextlib import asynccontextmanager
+from datetime import date
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import request_response
+from starlette.routing import Route, Mount
+from werkzeug.datastructures import MIMEAccept, MultiDict
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+from src.main import app as flask_app
+from src.models.user import Meta
+from src.routes.transacao import consulta_listagem, pagina_listagem, consultas_relatorio, montar_relatorio
+from src.routes.missao import consulta_missoes, consulta_missoes_ativas
+from src.utils import resumo, armazenamento, shards, progresso, previsao, serializacao, compressao, metricas, cache
+
+# Modo ASGI: as rotas de leitura mais acessadas rodam como handlers async
+# sobre aiosqlite, sem prender uma thread durante a espera do banco. As
+# demais rotas /api são entregues ao app Flask, então os contratos JSON
+# são os mesmos nos dois modos.
+#
+#     uvicorn src.asgi:app --workers 4
+
+def _url_async(url):
+    return url.replace('sqlite://', 'sqlite+aiosqlite://', 1)
+
+def _urls_leitura():
+    binds = flask_app.config.get('SQLALCHEMY_BINDS', {})
+    if shards.ativo():
+        return [binds[f'shard_{indice}']['url'] for indice in range(shards.total())]
+    if 'leitura' in binds:
+        return [binds['leitura']['url']]
+    return [flask_app.config['SQLALCHEMY_DATABASE_URI']]
+
+_engines = []
+for url in _urls_leitura():
+    engine = create_async_engine(
+        _url_async(url),
+        pool_size=int(os.environ.get('DB_LEITURA_POOL_SIZE', 10)),
+        max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    )
+    armazenamento.registrar_pragmas(engine.sync_engine, armazenamento.perfil_sqlite(), somente_leitura=True)
+    _engines.append(engine)
+
+_sessoes = [async_sessionmaker(engine, expire_on_commit=False) for engine in _engines]
+
+def _sessao(user_id):
+    indice = shards.shard_do_usuario(user_id) if shards.ativo() else 0
+    return _sessoes[indice]()
+
+async def _linhas(sessao, consulta):
+    # Equivalente async de serializacao.executar: Core na conexão da sessão
+    conexao = await sessao.connection()
+    return serializacao.linhas(await conexao.execute(consulta))
+
+_flask = WSGIMiddleware(flask_app)
+
+class _Leitura:
+    # Só o GET roda no handler async; PUT/DELETE/OPTIONS no mesmo caminho
+    # continuam no Flask em vez de virar 405
+    def __init__(self, handler, rota):
+        self.handler = request_response(handler)
+        self.rota = rota
+    
+    async def __call__(self, scope, receive, send):
+        if scope['method'] != 'GET':
+            await _flask(scope, receive, send)
+            return
+        
+        # Mesmas métricas de requisição que o Flask registra nas suas rotas
+        inicio = time.perf_counter()
+        status = [500]
+        async def enviar(mensagem):
+            if mensagem['type'] == 'http.response.start':
+                status[0] = mensagem['status']
+            await send(mensagem)
+        try:
+            await self.handler(scope, receive, enviar)
+        finally:
+            metricas.registrar_requisicao('GET', self.rota, status[0], time.perf_counter() - inicio)
+
+def _aceitos(request):
+    return parse_accept_header(request.headers.get('accept'), MIMEAccept)
+
+def _leitura(caminho, handler, nome_cache=None):
+    # nome_cache: o mesmo de cache.em_cache na rota Flask equivalente, para
+    # que os dois modos dividam as respostas guardadas, o ETag e o 304
+    async def endpoint(request):
+        etag = None
+        if nome_cache is None:
+            corpo, status, mimetype, vary = await handler(request)
+        else:
+            chave = cache.chave(
+                nome_cache,
+                request.path_params.get('user_id', 'global'),
+                serializacao.formato(_aceitos(request)),
+                request.url.query
+            )
+            guardado = cache.backend.get(chave)
+            if guardado is None:
+                corpo, status, mimetype, vary = await handler(request)
+                if status == 200:
+                    guardado = cache.item(corpo, status, mimetype, vary)
+                    cache.backend.set(chave, guardado)
+            if guardado is not None:
+                corpo, status, etag, mimetype, vary = guardado
+        return _responder(request, corpo, mimetype, status, vary, etag)
+    
+    # Rótulo da rota no formato do Flask: {user_id:int} -> <int:user_id>
+    return Route(caminho, _Leitura(endpoint, re.sub(r'\{(\w+):int\}', r'<int:\1>', caminho)))
+
+def _responder(request, corpo, mimetype, status=200, vary=None, etag=None):
+    headers = {'Access-Control-Allow-Origin': '*'}
+    variacoes = [vary] if vary else []
+    
+    # Como make_conditional do Flask: If-None-Match com comparação fraca
+    if etag is not None:
+        headers['ETag'] = quote_etag(etag)
+        if parse_etags(request.headers.get('if-none-match')).contains_weak(etag):
+            if variacoes:
+                headers['Vary'] = ', '.join(variacoes)
+            return Response(status_code=304, headers=headers)
+    
+    # Mesma compressão negociada que o Flask aplica em compressao.configurar
+    if flask_app.config.get('COMPRESSAO_ATIVA', True) and status == 200 and mimetype.startswith(compressao.TIPOS_COMPRIMIVEIS):
+        variacoes.append('Accept-Encoding')
+        codificacao = compressao.escolher(parse_accept_header(request.headers.get('accept-encoding')), len(corpo), mimetype)
+        if codificacao is not None:
+            corpo = compressao.comprimir(corpo, codificacao)
+            headers['Content-Encoding'] = codificacao
+            if etag is not None:
+                headers['ETag'] = quote_etag(etag, weak=True)
+    if variacoes:
+        headers['Vary'] = ', '.join(variacoes)
+    return Response(corpo, status_code=status, media_type=mimetype, headers=headers)
+
+# Os handlers devolvem (corpo, status, mimetype, vary); a resposta HTTP é
+# montada em _leitura
+
+def _json(request, dados, status=200):
+    return serializacao.dumps(dados), status, 'application/json', None
+
+def _lista(request, dados):
+    # Listagens negociam JSON ou MessagePack colunar pelo Accept, como serializacao.resposta
+    corpo, mimetype = serializacao.codificar(dados, serializacao.formato(_aceitos(request)))
+    return corpo, 200, mimetype, 'Accept'
+
+async def get_dashboard(request):
+    try:
+        user_id = request.path_params['user_id']
+        hoje = date.today()
+        
+        async with _sessao(user_id) as sessao:
+            resultado = await sessao.execute(resumo.consulta_totais_mes(user_id, hoje.year, hoje.month))
+            receitas, despesas = resultado.one()
+            previsao_mes = (await sessao.execute(previsao.consulta_previsao(user_id, hoje.year, hoje.month))).scalar()
+        
+        receitas, despesas = float(receitas or 0), float(despesas or 0)
+        return _json(request, {
+            'saldo_atual': receitas - despesas,
+            'total_receita': receitas,
+            'total_despesa': despesas,
+            'mes': hoje.month,
+            'ano': hoje.year,
+            'previsao': previsao_mes.to_dict() if previsao_mes else None
+        })
+    except Exception as e:
+        return _json(request, {'erro': str(e)}, 500)
+
+async def get_transacoes(request):
+    try:
+        user_id = request.path_params['user_id']
+        consulta, limite = consulta_listagem(user_id, MultiDict(request.query_params.multi_items()))
+        
+        async with _sessao(user_id) as sessao:
+            transacoes = await _linhas(sessao, consulta)
+        
+        return _lista(request, pagina_listagem(transacoes, limite))
+    except ValueError as e:
+        return _json(request, {'erro': str(e)}, 400)
+    except Exception as e:
+        return _json(request, {'erro': str(e)}, 500)
+
+async def get_relatorios(request):
+    try:
+        user_id = request.path_params['user_id']
+        consulta_categorias, consulta_mensal = consultas_relatorio(user_id)
+        
+        async with _sessao(user_id) as sessao:
+            categorias = (await sessao.execute(consulta_categorias)).all()
+            relatorio_mensal = (await sessao.execute(consulta_mensal)).all()
+        
+        return _json(request, montar_relatorio(categorias, relatorio_mensal))
+    except Exception as e:
+        return _json(request, {'erro': str(e)}, 500)
+
+async def get_metas(request):
+    try:
+        user_id = request.path_params['user_id']
+        consulta = progresso.consulta_progresso(Meta.id_usuario == user_id).order_by(Meta.ano.desc(), Meta.mes.desc())
+        
+        async with _sessao(user_id) as sessao:
+            metas = await _linhas(sessao, consulta)
+        
+        return _lista(request, [progresso.com_progresso(meta) for meta in metas])
+    except Exception as e:
+        return _json(request, {'erro': str(e)}, 500)
+
+async def get_missoes(request):
+    try:
+        user_id = request.path_params['user_id']
+        
+        async with _sessao(user_id) as sessao:
+            missoes = await _linhas(sessao, consulta_missoes(user_id))
+        
+        return _lista(request, missoes)
+    except Exception as e:
+        return _json(request, {'erro': str(e)}, 500)
+
+async def get_missoes_ativas(request):
+    try:
+        user_id = request.path_params['user_id']
+        
+        async with _sessao(user_id) as sessao:
+            missoes_ativas = await _linhas(sessao, consulta_missoes_ativas(user_id, date.today()))
+        
+        return _lista(request, missoes_ativas)
+    except Exception as e:
+        return _json(request, {'erro': str(e)}, 500)
+
+@asynccontextmanager
+async def _ciclo_de_vida(app):
+    yield
+    for engine in _engines:
+        await engine.dispose()
+
+app = Starlette(
+    routes=[
+        _leitura('/api/dashboard/{user_id:int}', get_dashboard, 'dashboard'),
+        _leitura('/api/transacoes/{user_id:int}', get_transacoes),
+        _leitura('/api/relatorios/{user_id:int}', get_relatorios, 'relatorios'),
+        _leitura('/api/metas/{user_id:int}', get_metas, 'metas'),
+        _leitura('/api/missoes/{user_id:int}', get_missoes, 'missoes'),
+        _leitura('/api/missoes/ativas/{user_id:int}', get_missoes_ativas),
+        Mount('/', app=_flask),
+    ],
+    lifespan=_ciclo_de_vida
+)
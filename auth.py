@@ -1,6 +1,7 @@
 from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
 from src.models.user import Usuario, Configuracao, db
+from src.utils import senhas, shards
 from datetime import datetime
 import jwt
 
@@ -26,7 +27,8 @@ def cadastro():
         db.session.add(usuario)
         db.session.commit()
         
-        # Criar configurações padrão
+        # Criar configurações padrão (no shard do novo usuário)
+        shards.selecionar(usuario.id)
         config = Configuracao(id_usuario=usuario.id)
         db.session.add(config)
         db.session.commit()
@@ -36,6 +38,9 @@ def cadastro():
             'usuario': usuario.to_dict()
         }), 201
         
+    except senhas.FilaSenhasCheia as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'erro': str(e)}), 500
@@ -49,6 +54,11 @@ def login():
         usuario = Usuario.query.filter_by(email=data['email']).first()
         
         if usuario and usuario.check_senha(data['senha']):
+            # Atualizar o hash quando o método ou o custo configurado mudou
+            if usuario.precisa_rehash():
+                usuario.set_senha(data['senha'])
+                db.session.commit()
+            
             # Gerar token JWT (simplificado)
             token = jwt.encode({
                 'user_id': usuario.id,
@@ -63,6 +73,9 @@ def login():
         else:
             return jsonify({'erro': 'Email ou senha inválidos'}), 401
             
+    except senhas.FilaSenhasCheia as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 503
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
@@ -96,6 +109,9 @@ def update_perfil(user_id):
             'usuario': usuario.to_dict()
         }), 200
         
+    except senhas.FilaSenhasCheia as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 503
     except Exception as e:
         db.session.rollback()
         return jsonify({'erro': str(e)}), 500
@@ -0,0 +1,114 @@
+import argparse
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+# WSGI (Flask com threads) vs ASGI (uvicorn + aiosqlite) nas mesmas rotas de leitura
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(RAIZ))
+
+ROTAS = ('/api/dashboard/{id}', '/api/transacoes/{id}', '/api/relatorios/{id}', '/api/metas/{id}', '/api/missoes/ativas/{id}')
+
+SERVIDORES = {
+    'wsgi': ['-c', "import sys; from src.main import app; app.run(port=int(sys.argv[1]), threaded=True)"],
+    'asgi': ['-m', 'uvicorn', 'src.asgi:app', '--log-level', 'warning', '--port'],
+}
+
+def popular(usuarios, transacoes):
+    from src.main import app, preparar_banco
+    preparar_banco()
+    cliente = app.test_client()
+    hoje = date.today()
+    ids = []
+    for indice in range(usuarios):
+        resposta = cliente.post('/api/auth/cadastro', json={
+            'nome': f'Bench {indice}', 'email': f'bench{indice}@exemplo.com', 'senha': 'senha-benchmark'
+        })
+        user_id = resposta.get_json()['usuario']['id']
+        linhas = (json.dumps({
+            'tipo': random.choice(('receita', 'despesa')),
+            'valor': round(random.uniform(5, 500), 2),
+            'categoria': random.choice(('Alimentação', 'Transporte', 'Lazer', 'Salário')),
+            'data_transacao': (hoje - timedelta(days=random.randrange(180))).isoformat()
+        }) for _ in range(transacoes))
+        arquivo = io.BytesIO('\n'.join(linhas).encode())
+        cliente.post(f'/api/import/{user_id}', data={'arquivo': (arquivo, 'bench.ndjson')})
+        cliente.post(f'/api/missoes/semanais/{user_id}')
+        ids.append(user_id)
+    return ids
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def aguardar(url, limite=30):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        try:
+            urllib.request.urlopen(url).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'servidor não respondeu em {url}')
+
+def executar(base, ids, total, concorrencia):
+    def requisitar(i):
+        rota = ROTAS[i % len(ROTAS)].format(id=ids[i % len(ids)])
+        inicio = time.perf_counter()
+        with urllib.request.urlopen(base + rota) as resposta:
+            resposta.read()
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        latencias = sorted(executor.map(requisitar, range(total)))
+    duracao = time.perf_counter() - inicio
+    return total / duracao, latencias[len(latencias) // 2], latencias[int(len(latencias) * 0.95)]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--usuarios', type=int, default=20)
+    parser.add_argument('--transacoes', type=int, default=2000)
+    parser.add_argument('--requisicoes', type=int, default=2000)
+    parser.add_argument('--concorrencia', type=int, nargs='+', default=[8, 32, 64])
+    args = parser.parse_args()
+
+    banco = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = f'sqlite:///{banco.name}'
+    # Sem cache de resposta: os dois modos precisam ir ao banco
+    os.environ['CACHE_TTL'] = '0'
+
+    ids = popular(args.usuarios, args.transacoes)
+    print(f'{args.usuarios} usuários x {args.transacoes} transações  {args.requisicoes} requisições por rodada')
+
+    for nome, comando in SERVIDORES.items():
+        porta = porta_livre()
+        processo = subprocess.Popen(
+            [sys.executable, *comando, str(porta)],
+            cwd=os.path.dirname(RAIZ), env=os.environ.copy(),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            base = f'http://127.0.0.1:{porta}'
+            aguardar(base + '/api/health')
+            for concorrencia in args.concorrencia:
+                vazao, p50, p95 = executar(base, ids, args.requisicoes, concorrencia)
+                print(f'{nome}  c={concorrencia:<3} {vazao:8.1f} req/s  p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms')
+        finally:
+            processo.terminate()
+            processo.wait()
+
+    os.unlink(banco.name)
+
+if __name__ == '__main__':
+    main()
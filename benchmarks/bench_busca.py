@@ -0,0 +1,113 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Busca textual numa conta grande: rota /api/transacoes/busca (FTS5, bm25)
+# contra o LIKE '%termo%' que seria a alternativa sem índice, mais o custo
+# que os triggers de sincronização somam a um insert em lote. A última
+# coluna é a mesma busca numa conta comum (1000 transações) do mesmo banco
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+TERMOS = ['supermercado', 'super', 'alimentacao', 'conta luz', 'farm', 'uber', 'presente roupas', 'xyzw']
+
+def tempos_ms(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return statistics.median(tempos), tempos[int(len(tempos) * 0.95)]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--transacoes', type=int, default=300000)
+    parser.add_argument('--outros', type=int, default=200, help='Outros usuários com 1000 transações cada')
+    parser.add_argument('--repeticoes', type=int, default=30)
+    args = parser.parse_args()
+
+    banco = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = f'sqlite:///{banco.name}'
+    os.environ['CACHE_TTL'] = '0'
+
+    from sqlalchemy import insert, select, text
+    from src.main import app, preparar_banco
+    from src.models.user import Usuario, Transacao, db
+    from src.utils import busca
+    from src.utils.armazenamento import sessao_leitura
+    from src.benchmarks.dados import DESCRICOES
+
+    preparar_banco()
+    aleatorio = random.Random(42)
+    hoje = date.today()
+    categorias = list(DESCRICOES)
+
+    def linhas(user_id, quantidade):
+        for _ in range(quantidade):
+            categoria = aleatorio.choice(categorias)
+            yield {
+                'id_usuario': user_id,
+                'tipo': 'receita' if categoria in ('Salário', 'Freelance', 'Investimentos') else 'despesa',
+                'valor': round(aleatorio.uniform(1, 500), 2),
+                'categoria': categoria,
+                'data_transacao': hoje - timedelta(days=aleatorio.randrange(3650)),
+                'descricao': aleatorio.choice(DESCRICOES[categoria]),
+            }
+
+    with app.app_context():
+        ids = db.session.execute(insert(Usuario).returning(Usuario.id), [
+            {'nome': f'Usuário {indice}', 'email': f'busca{indice}@exemplo.com', 'senha_hash': '-'}
+            for indice in range(args.outros + 1)
+        ]).scalars().all()
+        user_id = ids[0]
+
+        inicio = time.perf_counter()
+        db.session.execute(insert(Transacao.__table__), list(linhas(user_id, args.transacoes)))
+        for outro in ids[1:]:
+            db.session.execute(insert(Transacao.__table__), list(linhas(outro, 1000)))
+        db.session.commit()
+        com_indice = time.perf_counter() - inicio
+        total = args.transacoes + args.outros * 1000
+
+        # Mesmo insert sem os triggers, para isolar o custo do índice
+        with db.engine.begin() as conexao:
+            for acao in ('insert', 'delete', 'update'):
+                conexao.execute(text(f'DROP TRIGGER {busca.TABELA}_{acao}'))
+        ultimo_id = db.session.execute(select(db.func.max(Transacao.id))).scalar()
+        inicio = time.perf_counter()
+        db.session.execute(insert(Transacao.__table__), list(linhas(ids[1], total)))
+        db.session.commit()
+        sem_indice = time.perf_counter() - inicio
+        db.session.execute(Transacao.__table__.delete().where(Transacao.id_usuario == ids[1], Transacao.id > ultimo_id))
+        db.session.commit()
+        busca.garantir()
+
+        print(f'{total:,} transações ({args.transacoes:,} na conta grande)')
+        print(f'insert em lote: {total / com_indice:,.0f} linhas/s com índice, {total / sem_indice:,.0f} sem\n')
+
+        cliente = app.test_client()
+        print(f"{'termos':<18} {'achadas':>8} {'FTS p50':>9} {'p95':>9} {'pág. 5':>9} {'LIKE p50':>10} {'conta de 1000':>14}")
+        for termos in TERMOS:
+            achadas = sessao_leitura().execute(
+                select(db.func.count()).select_from(busca.indice).where(busca.correspondencia(termos, user_id))
+            ).scalar()
+            p50, p95 = tempos_ms(lambda: cliente.get(f'/api/transacoes/busca/{user_id}', query_string={'q': termos}), args.repeticoes)
+            pagina, _ = tempos_ms(lambda: cliente.get(f'/api/transacoes/busca/{user_id}', query_string={'q': termos, 'pagina': 5}), args.repeticoes)
+
+            filtros = [Transacao.descricao.like(f'%{palavra}%') for palavra in termos.split()]
+            like, _ = tempos_ms(lambda: sessao_leitura().execute(
+                select(Transacao.id).where(Transacao.id_usuario == user_id, *filtros)
+                .order_by(Transacao.data_transacao.desc()).limit(51)
+            ).all(), max(3, args.repeticoes // 5))
+            pequena, _ = tempos_ms(lambda: cliente.get(f'/api/transacoes/busca/{ids[2]}', query_string={'q': termos}), args.repeticoes)
+            print(f'{termos:<18} {achadas:>8,} {p50:>7.1f}ms {p95:>7.1f}ms {pagina:>7.1f}ms {like:>8.1f}ms {pequena:>12.1f}ms')
+
+    os.unlink(banco.name)
+
+if __name__ == '__main__':
+    main()
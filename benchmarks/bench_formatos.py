@@ -0,0 +1,109 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Bytes no fio e custo de codificação por rota: JSON e MessagePack colunar,
+# sem compressão, gzip e brotli. A codificação é medida sobre os mesmos
+# dados que a rota devolve (sem o tempo da consulta)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+CATEGORIAS = ['Alimentação', 'Transporte', 'Moradia', 'Saúde', 'Lazer', 'Contas']
+
+def mediana_ms(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--transacoes', type=int, default=20000)
+    parser.add_argument('--missoes', type=int, default=500)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    args = parser.parse_args()
+
+    banco = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = f'sqlite:///{banco.name}'
+
+    from sqlalchemy import insert
+    from werkzeug.datastructures import MultiDict
+    from src.main import app, preparar_banco
+    from src.models.user import Usuario, Transacao, Missao, Meta, db
+    from src.routes.transacao import consulta_listagem, pagina_listagem, LIMITE_MAXIMO
+    from src.routes.missao import consulta_missoes
+    from src.utils import serializacao, compressao, progresso, resumo
+    from src.utils.armazenamento import sessao_leitura
+
+    preparar_banco()
+    aleatorio = random.Random(42)
+    hoje = date.today()
+
+    with app.app_context():
+        user_id = db.session.execute(
+            insert(Usuario).values(nome='Conta grande', email='grande@exemplo.com', senha_hash='-').returning(Usuario.id)
+        ).scalar()
+        db.session.execute(insert(Transacao.__table__), [
+            {
+                'id_usuario': user_id,
+                'tipo': aleatorio.choice(['receita', 'despesa']),
+                'valor': round(aleatorio.uniform(1, 500), 2),
+                'categoria': aleatorio.choice(CATEGORIAS),
+                'data_transacao': hoje - timedelta(days=aleatorio.randrange(730)),
+                'descricao': f'Lançamento {indice}',
+            }
+            for indice in range(args.transacoes)
+        ])
+        db.session.execute(insert(Missao.__table__), [
+            {
+                'id_usuario': user_id,
+                'descricao': 'Economizar pelo menos R$ 50 esta semana',
+                'tipo': 'semanal',
+                'status': aleatorio.choice(['concluida', 'expirada']),
+                'data_inicio': hoje - timedelta(days=7 * indice),
+                'data_fim': hoje - timedelta(days=7 * indice - 6),
+                'recompensa': 'Medalha de Economia',
+            }
+            for indice in range(args.missoes)
+        ])
+        db.session.execute(insert(Meta.__table__), [
+            {'id_usuario': user_id, 'valor_meta': 500, 'mes': mes, 'ano': ano}
+            for ano in range(hoje.year - 1, hoje.year + 1) for mes in range(1, 13)
+        ])
+        db.session.commit()
+        resumo.reconstruir(user_id)
+
+        consulta, limite = consulta_listagem(user_id, MultiDict({'limit': LIMITE_MAXIMO}))
+        rotas = {
+            f'transacoes (página de {LIMITE_MAXIMO})': pagina_listagem(
+                serializacao.executar(sessao_leitura(), Transacao, consulta), limite
+            ),
+            f'missoes ({args.missoes})': serializacao.executar(sessao_leitura(), Missao, consulta_missoes(user_id)),
+            'metas (24)': [
+                progresso.com_progresso(meta) for meta in
+                serializacao.executar(sessao_leitura(), Meta, progresso.consulta_progresso(Meta.id_usuario == user_id))
+            ],
+        }
+
+        print(f"{'rota':<28} {'formato':<16} {'bytes':>9} {'codificar':>10}")
+        for rota, dados in rotas.items():
+            for formato in serializacao.formatos():
+                nome_formato = 'json' if formato == 'application/json' else 'msgpack'
+                corpo, _ = serializacao.codificar(dados, nome_formato)
+                custo = mediana_ms(lambda: serializacao.codificar(dados, nome_formato), args.repeticoes)
+                print(f'{rota:<28} {nome_formato:<16} {len(corpo):>9,} {custo:>8.2f}ms')
+
+                for codificacao in compressao.codificacoes():
+                    comprimido = compressao.comprimir(corpo, codificacao)
+                    custo_total = custo + mediana_ms(lambda: compressao.comprimir(corpo, codificacao), args.repeticoes)
+                    print(f"{'':<28} {nome_formato + '+' + codificacao:<16} {len(comprimido):>9,} {custo_total:>8.2f}ms")
+            print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Vazão de login por núcleo: hash na thread da requisição vs pool de processos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+def executar(cliente_app, email, senha, total, threads):
+    def login(_):
+        resposta = cliente_app().post('/api/auth/login', json={'email': email, 'senha': senha})
+        assert resposta.status_code == 200, resposta.get_json()
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(login, range(total)))
+    return total / (time.perf_counter() - inicio)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--metodo', default=None)
+    args = parser.parse_args()
+
+    banco = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = f'sqlite:///{banco.name}'
+
+    from src.main import app, preparar_banco
+    preparar_banco()
+    from src.utils import senhas
+
+    if args.metodo:
+        senhas.configurar(metodo=args.metodo)
+
+    email, senha = 'bench@exemplo.com', 'senha-benchmark'
+    app.test_client().post('/api/auth/cadastro', json={'nome': 'Bench', 'email': email, 'senha': senha})
+
+    nucleos = os.cpu_count() or 1
+    print(f"método: {senhas.metricas()['metodo']}  núcleos: {nucleos}  threads: {args.threads}")
+
+    for nome, workers in (('inline', 0), ('pool', nucleos)):
+        senhas.configurar(workers=workers, max_fila=args.threads * 2)
+        vazao = executar(app.test_client, email, senha, args.logins, args.threads)
+        print(f'{nome:>6}: {vazao:8.1f} logins/s  {vazao / nucleos:8.1f} logins/s por núcleo')
+
+    os.unlink(banco.name)
+
+if __name__ == '__main__':
+    main()
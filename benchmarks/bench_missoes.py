@@ -0,0 +1,69 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Geração semanal de missões e varredura de expiração para a frota inteira
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+def cronometrar(nome, funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    print(f'{nome:<32} {time.perf_counter() - inicio:8.2f} s  {resultado}')
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--usuarios', type=int, default=100000)
+    parser.add_argument('--lote', type=int, default=10000)
+    args = parser.parse_args()
+
+    banco = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = f'sqlite:///{banco.name}'
+
+    from sqlalchemy import insert
+    from src.main import app, preparar_banco
+    from src.models.user import Usuario, ResumoDiario, db
+    from src.utils import regras_missoes
+
+    preparar_banco()
+    hoje = date.today()
+    semana_passada = hoje - timedelta(days=7)
+    inicio_passada, _ = regras_missoes.semana(semana_passada)
+
+    with app.app_context():
+        for inicio in range(0, args.usuarios, args.lote):
+            db.session.execute(insert(Usuario), [
+                {'nome': f'Usuário {indice}', 'email': f'u{indice}@exemplo.com', 'senha_hash': '-'}
+                for indice in range(inicio, min(inicio + args.lote, args.usuarios))
+            ])
+        db.session.commit()
+        print(f'{args.usuarios} usuários')
+
+        cronometrar('geração da semana passada', lambda: regras_missoes.gerar_semanais(semana_passada))
+
+        # Metade dos usuários teve gastos com alimentação na semana passada
+        db.session.execute(insert(ResumoDiario), [
+            {
+                'id_usuario': id_usuario,
+                'data': inicio_passada + timedelta(days=random.randrange(7)),
+                'tipo': 'despesa',
+                'categoria': 'Alimentação',
+                'total': random.choice((50, 400)),
+                'quantidade': 1
+            }
+            for id_usuario in range(1, args.usuarios + 1, 2)
+        ])
+        db.session.commit()
+
+        cronometrar('varredura de expiração', regras_missoes.encerrar_vencidas)
+        cronometrar('geração da semana atual', regras_missoes.gerar_semanais)
+        cronometrar('geração repetida (idempotente)', regras_missoes.gerar_semanais)
+
+    os.unlink(banco.name)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,382 @@
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from datetime import date, datetime, timedelta
+
+# Carga em todas as rotas da API sobre um banco gerado por benchmarks/dados.py
+# (mesma semente, mesmos dados). Cada rota recebe N requisições com a
+# concorrência pedida, pelo test client do Flask (sem rede, mede só o app)
+# ou por um servidor local (gunicorn via src.servidor). O resultado vai para
+# um JSON com p50/p95/p99 e req/s por rota, e --comparar aponta regressões
+# entre dois desses arquivos:
+#
+#     python -m src.benchmarks.bench_rotas --saida antes.json
+#     python -m src.benchmarks.bench_rotas --modo servidor --concorrencia 16 --saida depois.json
+#     python -m src.benchmarks.bench_rotas --comparar antes.json depois.json
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(RAIZ))
+
+# Métricas comparadas e o sentido de "pior"
+COMPARADAS = {'p50_ms': 1, 'p95_ms': 1, 'p99_ms': 1, 'req_s': -1}
+
+class Cenario:
+    # Uma rota: monta (caminho, corpo) para a i-ésima requisição; coletar
+    # recebe o JSON das respostas quando um cenário seguinte precisa delas
+    def __init__(self, metodo, rota, montar, coletar=None):
+        self.metodo = metodo
+        self.rota = rota
+        self.montar = montar
+        self.coletar = coletar
+
+    @property
+    def nome(self):
+        return f'{self.metodo} {self.rota}'
+
+def cenarios(estado):
+    usuarios = estado['usuarios']
+    emails = estado['emails']
+    metas = estado['metas']
+    missoes = estado['missoes']
+    criadas = estado['transacoes_criadas']
+    recorrencias = estado['recorrencias_criadas']
+    hoje = date.today()
+    marca = estado['marca']
+
+    def usuario(i):
+        return usuarios[i % len(usuarios)]
+
+    def nova_transacao(i):
+        return '/api/transacoes', {
+            'id_usuario': usuario(i),
+            'tipo': 'despesa',
+            'valor': 10 + i % 90,
+            'categoria': 'Alimentação',
+            'data_transacao': (hoje - timedelta(days=i % 28)).isoformat(),
+            'descricao': 'Supermercado',
+        }
+
+    def nova_recorrencia(i):
+        # Regras antigas, para que listagem, dashboard, relatórios e metas
+        # medidos em seguida expandam ocorrências de todo o período gerado
+        return '/api/recorrencias', {
+            'id_usuario': usuario(i),
+            'tipo': 'despesa',
+            'valor': 20 + i % 80,
+            'categoria': 'Contas',
+            'descricao': 'Assinatura streaming',
+            'frequencia': ('mensal', 'semanal', 'anual')[i % 3],
+            'data_inicio': (hoje - timedelta(days=365 + i % 365)).isoformat(),
+        }
+
+    def nova_meta(i):
+        # (usuário, mês, ano) únicos e fora do período dos dados gerados
+        volta = i // len(usuarios)
+        return '/api/metas', {
+            'id_usuario': usuario(i), 'valor_meta': 500,
+            'mes': volta % 12 + 1, 'ano': 2100 + volta // 12,
+        }
+
+    def nova_missao(i):
+        inicio, fim = hoje - timedelta(days=hoje.weekday()), hoje + timedelta(days=6 - hoje.weekday())
+        return '/api/missoes', {
+            'id_usuario': usuario(i), 'descricao': 'Não gastar com delivery', 'tipo': 'semanal',
+            'data_inicio': inicio.isoformat(), 'data_fim': fim.isoformat(),
+        }
+
+    ultimo_mes = (hoje.replace(day=1) - timedelta(days=1)).replace(day=1)
+    return [
+        Cenario('POST', '/api/auth/cadastro', lambda i: ('/api/auth/cadastro', {
+            'nome': f'Carga {i}', 'email': f'carga{marca}-{i}@bench.exemplo', 'senha': 'senha-benchmark'
+        })),
+        Cenario('POST', '/api/auth/login', lambda i: ('/api/auth/login', {
+            'email': emails[i % len(emails)], 'senha': estado['senha']
+        })),
+        Cenario('GET', '/api/auth/perfil/<user_id>', lambda i: (f'/api/auth/perfil/{usuario(i)}', None)),
+        Cenario('PUT', '/api/auth/perfil/<user_id>', lambda i: (f'/api/auth/perfil/{usuario(i)}', {'nome': f'Usuário {usuario(i)}'})),
+        Cenario('GET', '/api/configuracoes/<user_id>', lambda i: (f'/api/configuracoes/{usuario(i)}', None)),
+        Cenario('PUT', '/api/configuracoes/<user_id>', lambda i: (f'/api/configuracoes/{usuario(i)}', {'modo_escuro': i % 2 == 0})),
+        Cenario('GET', '/api/categorias', lambda i: ('/api/categorias', None)),
+        Cenario('GET', '/api/transacoes/<user_id>', lambda i: (f'/api/transacoes/{usuario(i)}', None)),
+        Cenario('GET', '/api/transacoes/<user_id>?categoria&data_inicio', lambda i: (
+            f'/api/transacoes/{usuario(i)}?categoria=Alimentação&data_inicio={ultimo_mes.isoformat()}', None
+        )),
+        Cenario('GET', '/api/transacoes/busca/<user_id>?q', lambda i: (
+            f"/api/transacoes/busca/{usuario(i)}?q={('mercado', 'conta luz', 'uber', 'farm')[i % 4]}", None
+        )),
+        Cenario('POST', '/api/transacoes', nova_transacao,
+                coletar=lambda dados: criadas.append(dados['transacao']['id'])),
+        Cenario('PUT', '/api/transacoes/<transacao_id>', lambda i: (
+            f'/api/transacoes/{criadas[i % len(criadas)]}', {'valor': 20 + i % 50}
+        )),
+        Cenario('POST', '/api/recorrencias', nova_recorrencia,
+                coletar=lambda dados: recorrencias.append(dados['recorrencia']['id'])),
+        Cenario('GET', '/api/recorrencias/<user_id>', lambda i: (f'/api/recorrencias/{usuario(i)}', None)),
+        Cenario('PUT', '/api/recorrencias/<recorrencia_id>', lambda i: (
+            f'/api/recorrencias/{recorrencias[i % len(recorrencias)]}', {'valor': 25 + i % 75}
+        )),
+        Cenario('GET', '/api/dashboard/<user_id>', lambda i: (f'/api/dashboard/{usuario(i)}', None)),
+        Cenario('GET', '/api/relatorios/<user_id>', lambda i: (f'/api/relatorios/{usuario(i)}', None)),
+        Cenario('GET', '/api/home/<user_id>', lambda i: (f'/api/home/{usuario(i)}', None)),
+        Cenario('GET', '/api/tendencias/<user_id>', lambda i: (f'/api/tendencias/{usuario(i)}', None)),
+        Cenario('GET', '/api/metas/<user_id>', lambda i: (f'/api/metas/{usuario(i)}', None)),
+        Cenario('GET', '/api/metas/atual/<user_id>', lambda i: (f'/api/metas/atual/{usuario(i)}', None)),
+        Cenario('GET', '/api/metas/<meta_id>/progresso', lambda i: (f'/api/metas/{metas[i % len(metas)]}/progresso', None)),
+        Cenario('POST', '/api/metas', nova_meta),
+        Cenario('PUT', '/api/metas/<meta_id>', lambda i: (f'/api/metas/{metas[i % len(metas)]}', {'valor_meta': 300 + i % 700})),
+        Cenario('GET', '/api/missoes/<user_id>', lambda i: (f'/api/missoes/{usuario(i)}', None)),
+        Cenario('GET', '/api/missoes/ativas/<user_id>', lambda i: (f'/api/missoes/ativas/{usuario(i)}', None)),
+        Cenario('POST', '/api/missoes', nova_missao),
+        Cenario('PUT', '/api/missoes/<missao_id>/concluir', lambda i: (f'/api/missoes/{missoes[i % len(missoes)]}/concluir', None)),
+        Cenario('POST', '/api/missoes/semanais/<user_id>', lambda i: (f'/api/missoes/semanais/{usuario(i)}', None)),
+        Cenario('GET', '/api/sync/<user_id>', lambda i: (f'/api/sync/{usuario(i)}', None)),
+        Cenario('GET', '/api/export/<user_id>', lambda i: (f'/api/export/{usuario(i)}', None)),
+        # Destrutivas por último: cada requisição apaga algo que as anteriores usaram
+        Cenario('DELETE', '/api/transacoes/<transacao_id>', lambda i: (f'/api/transacoes/{criadas[i % len(criadas)]}', None)),
+        Cenario('DELETE', '/api/recorrencias/<recorrencia_id>', lambda i: (f'/api/recorrencias/{recorrencias[i % len(recorrencias)]}', None)),
+        Cenario('POST', '/api/configuracoes/<user_id>/reset', lambda i: (f'/api/configuracoes/{usuario(i)}/reset', None)),
+    ]
+
+def preparar(args):
+    from sqlalchemy import select
+    from src.main import app, preparar_banco
+    from src.models.user import Usuario, Meta, Missao, db
+    from src.utils import shards
+    from src.benchmarks import dados
+
+    preparar_banco()
+    with app.app_context():
+        inicio = time.perf_counter()
+        ids = dados.gerar(args.usuarios, args.meses, args.semente)
+        print(f'{len(ids)} usuários x {args.meses} meses gerados em {time.perf_counter() - inicio:.1f}s')
+
+        emails = db.session.execute(select(Usuario.email).where(Usuario.id.in_(ids)).order_by(Usuario.id)).scalars().all()
+        metas, missoes = [], []
+        for indice in range(shards.total()) if shards.ativo() else (None,):
+            with shards.usar_shard(indice) if indice is not None else nullcontext():
+                metas += db.session.execute(select(Meta.id).where(Meta.id_usuario.in_(ids)).order_by(Meta.id)).scalars().all()
+                missoes += db.session.execute(
+                    select(Missao.id).where(Missao.id_usuario.in_(ids), Missao.status == 'pendente').order_by(Missao.id)
+                ).scalars().all()
+        db.session.remove()
+
+    return {
+        'usuarios': ids, 'emails': emails, 'metas': metas, 'missoes': missoes,
+        'senha': dados.SENHA, 'transacoes_criadas': [], 'recorrencias_criadas': [], 'marca': os.getpid(),
+    }
+
+def cliente_flask():
+    # Um test client por thread
+    from src.main import app
+    local = threading.local()
+
+    def requisitar(metodo, caminho, corpo):
+        if not hasattr(local, 'cliente'):
+            local.cliente = app.test_client()
+        resposta = local.cliente.open(caminho, method=metodo, json=corpo)
+        return resposta.status_code, resposta.get_data()
+
+    return requisitar
+
+def cliente_http(base):
+    def requisitar(metodo, caminho, corpo):
+        dados = json.dumps(corpo).encode() if corpo is not None else None
+        pedido = urllib.request.Request(
+            base + urllib.parse.quote(caminho, safe='/?=&'), data=dados, method=metodo,
+            headers={'Content-Type': 'application/json'} if dados is not None else {}
+        )
+        try:
+            with urllib.request.urlopen(pedido) as resposta:
+                return resposta.status, resposta.read()
+        except urllib.error.HTTPError as erro:
+            return erro.code, erro.read()
+
+    return requisitar
+
+def percentil(ordenadas, fracao):
+    # Nearest-rank
+    return ordenadas[min(len(ordenadas) - 1, max(0, int(round(fracao * len(ordenadas) + 0.5)) - 1))]
+
+def executar(cenario, requisitar, total, concorrencia, aquecimento):
+    def uma(i):
+        caminho, corpo = cenario.montar(i)
+        inicio = time.perf_counter()
+        status, conteudo = requisitar(cenario.metodo, caminho, corpo)
+        duracao = time.perf_counter() - inicio
+        if cenario.coletar is not None and status < 400:
+            cenario.coletar(json.loads(conteudo))
+        return status, duracao
+
+    # Aquecimento só nas leituras: escrita repetida mudaria o estado medido
+    if cenario.metodo == 'GET':
+        for i in range(aquecimento):
+            uma(i)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(uma, range(total)))
+    duracao = time.perf_counter() - inicio
+
+    latencias = sorted(tempo * 1000 for _, tempo in resultados)
+    status = {}
+    for codigo, _ in resultados:
+        status[str(codigo)] = status.get(str(codigo), 0) + 1
+    return {
+        'requisicoes': total,
+        'erros': sum(quantidade for codigo, quantidade in status.items() if int(codigo) >= 400),
+        'status': status,
+        'req_s': round(total / duracao, 1),
+        'media_ms': round(sum(latencias) / len(latencias), 3),
+        'p50_ms': round(percentil(latencias, 0.50), 3),
+        'p95_ms': round(percentil(latencias, 0.95), 3),
+        'p99_ms': round(percentil(latencias, 0.99), 3),
+        'max_ms': round(latencias[-1], 3),
+    }
+
+def versao():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def aguardar(url, limite=30):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        try:
+            urllib.request.urlopen(url).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'servidor não respondeu em {url}')
+
+def imprimir(rotas):
+    print(f"{'rota':<56} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'erros':>6}")
+    for nome, item in rotas.items():
+        print(f"{nome:<56} {item['req_s']:>9.1f} {item['p50_ms']:>7.2f}ms {item['p95_ms']:>7.2f}ms {item['p99_ms']:>7.2f}ms {item['erros']:>6}")
+
+def comparar(caminho_antes, caminho_depois, tolerancia):
+    # Diferença relativa por rota; "pior" além da tolerância é regressão
+    with open(caminho_antes) as arquivo:
+        antes = json.load(arquivo)
+    with open(caminho_depois) as arquivo:
+        depois = json.load(arquivo)
+    print(f"{antes.get('versao')} ({antes['data']}) -> {depois.get('versao')} ({depois['data']})")
+    print(f"{'rota':<56} " + ' '.join(f'{metrica:>10}' for metrica in COMPARADAS))
+
+    regressoes = []
+    for nome, novo in depois['rotas'].items():
+        velho = antes['rotas'].get(nome)
+        if velho is None:
+            print(f'{nome:<56} {"(nova)":>10}')
+            continue
+        colunas = []
+        for metrica, sentido in COMPARADAS.items():
+            variacao = (novo[metrica] - velho[metrica]) / velho[metrica] if velho[metrica] else 0.0
+            piorou = variacao * sentido > tolerancia
+            if piorou:
+                regressoes.append((nome, metrica, variacao))
+            colunas.append(f"{variacao:>+9.1%}{'!' if piorou else ' '}")
+        if novo['erros'] > velho['erros']:
+            regressoes.append((nome, 'erros', novo['erros'] - velho['erros']))
+        print(f'{nome:<56} ' + ' '.join(colunas))
+
+    for nome in antes['rotas'].keys() - depois['rotas'].keys():
+        print(f'{nome:<56} {"(removida)":>10}')
+
+    print(f'\n{len(regressoes)} regressões acima de {tolerancia:.0%}' if regressoes else '\nSem regressões')
+    return 1 if regressoes else 0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modo', choices=('cliente', 'servidor'), default='cliente')
+    parser.add_argument('--usuarios', type=int, default=200)
+    parser.add_argument('--meses', type=int, default=12)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--requisicoes', type=int, default=200, help='Requisições por rota')
+    parser.add_argument('--concorrencia', type=int, default=1)
+    parser.add_argument('--aquecimento', type=int, default=5, help='Requisições descartadas por rota de leitura')
+    parser.add_argument('--workers', type=int, default=4, help='Workers do gunicorn no modo servidor')
+    parser.add_argument('--rotas', help='Só as rotas que contêm este texto')
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    parser.add_argument('--comparar', nargs=2, metavar=('ANTES', 'DEPOIS'), help='Compara dois resultados e sai')
+    parser.add_argument('--tolerancia', type=float, default=0.10, help='Piora relativa aceita no --comparar')
+    args = parser.parse_args()
+
+    if args.comparar:
+        sys.exit(comparar(*args.comparar, args.tolerancia))
+
+    diretorio = tempfile.mkdtemp(prefix='bench_rotas_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(diretorio, 'app.db')}"
+    os.environ.setdefault('SHARD_DIR', os.path.join(diretorio, 'shards'))
+    # Sem cache de resposta por padrão: cada requisição precisa ir ao banco
+    os.environ.setdefault('CACHE_TTL', '0')
+    # Tarefas periódicas do master do gunicorn concorreriam com a carga
+    for tarefa in ('PROGRESSO_INTERVALO', 'MISSOES_INTERVALO', 'PREVISAO_INTERVALO'):
+        os.environ.setdefault(tarefa, '0')
+
+    estado = preparar(args)
+    lista = [cenario for cenario in cenarios(estado) if not args.rotas or args.rotas in cenario.nome]
+
+    processo = None
+    if args.modo == 'servidor':
+        porta = porta_livre()
+        processo = subprocess.Popen(
+            [sys.executable, '-m', 'src.servidor'], cwd=os.path.dirname(RAIZ),
+            env={**os.environ, 'SERVIDOR_BIND': f'127.0.0.1:{porta}', 'SERVIDOR_WORKERS': str(args.workers)},
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        base = f'http://127.0.0.1:{porta}'
+        requisitar = cliente_http(base)
+    else:
+        requisitar = cliente_flask()
+
+    try:
+        if processo is not None:
+            aguardar(base + '/api/health')
+        rotas = {}
+        for cenario in lista:
+            rotas[cenario.nome] = executar(cenario, requisitar, args.requisicoes, args.concorrencia, args.aquecimento)
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait()
+
+    resultado = {
+        'versao': versao(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'parametros': {chave: valor for chave, valor in vars(args).items() if chave not in ('saida', 'comparar', 'tolerancia')},
+        'ambiente': {
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'shards': int(os.environ.get('SHARDS', 0)),
+            'cache_ttl': int(os.environ['CACHE_TTL']),
+        },
+        'rotas': rotas,
+    }
+    imprimir(rotas)
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+        print(f'\nResultados em {args.saida}')
+
+if __name__ == '__main__':
+    main()
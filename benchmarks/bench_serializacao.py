@@ -0,0 +1,100 @@
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+# Listagem de uma conta grande: objetos do ORM + to_dict() + jsonify contra
+# colunas selecionadas direto + serializacao.dumps. Mede linhas/s (melhor de
+# N execuções) e pico de memória (tracemalloc, execução separada)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+CATEGORIAS = ['Alimentação', 'Transporte', 'Moradia', 'Saúde', 'Lazer', 'Contas']
+
+def medir(nome, funcao, linhas, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        corpo = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+
+    gc.collect()
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'{nome:<28} {linhas / melhor:>12,.0f} linhas/s {melhor * 1000:>9.1f} ms {pico / 2 ** 20:>9.1f} MiB  {len(corpo) / 2 ** 20:.1f} MiB de JSON')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--linhas', type=int, default=100000)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    banco = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    os.environ['DATABASE_URL'] = f'sqlite:///{banco.name}'
+
+    from sqlalchemy import insert, select
+    from src.main import app, preparar_banco
+    from src.models.user import Usuario, Transacao, Missao, db
+    from src.utils import serializacao
+    from src.utils.armazenamento import sessao_leitura
+
+    preparar_banco()
+    aleatorio = random.Random(42)
+    hoje = date.today()
+
+    with app.app_context():
+        user_id = db.session.execute(
+            insert(Usuario).values(nome='Conta grande', email='grande@exemplo.com', senha_hash='-').returning(Usuario.id)
+        ).scalar()
+        db.session.execute(insert(Transacao.__table__), [
+            {
+                'id_usuario': user_id,
+                'tipo': aleatorio.choice(['receita', 'despesa']),
+                'valor': round(aleatorio.uniform(1, 500), 2),
+                'categoria': aleatorio.choice(CATEGORIAS),
+                'data_transacao': hoje - timedelta(days=aleatorio.randrange(3650)),
+                'descricao': f'Lançamento {indice}',
+            }
+            for indice in range(args.linhas)
+        ])
+        db.session.execute(insert(Missao.__table__), [
+            {
+                'id_usuario': user_id,
+                'descricao': f'Missão {indice}',
+                'tipo': 'semanal',
+                'status': 'concluida',
+                'data_inicio': hoje - timedelta(days=7 * indice),
+                'data_fim': hoje - timedelta(days=7 * indice - 6),
+                'recompensa': 'Medalha',
+            }
+            for indice in range(args.linhas)
+        ])
+        db.session.commit()
+        print(f'{args.linhas} transações e {args.linhas} missões em uma conta\n')
+
+        for modelo in (Transacao, Missao):
+            print(modelo.__tablename__)
+
+            def orm():
+                objetos = sessao_leitura().execute(select(modelo).where(modelo.id_usuario == user_id)).scalars().all()
+                corpo = app.json.dumps([objeto.to_dict() for objeto in objetos]).encode()
+                sessao_leitura().expunge_all()
+                return corpo
+
+            def colunas():
+                consulta = select(*serializacao.colunas(modelo)).where(modelo.id_usuario == user_id)
+                return serializacao.dumps(serializacao.executar(sessao_leitura(), modelo, consulta))
+
+            medir('  ORM + to_dict + jsonify', orm, args.linhas, args.repeticoes)
+            medir('  colunas + dumps', colunas, args.linhas, args.repeticoes)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Snapshot colunar: geração a partir do banco e consultas agrupadas sobre os
+# mmaps, comparadas com o GROUP BY equivalente no SQLite
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+CATEGORIAS = ['Alimentação', 'Transporte', 'Moradia', 'Saúde', 'Educação', 'Lazer', 'Compras', 'Contas', 'Outros']
+
+def cronometrar(nome, funcao):
+    inicio = time.perf_counter()
+    resultado = funcao()
+    print(f'{nome:<40} {time.perf_counter() - inicio:8.2f} s')
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--transacoes', type=int, default=2000000)
+    parser.add_argument('--usuarios', type=int, default=20000)
+    parser.add_argument('--lote', type=int, default=50000)
+    args = parser.parse_args()
+
+    pasta = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(pasta, 'bench.db')}"
+    os.environ['SNAPSHOT_DIR'] = os.path.join(pasta, 'snapshot')
+
+    from sqlalchemy import insert, select, func, cast, Float
+    from src.main import app, preparar_banco
+    from src.models.user import Usuario, Transacao, db
+    from src.utils import snapshot
+
+    preparar_banco()
+    aleatorio = random.Random(42)
+    inicio_periodo = date.today() - timedelta(days=730)
+
+    with app.app_context():
+        db.session.execute(insert(Usuario), [
+            {'nome': f'Usuário {indice}', 'email': f'u{indice}@exemplo.com', 'senha_hash': '-'}
+            for indice in range(args.usuarios)
+        ])
+        for inicio in range(0, args.transacoes, args.lote):
+            db.session.execute(insert(Transacao.__table__), [
+                {
+                    'id_usuario': aleatorio.randint(1, args.usuarios),
+                    'tipo': 'despesa' if aleatorio.random() < 0.8 else 'receita',
+                    'valor': round(aleatorio.uniform(1, 500), 2),
+                    'categoria': aleatorio.choice(CATEGORIAS),
+                    'data_transacao': inicio_periodo + timedelta(days=aleatorio.randrange(730)),
+                }
+                for _ in range(min(args.lote, args.transacoes - inicio))
+            ])
+        db.session.commit()
+        print(f'{args.transacoes} transações, {args.usuarios} usuários')
+
+        cronometrar('geração do snapshot', snapshot.gerar)
+        dados = cronometrar('abertura (mmap)', snapshot.abrir)
+
+        por_categoria = cronometrar('snapshot: despesas por categoria', lambda: dados.somar(('categoria',), tipo='despesa'))
+        sql = cronometrar('sqlite: despesas por categoria', lambda: db.session.execute(
+            select(Transacao.categoria, cast(func.sum(Transacao.valor), Float))
+            .where(Transacao.tipo == 'despesa').group_by(Transacao.categoria)
+        ).all())
+        esperado = {categoria: round(total, 2) for categoria, total in sql}
+        obtido = {linha['categoria']: linha['total'] for linha in por_categoria}
+        assert all(abs(obtido[nome] - esperado[nome]) < 0.05 for nome in esperado), 'Totais divergentes'
+
+        cronometrar('snapshot: usuário x mês', lambda: dados.somar(('id_usuario', 'mes'), tipo='despesa'))
+        cronometrar('sqlite: usuário x mês', lambda: db.session.execute(
+            select(Transacao.id_usuario, func.strftime('%Y-%m', Transacao.data_transacao), func.sum(Transacao.valor))
+            .where(Transacao.tipo == 'despesa')
+            .group_by(Transacao.id_usuario, func.strftime('%Y-%m', Transacao.data_transacao))
+        ).all())
+        cronometrar('snapshot: mês x categoria, último ano', lambda: dados.somar(
+            ('mes', 'categoria'), data_inicio=date.today() - timedelta(days=365)
+        ))
+        cronometrar('snapshot: usuários ativos por mês', lambda: dados.usuarios_ativos('mes'))
+
+if __name__ == '__main__':
+    main()
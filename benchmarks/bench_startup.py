@@ -0,0 +1,85 @@
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Orçamento de inicialização: import a frio do app e tempo até o primeiro
+# 200 do servidor pré-forkado. Sai com código 1 se estourar o orçamento.
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDIR_IMPORT = 'import time; inicio = time.perf_counter(); import src.main; print(time.perf_counter() - inicio)'
+
+def medir_import(repeticoes, ambiente):
+    tempos = []
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, '-c', MEDIR_IMPORT],
+            cwd=os.path.dirname(RAIZ), env=ambiente, capture_output=True, text=True, check=True
+        )
+        tempos.append(float(saida.stdout.strip().splitlines()[-1]))
+    return statistics.median(tempos)
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def medir_servidor(workers, ambiente, limite=60):
+    porta = porta_livre()
+    ambiente = dict(ambiente, SERVIDOR_BIND=f'127.0.0.1:{porta}', SERVIDOR_WORKERS=str(workers))
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, '-m', 'src.servidor'],
+        cwd=os.path.dirname(RAIZ), env=ambiente,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - inicio < limite:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{porta}/api/health').read()
+                return time.perf_counter() - inicio
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError('servidor não respondeu')
+    finally:
+        processo.terminate()
+        processo.wait()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--orcamento-import', type=float, default=1.5, help='segundos')
+    parser.add_argument('--orcamento-servidor', type=float, default=3.0, help='segundos')
+    args = parser.parse_args()
+
+    # O banco não existe de propósito: subir o app não pode depender do schema
+    diretorio = tempfile.mkdtemp()
+    banco = os.path.join(diretorio, 'app.db')
+    ambiente = dict(os.environ, DATABASE_URL=f'sqlite:///{banco}')
+
+    tempo_import = medir_import(args.repeticoes, ambiente)
+    tocou_banco = os.path.exists(banco)
+    tempo_servidor = medir_servidor(args.workers, ambiente)
+
+    print(f'import do app:      {tempo_import * 1000:7.1f} ms  (orçamento {args.orcamento_import * 1000:.0f} ms)')
+    print(f'primeira resposta:  {tempo_servidor * 1000:7.1f} ms  com {args.workers} workers  (orçamento {args.orcamento_servidor * 1000:.0f} ms)')
+
+    falhas = []
+    if tocou_banco:
+        falhas.append('o import criou o arquivo do banco; o schema deve ficar no preparar-banco')
+    if tempo_import > args.orcamento_import:
+        falhas.append('import acima do orçamento')
+    if tempo_servidor > args.orcamento_servidor:
+        falhas.append('servidor acima do orçamento')
+    for falha in falhas:
+        print(f'FALHA: {falha}')
+    sys.exit(1 if falhas else 0)
+
+if __name__ == '__main__':
+    main()
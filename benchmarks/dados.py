@@ -0,0 +1,174 @@
+import argparse
+import os
+import random
+import sys
+from contextlib import nullcontext
+from datetime import date, datetime, time, timedelta
+
+# Gerador de dados sintéticos com semente fixa: N usuários com meses de
+# transações num padrão de uso real (salário, aluguel e contas mensais,
+# alimentação quase todo dia, transporte em dias úteis, lazer no fim de
+# semana), uma meta por mês, missões semanais já encerradas pelas regras
+# e configurações. A mesma semente e a mesma data de referência geram
+# exatamente o mesmo banco.
+#
+#     DATABASE_URL=sqlite:////tmp/bench.db python -m src.benchmarks.dados --usuarios 1000
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+SENHA = 'senha-benchmark'
+
+DESCRICOES = {
+    'Salário': ['Salário', 'Pagamento mensal'],
+    'Freelance': ['Projeto freelance', 'Consultoria', 'Design de logo'],
+    'Investimentos': ['Rendimento CDB', 'Dividendos', 'Tesouro Direto'],
+    'Moradia': ['Aluguel', 'Condomínio'],
+    'Contas': ['Conta de luz', 'Conta de água', 'Internet', 'Celular'],
+    'Alimentação': ['Supermercado', 'Padaria', 'Restaurante', 'Feira', 'Lanche', 'Delivery'],
+    'Transporte': ['Ônibus', 'Metrô', 'Uber', 'Combustível', 'Estacionamento'],
+    'Lazer': ['Cinema', 'Show', 'Bar com amigos', 'Streaming', 'Parque'],
+    'Saúde': ['Farmácia', 'Consulta médica', 'Academia'],
+    'Educação': ['Curso online', 'Livros', 'Mensalidade'],
+    'Compras': ['Roupas', 'Eletrônicos', 'Presente'],
+}
+
+def _transacao(aleatorio, user_id, tipo, categoria, valor, dia):
+    return {
+        'id_usuario': user_id,
+        'tipo': tipo,
+        'valor': round(valor, 2),
+        'categoria': categoria,
+        'data_transacao': dia,
+        'descricao': aleatorio.choice(DESCRICOES[categoria]),
+        'data_criacao': datetime.combine(dia, time(12)),
+    }
+
+def transacoes_usuario(aleatorio, user_id, inicio, fim):
+    salario = round(aleatorio.lognormvariate(8.1, 0.4), -1)
+    aluguel = salario * aleatorio.uniform(0.2, 0.35)
+    freelancer = aleatorio.random() < 0.3
+    investidor = aleatorio.random() < 0.2
+    gasto_comida = aleatorio.uniform(20, 60)
+
+    linhas = []
+    dia = inicio
+    while dia <= fim:
+        fim_de_semana = dia.weekday() >= 5
+        if dia.day == 5:
+            linhas.append(_transacao(aleatorio, user_id, 'receita', 'Salário', salario, dia))
+        if dia.day == 10:
+            linhas.append(_transacao(aleatorio, user_id, 'despesa', 'Moradia', aluguel, dia))
+        if dia.day == 15:
+            for _ in range(aleatorio.randint(2, 4)):
+                linhas.append(_transacao(aleatorio, user_id, 'despesa', 'Contas', aleatorio.uniform(50, 250), dia))
+        if dia.day == 20 and investidor:
+            linhas.append(_transacao(aleatorio, user_id, 'receita', 'Investimentos', aleatorio.uniform(20, 400), dia))
+        if freelancer and aleatorio.random() < 0.05:
+            linhas.append(_transacao(aleatorio, user_id, 'receita', 'Freelance', aleatorio.uniform(200, 1500), dia))
+        if aleatorio.random() < 0.7:
+            linhas.append(_transacao(aleatorio, user_id, 'despesa', 'Alimentação', aleatorio.lognormvariate(0, 0.5) * gasto_comida, dia))
+        if not fim_de_semana and aleatorio.random() < 0.5:
+            linhas.append(_transacao(aleatorio, user_id, 'despesa', 'Transporte', aleatorio.uniform(5, 40), dia))
+        if fim_de_semana and aleatorio.random() < 0.5:
+            linhas.append(_transacao(aleatorio, user_id, 'despesa', 'Lazer', aleatorio.uniform(20, 200), dia))
+        for categoria, chance, minimo, maximo in (('Saúde', 0.03, 20, 300), ('Educação', 0.02, 30, 400), ('Compras', 0.04, 30, 600)):
+            if aleatorio.random() < chance:
+                linhas.append(_transacao(aleatorio, user_id, 'despesa', categoria, aleatorio.uniform(minimo, maximo), dia))
+        dia += timedelta(days=1)
+    return salario, linhas
+
+def _meses(inicio, fim):
+    ano, mes = inicio.year, inicio.month
+    while (ano, mes) <= (fim.year, fim.month):
+        yield ano, mes
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+def gerar(usuarios, meses=6, semente=42, referencia=None, lote=50000):
+    # Requer app context; devolve os ids criados, na ordem
+    from sqlalchemy import insert, select
+    from src.models.user import Usuario, Transacao, Meta, Configuracao, db
+    from src.utils import senhas, shards, resumo, progresso, regras_missoes, alteracoes
+
+    aleatorio = random.Random(semente)
+    fim = referencia or date.today()
+    inicio = (fim.replace(day=1) - timedelta(days=31 * (meses - 1))).replace(day=1)
+    senha_hash = senhas.gerar_hash(SENHA)
+    criado_em = datetime.combine(inicio, time(9))
+
+    primeiro = db.session.execute(select(db.func.coalesce(db.func.max(Usuario.id), 0))).scalar() + 1
+    db.session.execute(insert(Usuario), [
+        {
+            'nome': f'Usuário {indice}',
+            'email': f'usuario{indice}@bench.exemplo',
+            'senha_hash': senha_hash,
+            'data_criacao': criado_em,
+            'data_atualizacao': criado_em,
+        }
+        for indice in range(primeiro, primeiro + usuarios)
+    ])
+    db.session.commit()
+    ids = db.session.execute(select(Usuario.id).where(Usuario.id >= primeiro).order_by(Usuario.id)).scalars().all()
+
+    # Linhas agrupadas por shard (um único grupo sem particionamento)
+    por_shard = {}
+    for user_id in ids:
+        salario, transacoes = transacoes_usuario(aleatorio, user_id, inicio, fim)
+        grupo = por_shard.setdefault(shards.shard_do_usuario(user_id) if shards.ativo() else None, {
+            Transacao: [], Meta: [], Configuracao: []
+        })
+        grupo[Transacao].extend(transacoes)
+        grupo[Meta].extend(
+            {
+                'id_usuario': user_id, 'ano': ano, 'mes': mes,
+                'valor_meta': round(salario * aleatorio.uniform(0.05, 0.25), -1),
+                'data_criacao': criado_em, 'data_atualizacao': criado_em,
+            }
+            for ano, mes in _meses(inicio, fim)
+        )
+        grupo[Configuracao].append({
+            'id_usuario': user_id,
+            'modo_escuro': aleatorio.random() < 0.4,
+            'notificacoes_ativas': aleatorio.random() < 0.8,
+            'data_criacao': criado_em, 'data_atualizacao': criado_em,
+        })
+
+    for indice, grupo in por_shard.items():
+        with shards.usar_shard(indice) if indice is not None else nullcontext():
+            for modelo, linhas in grupo.items():
+                for posicao in range(0, len(linhas), lote):
+                    db.session.execute(insert(modelo.__table__), linhas[posicao:posicao + lote])
+                # Insert em lote não passa pelo after_flush: /api/sync precisa do registro
+                alteracoes.registrar_em_massa(modelo, 'upsert', modelo.id_usuario >= primeiro)
+            resumo.reconstruir()
+            db.session.commit()
+
+    # Missões semana a semana até a de referência; as passadas são encerradas
+    # pelas próprias regras (concluída ou expirada), como em produção
+    semana = regras_missoes.semana(inicio)[0]
+    while semana <= fim:
+        regras_missoes.gerar_semanais(semana)
+        semana += timedelta(days=7)
+    for indice in range(shards.total()) if shards.ativo() else (None,):
+        with shards.usar_shard(indice) if indice is not None else nullcontext():
+            regras_missoes.encerrar_vencidas(fim)
+    progresso.recalcular_todas()
+    return ids
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--usuarios', type=int, default=100)
+    parser.add_argument('--meses', type=int, default=6)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--referencia', type=date.fromisoformat, default=None, help='Data final dos dados (AAAA-MM-DD)')
+    args = parser.parse_args()
+
+    from src.main import app, preparar_banco
+    from src.models.user import Transacao, Missao, db
+    preparar_banco()
+    with app.app_context():
+        ids = gerar(args.usuarios, args.meses, args.semente, args.referencia)
+        print(f'{len(ids)} usuários (senha: {SENHA})')
+        if not os.environ.get('SHARDS'):
+            print(f'{Transacao.query.count()} transações, {Missao.query.count()} missões')
+
+if __name__ == '__main__':
+    main()
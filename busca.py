@@ -0,0 +1,84 @@
+import re
+from sqlalchemy import event, text, table, column, literal_column
+from src.models.user import Transacao, db
+
+# Busca textual em descricao e categoria das transações com um índice FTS5
+# de conteúdo externo: o texto continua só em transacoes e o índice é
+# mantido por triggers, então inserts em lote (importação, migração de
+# shards) e deletes em massa (reset) também ficam sincronizados. O
+# tokenizer remove acentos ("alimentacao" acha "Alimentação") e id_usuario
+# é indexado como termo, para a busca de um usuário não percorrer as
+# correspondências dos outros.
+
+TABELA = 'transacoes_busca'
+
+# Pesos do bm25 por coluna: descricao, categoria, id_usuario
+PESOS = (10.0, 4.0, 0.0)
+
+# Termos de 1 letra casariam quase tudo pelo prefixo
+TAMANHO_MINIMO_TERMO = 2
+MAXIMO_TERMOS = 8
+
+# Correspondências mais recentes que entram no ranking de uma busca
+JANELA_RANKING = 1000
+
+COMANDOS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5(
+        descricao, categoria, id_usuario,
+        content='transacoes', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA}_insert AFTER INSERT ON transacoes BEGIN
+        INSERT INTO {TABELA} (rowid, descricao, categoria, id_usuario)
+        VALUES (new.id, new.descricao, new.categoria, new.id_usuario);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA}_delete AFTER DELETE ON transacoes BEGIN
+        INSERT INTO {TABELA} ({TABELA}, rowid, descricao, categoria, id_usuario)
+        VALUES ('delete', old.id, old.descricao, old.categoria, old.id_usuario);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA}_update AFTER UPDATE OF descricao, categoria, id_usuario ON transacoes BEGIN
+        INSERT INTO {TABELA} ({TABELA}, rowid, descricao, categoria, id_usuario)
+        VALUES ('delete', old.id, old.descricao, old.categoria, old.id_usuario);
+        INSERT INTO {TABELA} (rowid, descricao, categoria, id_usuario)
+        VALUES (new.id, new.descricao, new.categoria, new.id_usuario);
+    END""",
+    # rank passa a ser o bm25 com os pesos acima (fica gravado no índice)
+    f"INSERT INTO {TABELA} ({TABELA}, rank) VALUES ('rank', 'bm25({', '.join(map(str, PESOS))})')",
+]
+
+indice = table(TABELA, column('rowid'), column('rank'))
+
+def _criar(conexao):
+    for comando in COMANDOS:
+        conexao.execute(text(comando))
+
+@event.listens_for(Transacao.__table__, 'after_create')
+def _criar_com_tabela(tabela, conexao, **kwargs):
+    # Bancos novos e shards criados por create_all() (inclusive na migração)
+    _criar(conexao)
+
+def garantir(engine=None):
+    # create_all() não cria tabelas virtuais em bancos que já têm transacoes:
+    # cria o índice e faz a carga inicial a partir das linhas existentes
+    engine = engine or db.engine
+    with engine.begin() as conexao:
+        existia = conexao.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"), {'nome': TABELA}
+        ).first() is not None
+        _criar(conexao)
+        if not existia:
+            conexao.execute(text(f"INSERT INTO {TABELA} ({TABELA}) VALUES ('rebuild')"))
+
+def expressao(termos, id_usuario):
+    # Palavras entre aspas (nada do texto vira sintaxe FTS5); só a última é
+    # prefixo, como numa busca enquanto se digita: prefixo mais longo que os
+    # do índice junta as listas de todos os termos que começam com ele
+    palavras = [palavra for palavra in re.findall(r'\w+', termos or '') if len(palavra) >= TAMANHO_MINIMO_TERMO]
+    if not palavras:
+        raise ValueError(f'Parâmetro q deve ter ao menos uma palavra com {TAMANHO_MINIMO_TERMO} letras')
+    palavras = palavras[:MAXIMO_TERMOS]
+    frase = ' '.join([f'"{palavra}"' for palavra in palavras[:-1]] + [f'"{palavras[-1]}"*'])
+    return f'id_usuario : "{int(id_usuario)}" AND {{descricao categoria}} : ({frase})'
+
+def correspondencia(termos, id_usuario):
+    return literal_column(TABELA).op('MATCH')(expressao(termos, id_usuario))
@@ -0,0 +1,177 @@
+from flask import request, make_response
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+import hashlib
+import pickle
+import threading
+import time
+from src.utils import serializacao
+
+# Cache de leitura por usuário. Cada usuário tem um número de versão que
+# faz parte da chave das respostas; as rotas de escrita incrementam a
+# versão após o commit, o que invalida de uma vez todas as respostas
+# daquele usuário sem precisar listar chaves.
+
+class CacheMemoria:
+    # LRU limitado com TTL, local ao processo. As versões também ficam num
+    # LRU limitado: cada incremento recebe o próximo valor de um contador
+    # global, e escopos descartados passam a ler o maior valor já descartado
+    # (piso). Assim um escopo esquecido nunca volta a uma versão antiga que
+    # ainda tenha respostas guardadas.
+
+    def __init__(self, max_itens=10000, ttl=300):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._versoes = OrderedDict()
+        self._contador = 0
+        self._piso = 0
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def versao(self, escopo):
+        with self._lock:
+            versao = self._versoes.get(escopo)
+            if versao is None:
+                return self._piso
+            self._versoes.move_to_end(escopo)
+            return versao
+
+    def incrementar_versao(self, escopo):
+        with self._lock:
+            self._contador += 1
+            self._versoes[escopo] = self._contador
+            self._versoes.move_to_end(escopo)
+            while len(self._versoes) > max(self.max_itens, 1):
+                _, versao = self._versoes.popitem(last=False)
+                self._piso = max(self._piso, versao)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+            self._versoes.clear()
+            self._contador = self._piso = 0
+
+class CacheRedis:
+    # Compartilhado entre workers; requer o pacote redis
+
+    def __init__(self, url, ttl=300, prefixo='cfl:'):
+        import redis
+        self.cliente = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefixo = prefixo
+
+    def get(self, chave):
+        valor = self.cliente.get(self.prefixo + chave)
+        return pickle.loads(valor) if valor is not None else None
+
+    def set(self, chave, valor):
+        self.cliente.setex(self.prefixo + chave, self.ttl, pickle.dumps(valor))
+
+    def versao(self, escopo):
+        return int(self.cliente.get(f'{self.prefixo}versao:{escopo}') or 0)
+
+    def incrementar_versao(self, escopo):
+        self.cliente.incr(f'{self.prefixo}versao:{escopo}')
+
+    def limpar(self):
+        for chave in self.cliente.scan_iter(self.prefixo + '*'):
+            self.cliente.delete(chave)
+
+backend = CacheMemoria()
+
+def configurar(app, processos=1):
+    # processos: os que escrevem no banco, workers mais o master quando ele
+    # roda o agendador (src.servidor informa os seus)
+    global backend
+    ttl = app.config.get('CACHE_TTL', 300)
+    if app.config.get('CACHE_BACKEND') == 'redis':
+        backend = CacheRedis(app.config['CACHE_REDIS_URL'], ttl=ttl)
+        return
+    
+    max_itens = app.config.get('CACHE_MAX_ITENS', 10000)
+    if processos > 1:
+        # invalidar() só alcançaria o processo que fez a escrita; os outros
+        # serviriam dados e ETags velhos até o TTL. Sem cache de respostas o
+        # ETag continua sendo calculado do corpo e o 304 funciona
+        app.logger.warning(
+            'CACHE_BACKEND=memoria com %d processos: cache de respostas desligado, use CACHE_BACKEND=redis',
+            processos
+        )
+        max_itens = 0
+    backend = CacheMemoria(max_itens=max_itens, ttl=ttl)
+
+def invalidar(user_id):
+    backend.incrementar_versao(user_id)
+
+def invalidar_todos():
+    # Para tarefas que alteram dados de todos os usuários de uma vez
+    backend.incrementar_versao('todos')
+
+def chave(nome, escopo, formato, query_string):
+    # Compartilhada com o modo ASGI, que lê e grava os mesmos itens
+    return ':'.join([
+        nome,
+        str(escopo),
+        str(backend.versao(escopo)),
+        str(backend.versao('todos')),
+        date.today().isoformat(),
+        formato,
+        query_string
+    ])
+
+def item(corpo, status, mimetype, vary):
+    return (corpo, status, hashlib.sha1(corpo).hexdigest(), mimetype, vary)
+
+def _responder(corpo, status, etag, mimetype='application/json', vary=None):
+    resposta = make_response(corpo, status)
+    resposta.mimetype = mimetype
+    if vary:
+        resposta.headers['Vary'] = vary
+    resposta.set_etag(etag)
+    return resposta.make_conditional(request)
+
+def em_cache(nome):
+    # Rotas por usuário recebem user_id; as demais usam um escopo global
+    def decorador(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            chave_resposta = chave(
+                nome,
+                kwargs.get('user_id', 'global'),
+                serializacao.formato(request.accept_mimetypes),
+                request.query_string.decode()
+            )
+            
+            guardado = backend.get(chave_resposta)
+            if guardado is not None:
+                return _responder(*guardado)
+            
+            resposta = make_response(view(*args, **kwargs))
+            if resposta.status_code != 200:
+                return resposta
+            
+            guardado = item(resposta.get_data(), resposta.status_code, resposta.mimetype, resposta.headers.get('Vary'))
+            backend.set(chave_resposta, guardado)
+            return _responder(*guardado)
+        return wrapper
+    return decorador
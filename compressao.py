@@ -0,0 +1,60 @@
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Compressão das respostas negociada pelo Accept-Encoding. Só comprime
+# corpos acima de um tamanho mínimo e de tipos textuais/serializados;
+# brotli (quando instalado) tem preferência sobre gzip em empate de
+# qualidade. Respostas em streaming (export) ficam de fora.
+
+TIPOS_COMPRIMIVEIS = ('application/json', 'application/x-msgpack', 'application/x-ndjson', 'text/')
+
+_minimo = 1024
+_nivel_gzip = 6
+_qualidade_brotli = 5
+
+def codificacoes():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+def escolher(aceitas, tamanho, mimetype):
+    # aceitas: Accept do cabeçalho Accept-Encoding; None = sem compressão
+    if tamanho < _minimo or not mimetype or not mimetype.startswith(TIPOS_COMPRIMIVEIS):
+        return None
+    return aceitas.best_match(codificacoes())
+
+def comprimir(corpo, codificacao):
+    if codificacao == 'br':
+        return brotli.compress(corpo, quality=_qualidade_brotli)
+    return gzip.compress(corpo, compresslevel=_nivel_gzip, mtime=0)
+
+def _comprimir_resposta(resposta):
+    if resposta.status_code != 200 or resposta.direct_passthrough or resposta.is_streamed:
+        return resposta
+    if 'Content-Encoding' in resposta.headers or not (resposta.mimetype or '').startswith(TIPOS_COMPRIMIVEIS):
+        return resposta
+
+    resposta.vary.add('Accept-Encoding')
+    codificacao = escolher(request.accept_encodings, resposta.content_length or 0, resposta.mimetype)
+    if codificacao is None:
+        return resposta
+
+    resposta.set_data(comprimir(resposta.get_data(), codificacao))
+    resposta.headers['Content-Encoding'] = codificacao
+    # Mesmo conteúdo em outra codificação: o ETag passa a ser fraco, o que
+    # mantém o If-None-Match (comparação fraca) funcionando
+    etag, fraco = resposta.get_etag()
+    if etag and not fraco:
+        resposta.set_etag(etag, weak=True)
+    return resposta
+
+def configurar(app):
+    global _minimo, _nivel_gzip, _qualidade_brotli
+    _minimo = app.config.get('COMPRESSAO_MINIMO', 1024)
+    _nivel_gzip = app.config.get('COMPRESSAO_NIVEL_GZIP', 6)
+    _qualidade_brotli = app.config.get('COMPRESSAO_QUALIDADE_BROTLI', 5)
+    if app.config.get('COMPRESSAO_ATIVA', True):
+        app.after_request(_comprimir_resposta)
@@ -1,12 +1,14 @@
 from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
 from src.models.user import Configuracao, db
+from src.utils import resumo, cache, alteracoes
 from datetime import datetime
 
 config_bp = Blueprint('config', __name__)
 
 @config_bp.route('/configuracoes/<int:user_id>', methods=['GET'])
 @cross_origin()
+@cache.em_cache('configuracoes')
 def get_configuracoes(user_id):
     try:
         config = Configuracao.query.filter_by(id_usuario=user_id).first()
@@ -41,6 +43,7 @@ def atualizar_configuracoes(user_id):
         config.data_atualizacao = datetime.utcnow()
         
         db.session.commit()
+        cache.invalidar(user_id)
         
         return jsonify({
             'mensagem': 'Configurações atualizadas com sucesso',
@@ -55,10 +58,15 @@ def atualizar_configuracoes(user_id):
 @cross_origin()
 def reset_dados(user_id):
     try:
-        from src.models.user import Usuario, Transacao, Meta, Missao
+        from src.models.user import Usuario, Transacao, Meta, Missao, Recorrencia
+        
+        # Registrar as remoções para a sincronização antes de apagar
+        for modelo in (Transacao, Meta, Missao, Recorrencia):
+            alteracoes.registrar_em_massa(modelo, 'delete', modelo.id_usuario == user_id)
         
         # Deletar todas as transações do usuário
         Transacao.query.filter_by(id_usuario=user_id).delete()
+        resumo.limpar(user_id)
         
         # Deletar todas as metas do usuário
         Meta.query.filter_by(id_usuario=user_id).delete()
@@ -66,6 +74,9 @@ def reset_dados(user_id):
         # Deletar todas as missões do usuário
         Missao.query.filter_by(id_usuario=user_id).delete()
         
+        # Deletar todas as recorrências do usuário
+        Recorrencia.query.filter_by(id_usuario=user_id).delete()
+        
         # Resetar configurações para padrão
         config = Configuracao.query.filter_by(id_usuario=user_id).first()
         if config:
@@ -77,6 +88,7 @@ def reset_dados(user_id):
             config.data_atualizacao = datetime.utcnow()
         
         db.session.commit()
+        cache.invalidar(user_id)
         
         return jsonify({'mensagem': 'Dados resetados com sucesso'}), 200
         
@@ -86,6 +98,7 @@ def reset_dados(user_id):
 
 @config_bp.route('/categorias', methods=['GET'])
 @cross_origin()
+@cache.em_cache('categorias')
 def get_categorias():
     try:
         categorias = {
@@ -0,0 +1,75 @@
+from flask import Blueprint, jsonify, request, Response, stream_with_context
+from flask_cors import cross_origin
+from src.models.user import Usuario, Transacao, Recorrencia, Meta, Missao, Configuracao
+from src.utils.armazenamento import sessao_leitura
+from datetime import date
+import csv
+import io
+import json
+
+export_bp = Blueprint('export', __name__)
+
+TAMANHO_LOTE = 500
+
+# Entidades exportadas, na ordem em que aparecem no arquivo
+ENTIDADES = [
+    ('transacao', Transacao),
+    # As regras, não as ocorrências: estas são expandidas nas consultas
+    ('recorrencia', Recorrencia),
+    ('meta', Meta),
+    ('missao', Missao),
+    ('configuracao', Configuracao),
+]
+
+def _registros(user_id):
+    # yield_per busca as linhas em lotes, sem carregar a conta inteira na memória
+    for nome, modelo in ENTIDADES:
+        consulta = sessao_leitura().query(modelo).filter_by(id_usuario=user_id).order_by(modelo.id).yield_per(TAMANHO_LOTE)
+        for registro in consulta:
+            yield nome, registro.to_dict()
+
+def _gerar_ndjson(user_id):
+    for nome, dados in _registros(user_id):
+        yield json.dumps({'registro': nome, **dados}, ensure_ascii=False) + '\n'
+
+def _gerar_csv(user_id):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    entidade_atual = None
+    
+    for nome, dados in _registros(user_id):
+        # Cada entidade abre com sua própria linha de cabeçalho
+        if nome != entidade_atual:
+            escritor.writerow(['registro'] + list(dados.keys()))
+            entidade_atual = nome
+        escritor.writerow([nome] + list(dados.values()))
+        
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+FORMATOS = {
+    'ndjson': (_gerar_ndjson, 'application/x-ndjson'),
+    'csv': (_gerar_csv, 'text/csv'),
+}
+
+@export_bp.route('/export/<int:user_id>', methods=['GET'])
+@cross_origin()
+def exportar_dados(user_id):
+    try:
+        formato = request.args.get('formato', 'ndjson')
+        if formato not in FORMATOS:
+            return jsonify({'erro': 'Formato inválido. Use ndjson ou csv'}), 400
+        
+        Usuario.query.get_or_404(user_id)
+        
+        gerador, mimetype = FORMATOS[formato]
+        nome_arquivo = f'chave-financeira-backup-{date.today().isoformat()}.{formato}'
+        
+        return Response(
+            stream_with_context(gerador(user_id)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'}
+        )
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
@@ -0,0 +1,66 @@
+from flask import Blueprint, jsonify
+from flask_cors import cross_origin
+from src.models.user import Meta, Missao, Configuracao, db
+from src.utils import resumo, cache, progresso, previsao
+from datetime import date
+
+home_bp = Blueprint('home', __name__)
+
+@home_bp.route('/home/<int:user_id>', methods=['GET'])
+@cross_origin()
+@cache.em_cache('home')
+def get_home(user_id):
+    try:
+        hoje = date.today()
+        
+        # Totais do mês, usados tanto no resumo quanto no progresso da meta
+        receitas, despesas = resumo.totais_mes(user_id, hoje.year, hoje.month)
+        economia_atual = receitas - despesas
+        
+        meta_atual = Meta.query.filter_by(
+            id_usuario=user_id,
+            mes=hoje.month,
+            ano=hoje.year
+        ).first()
+        
+        meta = None
+        if meta_atual:
+            economia_atual, progresso_percentual = progresso.calcular(meta_atual.valor_meta, receitas, despesas)
+            meta = {
+                'meta': meta_atual.to_dict(),
+                'economia_atual': economia_atual,
+                'progresso_percentual': min(progresso_percentual, 100)
+            }
+        
+        previsao_mes = db.session.execute(previsao.consulta_previsao(user_id, hoje.year, hoje.month)).scalar()
+        
+        missoes_ativas = Missao.query.filter(
+            Missao.id_usuario == user_id,
+            Missao.status == 'pendente',
+            Missao.data_fim >= hoje
+        ).all()
+        
+        config = Configuracao.query.filter_by(id_usuario=user_id).first()
+        if not config:
+            # Criar configurações padrão se não existirem
+            config = Configuracao(id_usuario=user_id)
+            db.session.add(config)
+            db.session.commit()
+        
+        return jsonify({
+            'dashboard': {
+                'saldo_atual': economia_atual,
+                'total_receita': receitas,
+                'total_despesa': despesas,
+                'mes': hoje.month,
+                'ano': hoje.year,
+                'previsao': previsao_mes.to_dict() if previsao_mes else None
+            },
+            'meta_atual': meta,
+            'missoes_ativas': [missao.to_dict() for missao in missoes_ativas],
+            'configuracoes': config.to_dict()
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 500
@@ -0,0 +1,261 @@
+from flask import Blueprint, jsonify, request
+from flask_cors import cross_origin
+from src.models.user import Usuario, Transacao, db
+from src.utils import resumo, cache, alteracoes, regras_missoes
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from sqlalchemy import insert, func
+import csv
+import io
+import json
+import re
+
+importacao_bp = Blueprint('importacao', __name__)
+
+TAMANHO_LOTE = 5000
+MAXIMO_ERROS_LISTADOS = 1000
+
+TIPOS_VALIDOS = ('receita', 'despesa')
+
+def _ler_csv(arquivo):
+    leitor = csv.DictReader(io.TextIOWrapper(arquivo, encoding='utf-8-sig'))
+    for linha in leitor:
+        yield leitor.line_num, linha
+
+def _ler_ndjson(arquivo):
+    for numero, linha in enumerate(io.TextIOWrapper(arquivo, encoding='utf-8-sig'), start=1):
+        if not linha.strip():
+            continue
+        try:
+            yield numero, json.loads(linha)
+        except ValueError:
+            yield numero, None
+
+TAG_OFX = re.compile(r'<(/?)(\w+)>([^<\r\n]*)')
+
+def _ler_ofx(arquivo):
+    # Extratos OFX (SGML ou XML): cada <STMTTRN> vira uma transação
+    atual = None
+    inicio = 0
+    for numero, linha in enumerate(io.TextIOWrapper(arquivo, encoding='latin-1'), start=1):
+        for fechamento, tag, valor in TAG_OFX.findall(linha):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not fechamento:
+                    atual, inicio = {}, numero
+                elif atual is not None:
+                    yield inicio, _converter_ofx(atual)
+                    atual = None
+            elif atual is not None and not fechamento:
+                atual[tag] = valor.strip()
+
+def _converter_ofx(campos):
+    try:
+        valor = Decimal(campos.get('TRNAMT', '').replace(',', '.'))
+    except InvalidOperation:
+        valor = None
+    return {
+        'tipo': 'receita' if valor is not None and valor > 0 else 'despesa',
+        'valor': abs(valor) if valor is not None else None,
+        'categoria': 'Outros',
+        'data_transacao': campos.get('DTPOSTED', '')[:8],
+        'descricao': campos.get('MEMO') or campos.get('NAME', '')
+    }
+
+LEITORES = {
+    'csv': _ler_csv,
+    'ndjson': _ler_ndjson,
+    'ofx': _ler_ofx,
+}
+
+def _ler_valor(valor):
+    if isinstance(valor, str):
+        valor = valor.strip()
+        # O último entre '.' e ',' é o separador decimal (1.234,56 ou
+        # 1,234.56); repetido, é só separador de milhar (1.234.567)
+        ultimo = max(valor.rfind('.'), valor.rfind(','))
+        if ultimo >= 0:
+            separador = valor[ultimo]
+            milhar = ',' if separador == '.' else '.'
+            if valor.count(separador) > 1:
+                valor = valor.replace(separador, '').replace(milhar, '')
+            elif milhar not in valor and len(valor) - ultimo - 1 == 3:
+                # 1,234 ou 1.234: milhar ou três casas decimais
+                raise ValueError('valor ambíguo: informe as casas decimais (1.234,00 ou 1,234.00)')
+            else:
+                valor = valor[:ultimo].replace(milhar, '') + '.' + valor[ultimo + 1:]
+    try:
+        valor = Decimal(str(valor))
+    except InvalidOperation:
+        raise ValueError('valor inválido')
+    if not valor.is_finite() or valor <= 0:
+        raise ValueError('valor deve ser positivo')
+    # Mais de duas casas seria arredondado em silêncio
+    if valor != valor.quantize(Decimal('0.01')):
+        raise ValueError('valor com mais de duas casas decimais')
+    return valor.quantize(Decimal('0.01'))
+
+def _ler_data(valor):
+    for formato in ('%Y-%m-%d', '%Y%m%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except (TypeError, ValueError):
+            continue
+    raise ValueError('data_transacao inválida')
+
+def _texto(dados, campo):
+    # JSON válido pode trazer número, lista ou objeto no lugar do texto
+    valor = dados.get(campo)
+    if valor is None:
+        return ''
+    if not isinstance(valor, str):
+        raise ValueError(f'campo {campo} inválido')
+    return valor.strip()
+
+def _validar(dados):
+    if not isinstance(dados, dict):
+        raise ValueError('linha mal formada')
+    
+    tipo = _texto(dados, 'tipo').lower()
+    if tipo not in TIPOS_VALIDOS:
+        raise ValueError('tipo deve ser receita ou despesa')
+    
+    categoria = _texto(dados, 'categoria')
+    if not categoria or len(categoria) > 50:
+        raise ValueError('categoria inválida')
+    
+    return {
+        'tipo': tipo,
+        'valor': _ler_valor(dados.get('valor')),
+        'categoria': categoria,
+        'data_transacao': _ler_data(dados.get('data_transacao')),
+        'descricao': _texto(dados, 'descricao')
+    }
+
+def _chave(data_transacao, valor, descricao):
+    return data_transacao, int(round(Decimal(str(valor)) * 100)), descricao or ''
+
+class _Deduplicador:
+    # Chaves (data, centavos, descrição) que já estavam no banco antes da
+    # importação. Só consulta o banco para datas ainda não cobertas e ignora
+    # as linhas inseridas pela própria importação: duas linhas iguais no
+    # mesmo arquivo (dois cafés no mesmo dia) são duas transações.
+    
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.vistas = set()
+        self.cobertura = None
+        self.id_limite = db.session.query(func.max(Transacao.id)).scalar() or 0
+    
+    def _carregar(self, inicio, fim):
+        existentes = db.session.query(
+            Transacao.data_transacao,
+            Transacao.valor,
+            Transacao.descricao
+        ).filter(
+            Transacao.id_usuario == self.user_id,
+            Transacao.data_transacao >= inicio,
+            Transacao.data_transacao <= fim,
+            Transacao.id <= self.id_limite
+        )
+        self.vistas.update(_chave(*linha) for linha in existentes)
+    
+    def preparar(self, lote):
+        inicio = min(linha['data_transacao'] for linha in lote)
+        fim = max(linha['data_transacao'] for linha in lote)
+        
+        if self.cobertura is None:
+            self._carregar(inicio, fim)
+            self.cobertura = (inicio, fim)
+            return
+        
+        coberto_inicio, coberto_fim = self.cobertura
+        if inicio < coberto_inicio:
+            self._carregar(inicio, coberto_inicio - timedelta(days=1))
+        if fim > coberto_fim:
+            self._carregar(coberto_fim + timedelta(days=1), fim)
+        self.cobertura = (min(inicio, coberto_inicio), max(fim, coberto_fim))
+    
+    def novo(self, linha):
+        chave = _chave(linha['data_transacao'], linha['valor'], linha['descricao'])
+        return chave not in self.vistas
+
+def _gravar_lote(user_id, lote, deduplicador):
+    deduplicador.preparar(lote)
+    
+    agora = datetime.utcnow()
+    novas = [
+        dict(linha, id_usuario=user_id, data_criacao=agora)
+        for linha in lote
+        if deduplicador.novo(linha)
+    ]
+    
+    if novas:
+        # executemany em um único comando por lote
+        db.session.execute(insert(Transacao), novas)
+        resumo.adicionar_lote(user_id, novas)
+        regras_missoes.avaliar(user_id, *{linha['data_transacao'] for linha in novas})
+    
+    return len(novas)
+
+@importacao_bp.route('/import/<int:user_id>', methods=['POST'])
+@cross_origin()
+def importar_transacoes(user_id):
+    try:
+        Usuario.query.get_or_404(user_id)
+        
+        arquivo = request.files.get('arquivo')
+        if arquivo is None:
+            return jsonify({'erro': 'Envie o extrato no campo arquivo'}), 400
+        
+        formato = request.form.get('formato') or arquivo.filename.rsplit('.', 1)[-1].lower()
+        if formato not in LEITORES:
+            return jsonify({'erro': 'Formato inválido. Use csv, ofx ou ndjson'}), 400
+        
+        importadas = 0
+        processadas = 0
+        erros = []
+        total_erros = 0
+        deduplicador = _Deduplicador(user_id)
+        lote = []
+        
+        for numero, dados in LEITORES[formato](arquivo.stream):
+            processadas += 1
+            try:
+                lote.append(_validar(dados))
+            except ValueError as e:
+                total_erros += 1
+                if len(erros) < MAXIMO_ERROS_LISTADOS:
+                    erros.append({'linha': numero, 'erro': str(e)})
+                continue
+            
+            if len(lote) >= TAMANHO_LOTE:
+                importadas += _gravar_lote(user_id, lote, deduplicador)
+                lote = []
+        
+        if lote:
+            importadas += _gravar_lote(user_id, lote, deduplicador)
+        
+        if importadas:
+            alteracoes.registrar_em_massa(
+                Transacao,
+                'upsert',
+                Transacao.id_usuario == user_id,
+                Transacao.id > deduplicador.id_limite
+            )
+        
+        db.session.commit()
+        cache.invalidar(user_id)
+        
+        return jsonify({
+            'mensagem': 'Importação concluída',
+            'processadas': processadas,
+            'importadas': importadas,
+            'duplicadas': processadas - total_erros - importadas,
+            'total_erros': total_erros,
+            'erros': erros
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 500
@@ -0,0 +1,99 @@
+from datetime import date
+from sqlalchemy import select
+from src.models.user import Transacao, Meta, Missao, Configuracao, Usuario, ResumoMensal, ResumoDiario, db
+from src.utils.periodo import intervalo_mes, intervalo_semana, filtro_periodo
+from src.utils import busca
+import re
+
+def garantir_indices(engine=None, tabelas=None):
+    # create_all() não adiciona índices a tabelas que já existem
+    engine = engine or db.engine
+    for tabela in tabelas or db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(engine, checkfirst=True)
+
+def consultas_criticas(user_id=1, hoje=None):
+    hoje = hoje or date.today()
+    inicio_mes, fim_mes = intervalo_mes(hoje.year, hoje.month)
+    inicio_semana, fim_semana = intervalo_semana(hoje)
+
+    return {
+        'transacoes_usuario': select(Transacao).where(
+            Transacao.id_usuario == user_id
+        ).order_by(Transacao.data_transacao.desc()),
+        'transacoes_mes': select(Transacao).where(
+            Transacao.id_usuario == user_id,
+            filtro_periodo(Transacao.data_transacao, inicio_mes, fim_mes)
+        ),
+        'resumo_mes': select(ResumoMensal.tipo, ResumoMensal.total).where(
+            ResumoMensal.id_usuario == user_id,
+            ResumoMensal.ano == hoje.year,
+            ResumoMensal.mes == hoje.month
+        ),
+        'metas_usuario': select(Meta).where(
+            Meta.id_usuario == user_id
+        ).order_by(Meta.ano.desc(), Meta.mes.desc()),
+        'meta_atual': select(Meta).where(
+            Meta.id_usuario == user_id,
+            Meta.ano == hoje.year,
+            Meta.mes == hoje.month
+        ),
+        'missoes_ativas': select(Missao).where(
+            Missao.id_usuario == user_id,
+            Missao.status == 'pendente',
+            Missao.data_fim >= hoje
+        ),
+        'missoes_semana': select(Missao).where(
+            Missao.id_usuario == user_id,
+            filtro_periodo(Missao.data_inicio, inicio_semana, fim_semana),
+            Missao.tipo == 'semanal'
+        ),
+        'missoes_a_avaliar': select(Missao).where(
+            Missao.id_usuario == user_id,
+            Missao.status == 'pendente',
+            Missao.data_inicio <= hoje,
+            Missao.data_fim >= hoje
+        ),
+        'missoes_vencidas': select(Missao.id).where(
+            Missao.status == 'pendente',
+            Missao.data_fim < inicio_semana
+        ),
+        'resumo_semana': select(ResumoDiario).where(
+            ResumoDiario.id_usuario == user_id,
+            ResumoDiario.data >= inicio_semana,
+            ResumoDiario.data < fim_semana
+        ),
+        'configuracao_usuario': select(Configuracao).where(
+            Configuracao.id_usuario == user_id
+        ),
+        'usuario_email': select(Usuario).where(
+            Usuario.email == 'usuario@exemplo.com'
+        ),
+        'busca_transacoes': select(Transacao).select_from(
+            busca.indice.join(Transacao, Transacao.id == busca.indice.c.rowid)
+        ).where(
+            Transacao.id_usuario == user_id,
+            busca.correspondencia('mercado', user_id)
+        ).order_by(busca.indice.c.rank),
+    }
+
+def plano_consulta(consulta):
+    sql = consulta.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True})
+    linhas = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')).all()
+    return [linha[-1] for linha in linhas]
+
+def verificar_planos(consultas=None):
+    # Retorna as consultas cujo plano faz varredura completa de alguma tabela
+    # (tabela virtual FTS5 com MATCH, o "M" do plano, usa o índice textual)
+    consultas = consultas or consultas_criticas()
+    falhas = {}
+    for nome, consulta in consultas.items():
+        plano = plano_consulta(consulta)
+        varreduras = [
+            passo for passo in plano
+            if passo.startswith('SCAN') and 'USING' not in passo
+            and not re.search(r'VIRTUAL TABLE INDEX \d+:M', passo)
+        ]
+        if varreduras:
+            falhas[nome] = plano
+    return falhas
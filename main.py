@@ -1,5 +1,6 @@
 import os
 import sys
+import click
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
@@ -11,6 +12,13 @@ from src.routes.transacao import transacao_bp
 from src.routes.meta import meta_bp
 from src.routes.missao import missao_bp
 from src.routes.config import config_bp
+from src.routes.export import export_bp
+from src.routes.importacao import importacao_bp
+from src.routes.home import home_bp
+from src.routes.sync import sync_bp
+from src.routes.tendencias import tendencias_bp
+from src.routes.recorrencia import recorrencia_bp
+from src.utils import resumo, indices, cache, alteracoes, senhas, armazenamento, shards, progresso, agendador, regras_missoes, previsao, snapshot, compressao, metricas, busca
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'chave_financeira_libertadora_2024'
@@ -24,14 +32,75 @@ app.register_blueprint(transacao_bp, url_prefix='/api')
 app.register_blueprint(meta_bp, url_prefix='/api')
 app.register_blueprint(missao_bp, url_prefix='/api')
 app.register_blueprint(config_bp, url_prefix='/api')
+app.register_blueprint(export_bp, url_prefix='/api')
+app.register_blueprint(importacao_bp, url_prefix='/api')
+app.register_blueprint(home_bp, url_prefix='/api')
+app.register_blueprint(sync_bp, url_prefix='/api')
+app.register_blueprint(tendencias_bp, url_prefix='/api')
+app.register_blueprint(recorrencia_bp, url_prefix='/api')
 
 # Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+    'DATABASE_URL',
+    f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Perfil de armazenamento SQLite (WAL, pragmas e pool somente leitura)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = armazenamento.opcoes_engine(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['SQLALCHEMY_BINDS'] = armazenamento.binds(
+    app.config['SQLALCHEMY_DATABASE_URI'],
+    os.path.join(os.path.dirname(__file__), 'database')
+)
 db.init_app(app)
+armazenamento.configurar(app)
+shards.configurar(app)
+
+# Cache de leitura: 'memoria' (por processo) ou 'redis' (compartilhado entre workers)
+app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memoria')
+app.config['CACHE_REDIS_URL'] = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+app.config['CACHE_TTL'] = int(os.environ.get('CACHE_TTL', 300))
+app.config['CACHE_MAX_ITENS'] = int(os.environ.get('CACHE_MAX_ITENS', 10000))
+cache.configurar(app)
+
+# Compressão das respostas (gzip/brotli) acima de um tamanho mínimo em bytes
+app.config['COMPRESSAO_ATIVA'] = os.environ.get('COMPRESSAO_ATIVA', '1') == '1'
+app.config['COMPRESSAO_MINIMO'] = int(os.environ.get('COMPRESSAO_MINIMO', 1024))
+app.config['COMPRESSAO_NIVEL_GZIP'] = int(os.environ.get('COMPRESSAO_NIVEL_GZIP', 6))
+app.config['COMPRESSAO_QUALIDADE_BROTLI'] = int(os.environ.get('COMPRESSAO_QUALIDADE_BROTLI', 5))
+compressao.configurar(app)
+
+# Métricas Prometheus em /api/metrics (latência por rota, SQL e consultas lentas)
+app.config['METRICAS_ATIVAS'] = os.environ.get('METRICAS_ATIVAS', '1') == '1'
+app.config['METRICAS_SQL_LENTA_MS'] = int(os.environ.get('METRICAS_SQL_LENTA_MS', 200))
+app.config['METRICAS_DIR'] = os.environ.get('METRICAS_DIR')
+metricas.configurar(app)
 
-with app.app_context():
-    db.create_all()
+# Snapshot analítico colunar (arquivos mapeados em memória fora do banco)
+app.config['SNAPSHOT_DIR'] = os.environ.get('SNAPSHOT_DIR', os.path.join(os.path.dirname(__file__), 'database', 'snapshot'))
+
+# Tarefas periódicas (segundos; 0 desliga). Iniciadas pelo servidor de produção
+agendador.registrar('progresso-metas', int(os.environ.get('PROGRESSO_INTERVALO', 900)), progresso.recalcular_todas)
+agendador.registrar('missoes-semanais', int(os.environ.get('MISSOES_INTERVALO', 3600)), regras_missoes.executar_semana)
+agendador.registrar('previsoes', int(os.environ.get('PREVISAO_INTERVALO', 3600)), previsao.calcular_todas)
+agendador.registrar('snapshot-analitico', int(os.environ.get('SNAPSHOT_INTERVALO', 0)), snapshot.gerar)
+
+def preparar_banco():
+    # Passo único de deploy: schema, índices, shards e rollups. Fica fora do
+    # import para que cada worker suba sem tocar no banco
+    with app.app_context():
+        db.create_all()
+        indices.garantir_indices()
+        busca.garantir()
+        if shards.ativo():
+            shards.criar_shards()
+            for indice in range(shards.total()):
+                indices.garantir_indices(db.engines[f'shard_{indice}'], shards.tabelas_particionadas())
+                busca.garantir(db.engines[f'shard_{indice}'])
+                with shards.usar_shard(indice):
+                    resumo.reconstruir_se_necessario()
+        else:
+            resumo.reconstruir_se_necessario()
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -49,10 +118,73 @@ def serve(path):
         else:
             return "index.html not found", 404
 
+@app.cli.command('preparar-banco')
+def preparar_banco_comando():
+    preparar_banco()
+    print('Banco de dados pronto')
+
+@app.cli.command('recalcular-progresso')
+def recalcular_progresso():
+    # Atualiza Meta.progresso de todos os usuários e meses de uma vez
+    atualizadas = progresso.recalcular_todas()
+    print(f'{atualizadas} metas atualizadas')
+
+@app.cli.command('missoes-semanais')
+def missoes_semanais():
+    # Encerra as semanas passadas e gera as missões da semana para todos os usuários
+    resultado = regras_missoes.executar_semana()
+    print(f"{resultado['encerradas']} missões encerradas, {resultado['criadas']} missões criadas")
+
+@app.cli.command('calcular-previsoes')
+def calcular_previsoes():
+    # Previsão de fim de mês para todos os usuários (requer numpy)
+    calculadas = previsao.calcular_todas()
+    print(f'{calculadas} previsões calculadas')
+
+@app.cli.command('snapshot-analitico')
+def snapshot_analitico():
+    # Grava as transações em colunas mapeadas em memória para análises (requer numpy)
+    linhas = snapshot.gerar()
+    print(f'{linhas} transações no snapshot')
+
+@app.cli.command('verificar-indices')
+def verificar_indices():
+    # Falha se alguma consulta crítica fizer varredura completa de tabela
+    falhas = indices.verificar_planos()
+    for nome, plano in falhas.items():
+        print(f'{nome}: ' + ' | '.join(plano))
+    if falhas:
+        sys.exit(1)
+    print('Todas as consultas críticas usam índices')
+
+@app.cli.command('migrar-shards')
+@click.option('--shards', 'total_destino', type=int, required=True, help='Quantidade de shards de destino')
+@click.option('--destino', required=True, help='Diretório onde os novos arquivos de shard serão criados')
+def migrar_shards(total_destino, destino):
+    # Migra app.db para shards, ou redistribui os shards atuais em outra quantidade
+    if shards.ativo():
+        origens = [db.engines[f'shard_{indice}'] for indice in range(shards.total())]
+    else:
+        origens = [db.engine]
+    
+    copiados = shards.migrar(origens, destino, total_destino)
+    for entidade, quantidade in copiados.items():
+        print(f'{entidade}: {quantidade} registros')
+    print(f'Configure SHARDS={total_destino} e SHARD_DIR={destino} para usar os novos shards')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return {'status': 'OK', 'message': 'Chave Financeira Libertadora API está funcionando!'}, 200
+    return {
+        'status': 'OK',
+        'message': 'Chave Financeira Libertadora API está funcionando!',
+        'senhas': senhas.metricas()
+    }, 200
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    return metricas.resposta()
 
 if __name__ == '__main__':
+    preparar_banco()
     app.run(host='0.0.0.0', port=5000, debug=True)
 
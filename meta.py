@@ -1,17 +1,21 @@
 from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
-from src.models.user import Meta, Transacao, db
+from src.models.user import Meta, db
+from src.utils import resumo, cache, progresso, serializacao
+from src.utils.armazenamento import sessao_leitura
 from datetime import datetime, date
-from sqlalchemy import func, extract
 
 meta_bp = Blueprint('meta', __name__)
 
 @meta_bp.route('/metas/<int:user_id>', methods=['GET'])
 @cross_origin()
+@cache.em_cache('metas')
 def get_metas(user_id):
     try:
-        metas = Meta.query.filter_by(id_usuario=user_id).order_by(Meta.ano.desc(), Meta.mes.desc()).all()
-        return jsonify([meta.to_dict() for meta in metas]), 200
+        # Progresso ao vivo de todas as metas numa única consulta agrupada
+        consulta = progresso.consulta_progresso(Meta.id_usuario == user_id).order_by(Meta.ano.desc(), Meta.mes.desc())
+        metas = serializacao.executar(sessao_leitura(), Meta, consulta)
+        return serializacao.resposta([progresso.com_progresso(meta) for meta in metas])
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
@@ -40,6 +44,7 @@ def criar_meta():
         
         db.session.add(meta)
         db.session.commit()
+        cache.invalidar(meta.id_usuario)
         
         return jsonify({
             'mensagem': 'Meta criada com sucesso',
@@ -61,6 +66,7 @@ def atualizar_meta(meta_id):
         meta.data_atualizacao = datetime.utcnow()
         
         db.session.commit()
+        cache.invalidar(meta.id_usuario)
         
         return jsonify({
             'mensagem': 'Meta atualizada com sucesso',
@@ -78,26 +84,9 @@ def calcular_progresso(meta_id):
         meta = Meta.query.get_or_404(meta_id)
         
         # Calcular economia do mês (receitas - despesas)
-        receitas = db.session.query(func.sum(Transacao.valor)).filter(
-            Transacao.id_usuario == meta.id_usuario,
-            Transacao.tipo == 'receita',
-            extract('month', Transacao.data_transacao) == meta.mes,
-            extract('year', Transacao.data_transacao) == meta.ano
-        ).scalar() or 0
-        
-        despesas = db.session.query(func.sum(Transacao.valor)).filter(
-            Transacao.id_usuario == meta.id_usuario,
-            Transacao.tipo == 'despesa',
-            extract('month', Transacao.data_transacao) == meta.mes,
-            extract('year', Transacao.data_transacao) == meta.ano
-        ).scalar() or 0
-        
-        economia_atual = float(receitas) - float(despesas)
-        progresso_percentual = (economia_atual / float(meta.valor_meta)) * 100 if meta.valor_meta > 0 else 0
-        
-        # Atualizar progresso na meta
-        meta.progresso = min(progresso_percentual, 100)
-        db.session.commit()
+        # Só leitura: Meta.progresso é gravado em lote por progresso.recalcular_todas
+        receitas, despesas = resumo.totais_mes(meta.id_usuario, meta.ano, meta.mes)
+        economia_atual, progresso_percentual = progresso.calcular(meta.valor_meta, receitas, despesas)
         
         return jsonify({
             'meta_id': meta.id,
@@ -126,22 +115,8 @@ def get_meta_atual(user_id):
             return jsonify({'mensagem': 'Nenhuma meta definida para o mês atual'}), 404
         
         # Calcular progresso
-        receitas = db.session.query(func.sum(Transacao.valor)).filter(
-            Transacao.id_usuario == user_id,
-            Transacao.tipo == 'receita',
-            extract('month', Transacao.data_transacao) == hoje.month,
-            extract('year', Transacao.data_transacao) == hoje.year
-        ).scalar() or 0
-        
-        despesas = db.session.query(func.sum(Transacao.valor)).filter(
-            Transacao.id_usuario == user_id,
-            Transacao.tipo == 'despesa',
-            extract('month', Transacao.data_transacao) == hoje.month,
-            extract('year', Transacao.data_transacao) == hoje.year
-        ).scalar() or 0
-        
-        economia_atual = float(receitas) - float(despesas)
-        progresso_percentual = (economia_atual / float(meta_atual.valor_meta)) * 100 if meta_atual.valor_meta > 0 else 0
+        receitas, despesas = resumo.totais_mes(user_id, hoje.year, hoje.month)
+        economia_atual, progresso_percentual = progresso.calcular(meta_atual.valor_meta, receitas, despesas)
         
         return jsonify({
             'meta': meta_atual.to_dict(),
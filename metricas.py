@@ -0,0 +1,224 @@
+from bisect import bisect_left
+from flask import g, request, has_app_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+# Instrumentação das requisições e do SQL, exposta em /api/metrics no
+# formato texto do Prometheus. Cada requisição registra a latência por rota
+# (a regra da URL, não o caminho, para a cardinalidade ficar fixa), o status
+# e quantas consultas SQL fez e quanto tempo gastou nelas; os eventos de
+# cursor de todas as engines (principal, leitura e shards) alimentam o
+# histograma por tipo de comando e o log de consultas lentas, que mostra o
+# SQL com placeholders e só os tipos dos parâmetros.
+#
+# Com vários workers (gunicorn), defina METRICAS_DIR: cada processo grava
+# seus números num arquivo próprio a cada poucos segundos e /api/metrics
+# soma todos, como o modo multiprocess do cliente oficial.
+
+LIMITES = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+AJUDA = {
+    'cfl_requisicao_segundos': ('histogram', 'Latência das requisições HTTP por rota'),
+    'cfl_requisicoes_total': ('counter', 'Requisições HTTP por rota e status'),
+    'cfl_sql_consultas_total': ('counter', 'Comandos SQL executados por rota'),
+    'cfl_sql_rota_segundos_total': ('counter', 'Tempo gasto em SQL por rota'),
+    'cfl_sql_segundos': ('histogram', 'Latência dos comandos SQL por tipo'),
+    'cfl_sql_lentas_total': ('counter', 'Comandos SQL acima do limite de lentidão'),
+}
+
+FORA_DE_REQUISICAO = '-'
+
+_log_lentas = logging.getLogger('src.sql_lenta')
+
+_lock = threading.Lock()
+_histogramas = {}
+_contadores = {}
+_config = {'lenta': 0.2, 'diretorio': None, 'intervalo_gravacao': 5.0}
+_ultima_gravacao = 0.0
+
+def _observar(nome, rotulos, valor):
+    with _lock:
+        item = _histogramas.get((nome, rotulos))
+        if item is None:
+            item = _histogramas[(nome, rotulos)] = [[0] * (len(LIMITES) + 1), 0.0, 0]
+        item[0][bisect_left(LIMITES, valor)] += 1
+        item[1] += valor
+        item[2] += 1
+
+def _somar(nome, rotulos, valor=1):
+    with _lock:
+        _contadores[(nome, rotulos)] = _contadores.get((nome, rotulos), 0) + valor
+
+def _operacao(comando):
+    return comando.lstrip().split(None, 1)[0].upper() if comando.strip() else 'OUTRO'
+
+def _redigir(comando, parametros, executemany):
+    # Nada de valores no log: SQL com placeholders e os tipos dos parâmetros
+    texto = re.sub(r'\s+', ' ', comando).strip()[:500]
+    if executemany:
+        return f'{texto} [executemany: {len(parametros)} linhas]'
+    if isinstance(parametros, dict):
+        tipos = {chave: type(valor).__name__ for chave, valor in parametros.items()}
+    else:
+        tipos = [type(valor).__name__ for valor in parametros or ()]
+    return f'{texto} {tipos}'
+
+def _antes_cursor(conexao, cursor, comando, parametros, contexto, executemany):
+    conexao.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+def _depois_cursor(conexao, cursor, comando, parametros, contexto, executemany):
+    duracao = time.perf_counter() - conexao.info['metricas_inicio'].pop()
+    operacao = _operacao(comando)
+    _observar('cfl_sql_segundos', (('operacao', operacao),), duracao)
+
+    # Dentro de uma requisição os totais vão para a rota em after_request
+    acumulado = g.get('metricas_sql') if has_app_context() else None
+    if acumulado is not None:
+        acumulado[0] += 1
+        acumulado[1] += duracao
+    else:
+        _somar('cfl_sql_consultas_total', (('rota', FORA_DE_REQUISICAO),))
+        _somar('cfl_sql_rota_segundos_total', (('rota', FORA_DE_REQUISICAO),), duracao)
+
+    if duracao >= _config['lenta']:
+        _somar('cfl_sql_lentas_total', (('operacao', operacao),))
+        _log_lentas.warning('SQL lenta (%.1f ms): %s', duracao * 1000, _redigir(comando, parametros, executemany))
+
+def _erro_cursor(contexto):
+    # Comando que falhou não passa por after_cursor_execute
+    if contexto.connection is not None and contexto.connection.info.get('metricas_inicio'):
+        contexto.connection.info['metricas_inicio'].pop()
+
+def _rota():
+    return request.url_rule.rule if request.url_rule is not None else 'sem_rota'
+
+def _iniciar_requisicao():
+    g.metricas_inicio = time.perf_counter()
+    g.metricas_sql = [0, 0.0]
+
+def registrar_requisicao(metodo, rota, status, duracao, consultas=0, tempo_sql=0.0):
+    _observar('cfl_requisicao_segundos', (('metodo', metodo), ('rota', rota)), duracao)
+    _somar('cfl_requisicoes_total', (('metodo', metodo), ('rota', rota), ('status', str(status))))
+    _somar('cfl_sql_consultas_total', (('rota', rota),), consultas)
+    _somar('cfl_sql_rota_segundos_total', (('rota', rota),), tempo_sql)
+
+def _finalizar_requisicao(resposta):
+    inicio = g.pop('metricas_inicio', None)
+    if inicio is None:
+        return resposta
+    consultas, tempo_sql = g.pop('metricas_sql')
+    registrar_requisicao(request.method, _rota(), resposta.status_code, time.perf_counter() - inicio, consultas, tempo_sql)
+    _gravar_periodicamente()
+    return resposta
+
+def _estado():
+    with _lock:
+        return {
+            'histogramas': [[nome, list(rotulos), list(item[0]), item[1], item[2]] for (nome, rotulos), item in _histogramas.items()],
+            'contadores': [[nome, list(rotulos), valor] for (nome, rotulos), valor in _contadores.items()],
+        }
+
+def gravar():
+    # Arquivo do processo, trocado de forma atômica para leitura concorrente
+    diretorio = _config['diretorio']
+    if not diretorio:
+        return
+    os.makedirs(diretorio, exist_ok=True)
+    destino = os.path.join(diretorio, f'metricas_{os.getpid()}.json')
+    with open(destino + '.tmp', 'w') as arquivo:
+        json.dump(_estado(), arquivo)
+    os.replace(destino + '.tmp', destino)
+
+def _gravar_periodicamente():
+    global _ultima_gravacao
+    agora = time.monotonic()
+    if _config['diretorio'] and agora - _ultima_gravacao >= _config['intervalo_gravacao']:
+        _ultima_gravacao = agora
+        gravar()
+
+def limpar_diretorio():
+    # Chamado pelo master ao subir: arquivos de uma execução anterior não contam
+    diretorio = _config['diretorio']
+    if diretorio and os.path.isdir(diretorio):
+        for nome in os.listdir(diretorio):
+            if nome.startswith('metricas_'):
+                os.remove(os.path.join(diretorio, nome))
+
+def _estados():
+    if not _config['diretorio']:
+        return [_estado()]
+    gravar()
+    estados = []
+    for nome in os.listdir(_config['diretorio']):
+        if nome.startswith('metricas_') and nome.endswith('.json'):
+            try:
+                with open(os.path.join(_config['diretorio'], nome)) as arquivo:
+                    estados.append(json.load(arquivo))
+            except (OSError, ValueError):
+                continue
+    return estados
+
+def _rotulos(pares):
+    if not pares:
+        return ''
+    texto = ','.join(
+        '{}="{}"'.format(chave, str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for chave, valor in pares
+    )
+    return '{' + texto + '}'
+
+def exposicao():
+    histogramas = {}
+    contadores = {}
+    for estado in _estados():
+        for nome, rotulos, baldes, soma, contagem in estado['histogramas']:
+            chave = (nome, tuple(map(tuple, rotulos)))
+            item = histogramas.setdefault(chave, [[0] * len(baldes), 0.0, 0])
+            item[0] = [atual + novo for atual, novo in zip(item[0], baldes)]
+            item[1] += soma
+            item[2] += contagem
+        for nome, rotulos, valor in estado['contadores']:
+            chave = (nome, tuple(map(tuple, rotulos)))
+            contadores[chave] = contadores.get(chave, 0) + valor
+
+    linhas = []
+    for nome, (tipo, ajuda) in AJUDA.items():
+        linhas.append(f'# HELP {nome} {ajuda}')
+        linhas.append(f'# TYPE {nome} {tipo}')
+        if tipo == 'histogram':
+            for (nome_item, rotulos), (baldes, soma, contagem) in sorted(histogramas.items()):
+                if nome_item != nome:
+                    continue
+                acumulado = 0
+                for limite, quantidade in zip(LIMITES + ('+Inf',), baldes):
+                    acumulado += quantidade
+                    linhas.append(f'{nome}_bucket{_rotulos(rotulos + (("le", limite),))} {acumulado}')
+                linhas.append(f'{nome}_sum{_rotulos(rotulos)} {soma}')
+                linhas.append(f'{nome}_count{_rotulos(rotulos)} {contagem}')
+        else:
+            for (nome_item, rotulos), valor in sorted(contadores.items()):
+                if nome_item == nome:
+                    linhas.append(f'{nome}{_rotulos(rotulos)} {valor}')
+    return '\n'.join(linhas) + '\n'
+
+def resposta():
+    return Response(exposicao(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def configurar(app):
+    _config['lenta'] = app.config.get('METRICAS_SQL_LENTA_MS', 200) / 1000
+    _config['diretorio'] = app.config.get('METRICAS_DIR')
+    if not app.config.get('METRICAS_ATIVAS', True):
+        return
+
+    # No Engine (classe) para cobrir todas as engines, inclusive as criadas depois
+    event.listen(Engine, 'before_cursor_execute', _antes_cursor)
+    event.listen(Engine, 'after_cursor_execute', _depois_cursor)
+    event.listen(Engine, 'handle_error', _erro_cursor)
+    app.before_request(_iniciar_requisicao)
+    app.after_request(_finalizar_requisicao)
@@ -1,16 +1,31 @@
 from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
 from src.models.user import Missao, db
-from datetime import datetime, date, timedelta
+from src.utils import cache, regras_missoes, serializacao
+from src.utils.armazenamento import sessao_leitura
+from datetime import datetime, date
+from sqlalchemy import select
 
 missao_bp = Blueprint('missao', __name__)
 
+def consulta_missoes(user_id):
+    # Compartilhadas entre a rota WSGI e o modo ASGI
+    return select(*serializacao.colunas(Missao)).where(Missao.id_usuario == user_id).order_by(Missao.data_criacao.desc())
+
+def consulta_missoes_ativas(user_id, hoje):
+    return select(*serializacao.colunas(Missao)).where(
+        Missao.id_usuario == user_id,
+        Missao.status == 'pendente',
+        Missao.data_fim >= hoje
+    )
+
 @missao_bp.route('/missoes/<int:user_id>', methods=['GET'])
 @cross_origin()
+@cache.em_cache('missoes')
 def get_missoes(user_id):
     try:
-        missoes = Missao.query.filter_by(id_usuario=user_id).order_by(Missao.data_criacao.desc()).all()
-        return jsonify([missao.to_dict() for missao in missoes]), 200
+        missoes = serializacao.executar(sessao_leitura(), Missao, consulta_missoes(user_id))
+        return serializacao.resposta(missoes)
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
@@ -18,14 +33,8 @@ def get_missoes(user_id):
 @cross_origin()
 def get_missoes_ativas(user_id):
     try:
-        hoje = date.today()
-        missoes_ativas = Missao.query.filter(
-            Missao.id_usuario == user_id,
-            Missao.status == 'pendente',
-            Missao.data_fim >= hoje
-        ).all()
-        
-        return jsonify([missao.to_dict() for missao in missoes_ativas]), 200
+        missoes_ativas = serializacao.executar(sessao_leitura(), Missao, consulta_missoes_ativas(user_id, date.today()))
+        return serializacao.resposta(missoes_ativas)
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
@@ -46,6 +55,7 @@ def criar_missao():
         
         db.session.add(missao)
         db.session.commit()
+        cache.invalidar(missao.id_usuario)
         
         return jsonify({
             'mensagem': 'Missão criada com sucesso',
@@ -66,6 +76,7 @@ def concluir_missao(missao_id):
         missao.data_conclusao = datetime.utcnow()
         
         db.session.commit()
+        cache.invalidar(missao.id_usuario)
         
         return jsonify({
             'mensagem': 'Missão concluída com sucesso!',
@@ -82,53 +93,23 @@ def concluir_missao(missao_id):
 def gerar_missoes_semanais(user_id):
     try:
         hoje = date.today()
-        inicio_semana = hoje - timedelta(days=hoje.weekday())
-        fim_semana = inicio_semana + timedelta(days=6)
+        inicio_semana, _ = regras_missoes.semana(hoje)
         
-        # Verificar se já existem missões para esta semana
-        missoes_existentes = Missao.query.filter(
-            Missao.id_usuario == user_id,
-            Missao.data_inicio >= inicio_semana,
-            Missao.data_fim <= fim_semana,
-            Missao.tipo == 'semanal'
-        ).count()
-        
-        if missoes_existentes > 0:
+        # Mesmo INSERT ... SELECT idempotente da geração em lote, para um usuário
+        if regras_missoes.gerar_para_usuario(user_id, hoje) == 0:
             return jsonify({'mensagem': 'Missões semanais já foram geradas'}), 200
         
-        # Missões semanais padrão
-        missoes_padrao = [
-            {
-                'descricao': 'Registrar despesas por 5 dias seguidos',
-                'tipo': 'semanal',
-                'recompensa': 'Medalha de Disciplina'
-            },
-            {
-                'descricao': 'Não ultrapassar o orçamento de alimentação',
-                'tipo': 'semanal',
-                'recompensa': 'Medalha de Controle'
-            },
-            {
-                'descricao': 'Economizar pelo menos R$ 50 esta semana',
-                'tipo': 'semanal',
-                'recompensa': 'Medalha de Economia'
-            }
-        ]
+        # Dados já lançados na semana contam para as missões recém-criadas
+        regras_missoes.avaliar(user_id, inicio_semana)
         
-        missoes_criadas = []
-        for missao_data in missoes_padrao:
-            missao = Missao(
-                id_usuario=user_id,
-                descricao=missao_data['descricao'],
-                tipo=missao_data['tipo'],
-                data_inicio=inicio_semana,
-                data_fim=fim_semana,
-                recompensa=missao_data['recompensa']
-            )
-            db.session.add(missao)
-            missoes_criadas.append(missao)
+        missoes_criadas = Missao.query.filter(
+            Missao.id_usuario == user_id,
+            Missao.data_inicio == inicio_semana,
+            Missao.tipo == 'semanal'
+        ).order_by(Missao.id).all()
         
         db.session.commit()
+        cache.invalidar(user_id)
         
         return jsonify({
             'mensagem': 'Missões semanais geradas com sucesso',
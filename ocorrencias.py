@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+from sqlalchemy import select, func, case, cast, literal, null, or_, type_coerce, Integer, Float, Date
+from src.models.user import Recorrencia
+
+# Ocorrências das regras de recorrência, expandidas na própria consulta por
+# uma CTE recursiva: cada regra começa na primeira ocorrência dentro da
+# janela pedida e avança um passo por linha até o fim da janela, da regra ou
+# o dia de hoje (ocorrências futuras não contam, como uma transação ainda não
+# lançada). Nada é gravado em transacoes, então criar, alterar ou encerrar
+# uma regra não reescreve o histórico.
+#
+# Mensal e anual repetem o dia de data_inicio, limitado ao último dia do mês
+# (31 vira 30 ou 28/29; 29/02 anual vira 28/02 nos anos comuns).
+
+FREQUENCIAS = ('semanal', 'mensal', 'anual')
+
+def _data_ocorrencia(data_inicio, frequencia, n):
+    meses = n * case((frequencia == 'anual', 12), else_=1)
+    dia = cast(func.strftime('%d', data_inicio), Integer)
+    mensal = func.min(
+        func.date(data_inicio, 'start of month', func.printf('+%d months', meses), func.printf('+%d days', dia - 1)),
+        func.date(data_inicio, 'start of month', func.printf('+%d months', meses + 1), '-1 day')
+    )
+    return case(
+        (frequencia == 'semanal', func.date(data_inicio, func.printf('+%d days', n * 7))),
+        else_=mensal
+    )
+
+def _primeira(inicio):
+    # Número da primeira ocorrência que pode cair a partir de inicio
+    if inicio is None:
+        return literal(0)
+    dias = cast(func.julianday(literal(inicio.isoformat())) - func.julianday(Recorrencia.data_inicio), Integer)
+    meses = (inicio.year * 12 + inicio.month - 1) - (
+        cast(func.strftime('%Y', Recorrencia.data_inicio), Integer) * 12
+        + cast(func.strftime('%m', Recorrencia.data_inicio), Integer) - 1
+    )
+    return func.max(0, case(
+        (Recorrencia.frequencia == 'semanal', dias // 7),
+        (Recorrencia.frequencia == 'anual', meses // 12),
+        else_=meses
+    ))
+
+def expandir(inicio=None, fim=None, *filtros, nome='ocorrencias', correlacionar=()):
+    # Ocorrências com data em [inicio, fim) das regras que passam nos
+    # filtros, com as colunas de uma transação mais id_recorrencia.
+    # correlacionar: tabelas da consulta externa citadas nos filtros
+    limite = date.today() + timedelta(days=1)
+    if fim is not None:
+        limite = min(limite, fim)
+    limite = literal(limite.isoformat())
+
+    condicoes = [*filtros, Recorrencia.data_inicio < limite]
+    if inicio is not None:
+        condicoes.append(or_(Recorrencia.data_fim.is_(None), Recorrencia.data_fim >= inicio))
+
+    n = _primeira(inicio)
+    base = select(
+        Recorrencia.id,
+        Recorrencia.id_usuario,
+        Recorrencia.tipo,
+        Recorrencia.valor,
+        Recorrencia.categoria,
+        Recorrencia.descricao,
+        Recorrencia.frequencia,
+        Recorrencia.data_inicio,
+        func.min(func.coalesce(func.date(Recorrencia.data_fim, '+1 day'), limite), limite).label('limite'),
+        n.label('n'),
+        _data_ocorrencia(Recorrencia.data_inicio, Recorrencia.frequencia, n).label('data_transacao')
+    ).where(*condicoes)
+    if correlacionar:
+        base = base.correlate(*correlacionar)
+    base = base.cte(nome, recursive=True, nesting=True)
+
+    proxima = base.c.n + 1
+    cte = base.union_all(select(
+        *[coluna for coluna in base.c if coluna.key not in ('n', 'data_transacao')],
+        proxima,
+        _data_ocorrencia(base.c.data_inicio, base.c.frequencia, proxima)
+    ).where(base.c.data_transacao < base.c.limite))
+
+    # Ocorrências não têm linha própria nem id: a chave é (id_recorrencia,
+    # ocorrencia), o número da ocorrência a partir de data_inicio
+    consulta = select(
+        cte.c.id_usuario,
+        cte.c.tipo,
+        cte.c.valor,
+        cte.c.categoria,
+        type_coerce(cte.c.data_transacao, Date).label('data_transacao'),
+        cte.c.descricao,
+        cte.c.id.label('id_recorrencia'),
+        cte.c.n.label('ocorrencia')
+    ).where(cte.c.data_transacao < cte.c.limite)
+    if inicio is not None:
+        consulta = consulta.where(cte.c.data_transacao >= literal(inicio.isoformat()))
+
+    # nesting: o WITH fica dentro da subconsulta, e um UPDATE que a usa
+    # continua começando por UPDATE (o sqlite3 só conta as linhas assim)
+    return consulta.subquery(f'{nome}_expandidas')
+
+def na_listagem(ocorrencias):
+    # Colunas na ordem de serializacao.colunas(Transacao), para o UNION ALL
+    # com as transações gravadas; id fica nulo
+    return [
+        null().label('id'),
+        ocorrencias.c.id_usuario,
+        ocorrencias.c.tipo,
+        cast(ocorrencias.c.valor, Float).label('valor'),
+        ocorrencias.c.categoria,
+        ocorrencias.c.data_transacao,
+        ocorrencias.c.descricao,
+        null().label('data_criacao'),
+        ocorrencias.c.id_recorrencia,
+        ocorrencias.c.ocorrencia,
+    ]
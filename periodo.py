@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+from sqlalchemy import and_
+
+# Períodos são sempre intervalos semiabertos [inicio, fim) sobre a coluna de
+# data, para que o SQLite consiga usar os índices (id_usuario, data_*)
+# em vez de avaliar extract() linha a linha.
+
+def intervalo_mes(ano, mes):
+    inicio = date(ano, mes, 1)
+    if mes == 12:
+        fim = date(ano + 1, 1, 1)
+    else:
+        fim = date(ano, mes + 1, 1)
+    return inicio, fim
+
+def intervalo_ano(ano):
+    return date(ano, 1, 1), date(ano + 1, 1, 1)
+
+def intervalo_semana(dia):
+    inicio = dia - timedelta(days=dia.weekday())
+    return inicio, inicio + timedelta(days=7)
+
+def intervalo(ano=None, mes=None, semana=None):
+    if semana is not None:
+        return intervalo_semana(semana)
+    if ano is not None and mes is not None:
+        return intervalo_mes(ano, mes)
+    if ano is not None:
+        return intervalo_ano(ano)
+    raise ValueError('Período inválido: informe ano, ano e mês, ou uma data da semana')
+
+def filtro_periodo(coluna, inicio, fim):
+    return and_(coluna >= inicio, coluna < fim)
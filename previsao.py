@@ -0,0 +1,146 @@
+import calendar
+import math
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, func, case, cast, union_all, Integer, Float
+from sqlalchemy.dialects.sqlite import insert
+from src.models.user import Previsao, ResumoDiario, Meta, db
+from src.utils import cache, shards, ocorrencias
+
+# Previsão da economia no fim do mês e da chance de bater a meta. O cálculo
+# roda em lote para todos os usuários: um extrato colunar do resumo diário
+# do mês vira uma matriz usuários x dias em NumPy, sem laço por usuário.
+# O resultado fica em previsoes, lido pelo dashboard com uma busca por chave.
+#
+# Modelo: receitas já lançadas contam como estão (salário costuma cair uma
+# vez no mês), inclusive as ocorrências de recorrências até hoje; as despesas dos dias restantes seguem a média e o desvio
+# padrão diários observados até hoje.
+
+TAMANHO_LOTE = 5000
+
+def _normal_acumulada(np, x):
+    # Φ(x) pela aproximação de Abramowitz e Stegun (7.1.26), vetorizada
+    z = np.abs(x) / math.sqrt(2)
+    t = 1 / (1 + 0.3275911 * z)
+    polinomio = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1 - polinomio * np.exp(-z * z)
+    return 0.5 * (1 + np.sign(x) * erf)
+
+def _extrato(inicio, fim):
+    # Uma linha por usuário/dia com receitas e despesas, já como float e
+    # tuplas simples para a conversão direta em array. As ocorrências das
+    # recorrências entram como os rollups, igual a resumo.consulta_totais_mes,
+    # para a previsão partir do mesmo saldo que o dashboard mostra
+    expandidas = ocorrencias.expandir(inicio, fim + timedelta(days=1))
+    valores = union_all(
+        select(ResumoDiario.id_usuario, ResumoDiario.data, ResumoDiario.tipo, ResumoDiario.total).where(
+            ResumoDiario.data >= inicio,
+            ResumoDiario.data <= fim
+        ),
+        select(expandidas.c.id_usuario, expandidas.c.data_transacao, expandidas.c.tipo, expandidas.c.valor)
+    ).subquery('valores')
+    resultado = db.session.execute(select(
+        valores.c.id_usuario,
+        cast(func.strftime('%d', valores.c.data), Integer),
+        cast(func.sum(case((valores.c.tipo == 'receita', valores.c.total), else_=0)), Float),
+        cast(func.sum(case((valores.c.tipo == 'despesa', valores.c.total), else_=0)), Float)
+    ).group_by(valores.c.id_usuario, valores.c.data))
+    return [tuple(linha) for linha in resultado]
+
+def calcular(np, linhas, metas, dias_decorridos, dias_no_mes):
+    # linhas: (id_usuario, dia, receitas, despesas); metas: (id_usuario, valor_meta)
+    colunas = np.array(linhas, dtype=float).reshape(-1, 4)
+    metas = np.array(metas, dtype=float).reshape(-1, 2)
+
+    # Usuários com movimento no mês ou com meta definida (mesmo sem movimento)
+    usuarios = np.union1d(colunas[:, 0], metas[:, 0]).astype(np.int64)
+    posicao = np.searchsorted(usuarios, colunas[:, 0].astype(np.int64))
+    dias = colunas[:, 1].astype(np.int64) - 1
+
+    receitas = np.bincount(posicao, weights=colunas[:, 2], minlength=len(usuarios))
+    despesas = np.zeros((len(usuarios), dias_decorridos))
+    np.add.at(despesas, (posicao, dias), colunas[:, 3])
+
+    economia_atual = receitas - despesas.sum(axis=1)
+    media = despesas.mean(axis=1)
+    desvio_diario = despesas.std(axis=1, ddof=1) if dias_decorridos > 1 else np.zeros(len(usuarios))
+
+    restantes = dias_no_mes - dias_decorridos
+    economia_prevista = economia_atual - media * restantes
+    desvio = desvio_diario * math.sqrt(restantes)
+
+    valor_meta = np.full(len(usuarios), np.nan)
+    valor_meta[np.searchsorted(usuarios, metas[:, 0].astype(np.int64))] = metas[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        probabilidade = np.where(
+            desvio > 0,
+            1 - _normal_acumulada(np, (valor_meta - economia_prevista) / desvio),
+            (economia_prevista >= valor_meta).astype(float)
+        )
+    probabilidade = np.where(np.isnan(valor_meta), np.nan, probabilidade)
+
+    return usuarios, economia_atual, economia_prevista, desvio, probabilidade
+
+def _upsert():
+    # Insert de tabela (Core) para que o executemany vá num único comando
+    stmt = insert(Previsao.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=['id_usuario', 'ano', 'mes'],
+        set_={coluna: getattr(stmt.excluded, coluna) for coluna in (
+            'economia_atual', 'economia_prevista', 'desvio', 'probabilidade_meta', 'data_calculo'
+        )}
+    )
+
+def calcular_mes(hoje=None):
+    import numpy as np
+
+    hoje = hoje or date.today()
+    dias_no_mes = calendar.monthrange(hoje.year, hoje.month)[1]
+    linhas = _extrato(hoje.replace(day=1), hoje)
+    metas = [tuple(linha) for linha in db.session.execute(
+        select(Meta.id_usuario, cast(Meta.valor_meta, Float)).where(Meta.ano == hoje.year, Meta.mes == hoje.month)
+    )]
+    if not linhas and not metas:
+        return 0
+
+    usuarios, economia_atual, economia_prevista, desvio, probabilidade = calcular(
+        np, linhas, metas, hoje.day, dias_no_mes
+    )
+
+    agora = datetime.utcnow()
+    registros = [
+        {
+            'id_usuario': int(usuario),
+            'ano': hoje.year,
+            'mes': hoje.month,
+            'economia_atual': round(float(atual), 2),
+            'economia_prevista': round(float(prevista), 2),
+            'desvio': round(float(dp), 2),
+            'probabilidade_meta': None if np.isnan(chance) else round(float(chance), 4),
+            'data_calculo': agora
+        }
+        for usuario, atual, prevista, dp, chance in zip(
+            usuarios.tolist(), economia_atual.tolist(), economia_prevista.tolist(), desvio.tolist(), probabilidade.tolist()
+        )
+    ]
+    for posicao in range(0, len(registros), TAMANHO_LOTE):
+        db.session.execute(_upsert(), registros[posicao:posicao + TAMANHO_LOTE])
+    db.session.commit()
+    return len(registros)
+
+def calcular_todas(hoje=None):
+    if not shards.ativo():
+        total = calcular_mes(hoje)
+    else:
+        total = 0
+        for indice in range(shards.total()):
+            with shards.usar_shard(indice):
+                total += calcular_mes(hoje)
+    cache.invalidar_todos()
+    return total
+
+def consulta_previsao(id_usuario, ano, mes):
+    return select(Previsao).where(
+        Previsao.id_usuario == id_usuario,
+        Previsao.ano == ano,
+        Previsao.mes == mes
+    )
@@ -0,0 +1,104 @@
+from sqlalchemy import select, update, func, case, and_, extract, type_coerce, Float
+from src.models.user import Meta, ResumoMensal, Recorrencia, db
+from src.utils import alteracoes, cache, shards, serializacao, ocorrencias
+
+# Progresso das metas a partir dos rollups mensais: uma consulta agrupada
+# por meta, em vez de um totais_mes por meta listada. As ocorrências das
+# recorrências entram como um segundo join, já agregadas por mês.
+
+def _recorrencias(*filtros):
+    # Ocorrências das recorrências dos donos das metas, já somadas por mês
+    # (no máximo uma linha por meta no join, então max() não duplica)
+    expandidas = ocorrencias.expandir(None, None, Recorrencia.id_usuario.in_(select(Meta.id_usuario).where(*filtros)))
+    ano = extract('year', expandidas.c.data_transacao)
+    mes = extract('month', expandidas.c.data_transacao)
+    return select(
+        expandidas.c.id_usuario,
+        ano.label('ano'),
+        mes.label('mes'),
+        func.sum(case((expandidas.c.tipo == 'receita', expandidas.c.valor), else_=0)).label('receitas'),
+        func.sum(case((expandidas.c.tipo == 'despesa', expandidas.c.valor), else_=0)).label('despesas')
+    ).group_by(expandidas.c.id_usuario, ano, mes).subquery('recorrentes')
+
+def _totais(recorrentes):
+    receitas = func.coalesce(func.sum(case((ResumoMensal.tipo == 'receita', ResumoMensal.total), else_=0)), 0)
+    despesas = func.coalesce(func.sum(case((ResumoMensal.tipo == 'despesa', ResumoMensal.total), else_=0)), 0)
+    receitas = receitas + func.coalesce(func.max(recorrentes.c.receitas), 0)
+    despesas = despesas + func.coalesce(func.max(recorrentes.c.despesas), 0)
+    return receitas, despesas
+
+def _com_resumos(consulta, recorrentes):
+    return consulta.outerjoin(ResumoMensal, and_(
+        ResumoMensal.id_usuario == Meta.id_usuario,
+        ResumoMensal.ano == Meta.ano,
+        ResumoMensal.mes == Meta.mes
+    )).outerjoin(recorrentes, and_(
+        recorrentes.c.id_usuario == Meta.id_usuario,
+        recorrentes.c.ano == Meta.ano,
+        recorrentes.c.mes == Meta.mes
+    )).group_by(Meta.id)
+
+def consulta_progresso(*filtros):
+    # Colunas da meta mais os totais do mês, para serializacao.linhas()
+    recorrentes = _recorrencias(*filtros)
+    receitas, despesas = _totais(recorrentes)
+    return _com_resumos(select(
+        *serializacao.colunas(Meta),
+        type_coerce(receitas, Float).label('receitas'),
+        type_coerce(despesas, Float).label('despesas')
+    ).where(*filtros), recorrentes)
+
+def calcular(valor_meta, receitas, despesas):
+    economia_atual = float(receitas) - float(despesas)
+    progresso_percentual = (economia_atual / float(valor_meta)) * 100 if valor_meta > 0 else 0
+    return economia_atual, progresso_percentual
+
+def com_progresso(dados):
+    # Totais em centavos, como no Numeric(12,2) dos rollups
+    receitas, despesas = round(dados.pop('receitas'), 2), round(dados.pop('despesas'), 2)
+    economia_atual, progresso_percentual = calcular(dados['valor_meta'], receitas, despesas)
+    dados['progresso'] = round(min(progresso_percentual, 100), 2)
+    dados['economia_atual'] = economia_atual
+    return dados
+
+def recalcular(*filtros):
+    # Mesma regra de calcular(), em SQL: um UPDATE ... FROM sobre o agrupamento
+    recorrentes = _recorrencias(*filtros)
+    receitas, despesas = _totais(recorrentes)
+    percentual = case(
+        (Meta.valor_meta > 0, (receitas - despesas) * 100.0 / Meta.valor_meta),
+        else_=0
+    )
+    valores = _com_resumos(select(
+        Meta.id,
+        func.round(case((percentual > 100, 100), else_=percentual), 2).label('progresso')
+    ).where(*filtros), recorrentes).subquery()
+
+    alteradas = (
+        Meta.id == valores.c.id,
+        func.coalesce(Meta.progresso, -1) != valores.c.progresso
+    )
+    usuarios = db.session.execute(select(Meta.id_usuario).where(*alteradas).distinct()).scalars().all()
+    if not usuarios:
+        return 0
+
+    alteracoes.registrar_em_massa(Meta, 'upsert', *alteradas)
+    resultado = db.session.execute(
+        update(Meta).where(*alteradas).values(progresso=valores.c.progresso),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+
+    for id_usuario in usuarios:
+        cache.invalidar(id_usuario)
+    return resultado.rowcount
+
+def recalcular_todas():
+    if not shards.ativo():
+        return recalcular()
+
+    total = 0
+    for indice in range(shards.total()):
+        with shards.usar_shard(indice):
+            total += recalcular()
+    return total
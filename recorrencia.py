@@ -0,0 +1,124 @@
+from flask import Blueprint, jsonify, request
+from flask_cors import cross_origin
+from src.models.user import Recorrencia, db
+from src.utils import cache, serializacao, ocorrencias
+from src.utils.armazenamento import sessao_leitura
+from datetime import datetime
+from sqlalchemy import select
+
+recorrencia_bp = Blueprint('recorrencia', __name__)
+
+def _ler_data(valor, nome):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        raise ValueError(f'Campo {nome} deve estar no formato AAAA-MM-DD')
+
+def _validar(recorrencia):
+    if recorrencia.tipo not in ('receita', 'despesa'):
+        raise ValueError("Campo tipo deve ser 'receita' ou 'despesa'")
+    if recorrencia.frequencia not in ocorrencias.FREQUENCIAS:
+        raise ValueError(f"Campo frequencia deve ser um de: {', '.join(ocorrencias.FREQUENCIAS)}")
+    if float(recorrencia.valor) <= 0:
+        raise ValueError('Campo valor deve ser maior que zero')
+    if recorrencia.data_fim is not None and recorrencia.data_fim < recorrencia.data_inicio:
+        raise ValueError('Campo data_fim não pode ser anterior a data_inicio')
+
+@recorrencia_bp.route('/recorrencias/<int:user_id>', methods=['GET'])
+@cross_origin()
+@cache.em_cache('recorrencias')
+def get_recorrencias(user_id):
+    try:
+        consulta = select(*serializacao.colunas(Recorrencia)).where(
+            Recorrencia.id_usuario == user_id
+        ).order_by(Recorrencia.data_inicio.desc(), Recorrencia.id.desc())
+        recorrencias = serializacao.executar(sessao_leitura(), Recorrencia, consulta)
+        return serializacao.resposta(recorrencias)
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@recorrencia_bp.route('/recorrencias', methods=['POST'])
+@cross_origin()
+def criar_recorrencia():
+    try:
+        data = request.json
+
+        recorrencia = Recorrencia(
+            id_usuario=data['id_usuario'],
+            tipo=data['tipo'],
+            valor=data['valor'],
+            categoria=data['categoria'],
+            descricao=data.get('descricao', ''),
+            frequencia=data.get('frequencia', 'mensal'),
+            data_inicio=_ler_data(data['data_inicio'], 'data_inicio'),
+            data_fim=_ler_data(data['data_fim'], 'data_fim') if data.get('data_fim') else None
+        )
+        _validar(recorrencia)
+
+        db.session.add(recorrencia)
+        db.session.commit()
+        cache.invalidar(recorrencia.id_usuario)
+
+        return jsonify({
+            'mensagem': 'Recorrência criada com sucesso',
+            'recorrencia': recorrencia.to_dict()
+        }), 201
+
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 500
+
+@recorrencia_bp.route('/recorrencias/<int:recorrencia_id>', methods=['PUT'])
+@cross_origin()
+def atualizar_recorrencia(recorrencia_id):
+    try:
+        recorrencia = Recorrencia.query.get_or_404(recorrencia_id)
+        data = request.json
+
+        # Alterar a regra muda também as ocorrências passadas; para mudar só
+        # daqui em diante, encerre esta (data_fim) e crie outra
+        recorrencia.tipo = data.get('tipo', recorrencia.tipo)
+        recorrencia.valor = data.get('valor', recorrencia.valor)
+        recorrencia.categoria = data.get('categoria', recorrencia.categoria)
+        recorrencia.descricao = data.get('descricao', recorrencia.descricao)
+        recorrencia.frequencia = data.get('frequencia', recorrencia.frequencia)
+
+        if 'data_inicio' in data:
+            recorrencia.data_inicio = _ler_data(data['data_inicio'], 'data_inicio')
+        if 'data_fim' in data:
+            recorrencia.data_fim = _ler_data(data['data_fim'], 'data_fim') if data['data_fim'] else None
+        _validar(recorrencia)
+
+        db.session.commit()
+        cache.invalidar(recorrencia.id_usuario)
+
+        return jsonify({
+            'mensagem': 'Recorrência atualizada com sucesso',
+            'recorrencia': recorrencia.to_dict()
+        }), 200
+
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 500
+
+@recorrencia_bp.route('/recorrencias/<int:recorrencia_id>', methods=['DELETE'])
+@cross_origin()
+def deletar_recorrencia(recorrencia_id):
+    try:
+        recorrencia = Recorrencia.query.get_or_404(recorrencia_id)
+        user_id = recorrencia.id_usuario
+        db.session.delete(recorrencia)
+        db.session.commit()
+        cache.invalidar(user_id)
+
+        return jsonify({'mensagem': 'Recorrência deletada com sucesso'}), 200
+
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'erro': str(e)}), 500
@@ -0,0 +1,292 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import select, insert, update, union_all, literal, func, true
+from src.models.user import Missao, Recorrencia, ResumoDiario, Usuario, db
+from src.utils import alteracoes, cache, shards, ocorrencias
+from src.utils.periodo import intervalo_semana
+
+# Motor de missões: cada missão semanal padrão tem uma regra que olha só o
+# resumo diário da própria semana (no máximo 7 dias x categorias), mais as
+# ocorrências das recorrências que caem nela, como no dashboard. As
+# escritas em transações chamam avaliar() com as datas afetadas, na mesma
+# transação; nada relê o histórico de transações. Geração e encerramento
+# das semanas para todos os usuários são feitos em SQL, por conjunto.
+
+ORCAMENTO_ALIMENTACAO_SEMANAL = Decimal(os.environ.get('ORCAMENTO_ALIMENTACAO_SEMANAL', '150'))
+
+def _total(linhas, tipo, categoria=None):
+    return sum(
+        (linha.total for linha in linhas if linha.tipo == tipo and categoria in (None, linha.categoria)),
+        Decimal('0')
+    )
+
+def _soma_semana(periodo, tipo, categoria=None):
+    # Total da semana da missão externa: resumo diário mais as ocorrências
+    # das recorrências do usuário. periodo (inicio, fim) cobre todas as
+    # semanas encerradas juntas e só limita a expansão
+    filtros = [
+        ResumoDiario.id_usuario == Missao.id_usuario,
+        ResumoDiario.tipo == tipo,
+        ResumoDiario.data >= Missao.data_inicio,
+        ResumoDiario.data <= Missao.data_fim
+    ]
+    regras = [Recorrencia.id_usuario == Missao.id_usuario, Recorrencia.tipo == tipo]
+    if categoria is not None:
+        filtros.append(ResumoDiario.categoria == categoria)
+        regras.append(Recorrencia.categoria == categoria)
+    expandidas = ocorrencias.expandir(*periodo, *regras, nome=f'ocorrencias_{tipo}', correlacionar=(Missao,))
+    gravadas = select(func.coalesce(func.sum(ResumoDiario.total), 0)).where(*filtros).scalar_subquery()
+    recorrentes = select(func.coalesce(func.sum(expandidas.c.valor), 0)).where(
+        expandidas.c.data_transacao >= Missao.data_inicio,
+        expandidas.c.data_transacao <= Missao.data_fim
+    ).scalar_subquery()
+    return gravadas + recorrentes
+
+def dias_seguidos_com_despesa(minimo):
+    def regra(missao, linhas, encerrada):
+        dias = {linha.data for linha in linhas if linha.tipo == 'despesa' and linha.quantidade > 0}
+        seguidos = 0
+        dia = missao.data_inicio
+        while dia <= missao.data_fim:
+            seguidos = seguidos + 1 if dia in dias else 0
+            if seguidos >= minimo:
+                return True
+            dia += timedelta(days=1)
+        return False
+    # Sem condição final: a sequência é reconhecida na escrita que a completa
+    regra.condicao_final = None
+    return regra
+
+def orcamento_categoria(categoria, limite):
+    # Só dá para afirmar que o orçamento foi respeitado quando a semana acaba
+    def regra(missao, linhas, encerrada):
+        return encerrada and _total(linhas, 'despesa', categoria) <= limite
+    regra.condicao_final = lambda periodo: _soma_semana(periodo, 'despesa', categoria) <= limite
+    return regra
+
+def economia_minima(valor):
+    # Como o orçamento: uma despesa no fim da semana ainda pode derrubar a
+    # economia, então só conta a semana encerrada
+    def regra(missao, linhas, encerrada):
+        return encerrada and _total(linhas, 'receita') - _total(linhas, 'despesa') >= valor
+    regra.condicao_final = lambda periodo: _soma_semana(periodo, 'receita') - _soma_semana(periodo, 'despesa') >= valor
+    return regra
+
+MISSOES_SEMANAIS = [
+    {
+        'descricao': 'Registrar despesas por 5 dias seguidos',
+        'tipo': 'semanal',
+        'recompensa': 'Medalha de Disciplina',
+        'regra': dias_seguidos_com_despesa(5)
+    },
+    {
+        'descricao': 'Não ultrapassar o orçamento de alimentação',
+        'tipo': 'semanal',
+        'recompensa': 'Medalha de Controle',
+        'regra': orcamento_categoria('Alimentação', ORCAMENTO_ALIMENTACAO_SEMANAL)
+    },
+    {
+        'descricao': 'Economizar pelo menos R$ 50 esta semana',
+        'tipo': 'semanal',
+        'recompensa': 'Medalha de Economia',
+        'regra': economia_minima(Decimal('50'))
+    },
+]
+
+# As missões são identificadas pela descrição, que é fixa para as semanais padrão
+REGRAS = {missao['descricao']: missao['regra'] for missao in MISSOES_SEMANAIS}
+
+def _resumos(ids_usuarios, inicio, fim):
+    # Ocorrências entram com quantidade 0: contam nos totais, mas não como
+    # despesa registrada pelo usuário na sequência de dias
+    expandidas = ocorrencias.expandir(inicio, fim + timedelta(days=1), Recorrencia.id_usuario.in_(ids_usuarios))
+    valores = union_all(
+        select(
+            ResumoDiario.id_usuario,
+            ResumoDiario.data,
+            ResumoDiario.tipo,
+            ResumoDiario.categoria,
+            ResumoDiario.total,
+            ResumoDiario.quantidade
+        ).where(
+            ResumoDiario.id_usuario.in_(ids_usuarios),
+            ResumoDiario.data >= inicio,
+            ResumoDiario.data <= fim
+        ),
+        select(
+            expandidas.c.id_usuario,
+            expandidas.c.data_transacao,
+            expandidas.c.tipo,
+            expandidas.c.categoria,
+            expandidas.c.valor,
+            literal(0)
+        )
+    ).subquery('valores')
+    linhas = db.session.execute(select(valores)).all()
+    por_usuario = {}
+    for linha in linhas:
+        por_usuario.setdefault(linha.id_usuario, []).append(linha)
+    return por_usuario
+
+def _aplicar(missoes, resumos, hoje):
+    concluidas = []
+    for missao in missoes:
+        linhas = [
+            linha for linha in resumos.get(missao.id_usuario, [])
+            if missao.data_inicio <= linha.data <= missao.data_fim
+        ]
+        encerrada = hoje > missao.data_fim
+        if REGRAS[missao.descricao](missao, linhas, encerrada):
+            missao.status = 'concluida'
+            missao.data_conclusao = datetime.utcnow()
+            concluidas.append(missao)
+    return concluidas
+
+def avaliar(id_usuario, *datas):
+    # Reavalia as missões pendentes cujo período contém alguma das datas
+    # escritas. Deve ser chamado depois de atualizar o resumo, antes do commit
+    datas = set(datas)
+    if not datas:
+        return []
+
+    pendentes = [
+        missao for missao in Missao.query.filter(
+            Missao.id_usuario == id_usuario,
+            Missao.status == 'pendente',
+            Missao.descricao.in_(REGRAS),
+            Missao.data_inicio <= max(datas),
+            Missao.data_fim >= min(datas)
+        )
+        if any(missao.data_inicio + timedelta(days=dia) in datas for dia in range((missao.data_fim - missao.data_inicio).days + 1))
+    ]
+    if not pendentes:
+        return []
+
+    resumos = _resumos(
+        [id_usuario],
+        min(missao.data_inicio for missao in pendentes),
+        max(missao.data_fim for missao in pendentes)
+    )
+    return _aplicar(pendentes, resumos, date.today())
+
+def semana(hoje=None):
+    inicio, proxima = intervalo_semana(hoje or date.today())
+    return inicio, proxima - timedelta(days=1)
+
+def comando_geracao(usuarios, inicio, fim, agora):
+    # INSERT ... SELECT de usuarios x missões padrão, pulando as que já
+    # existem na semana: rodar de novo não duplica nada
+    modelos = union_all(*[
+        select(
+            literal(missao['descricao']).label('descricao'),
+            literal(missao['tipo']).label('tipo'),
+            literal(missao['recompensa']).label('recompensa')
+        )
+        for missao in MISSOES_SEMANAIS
+    ]).subquery('modelos')
+
+    existente = select(Missao.id).where(
+        Missao.id_usuario == usuarios.c.id_usuario,
+        Missao.data_inicio == inicio,
+        Missao.tipo == modelos.c.tipo,
+        Missao.descricao == modelos.c.descricao
+    ).exists().correlate_except(Missao)
+
+    origem = select(
+        usuarios.c.id_usuario,
+        modelos.c.descricao,
+        modelos.c.tipo,
+        literal('pendente'),
+        literal(inicio),
+        literal(fim),
+        modelos.c.recompensa,
+        literal(agora)
+    ).select_from(usuarios.join(modelos, true())).where(~existente)
+
+    return insert(Missao).from_select(
+        ['id_usuario', 'descricao', 'tipo', 'status', 'data_inicio', 'data_fim', 'recompensa', 'data_criacao'],
+        origem
+    )
+
+def _gerar(usuarios, inicio, fim):
+    id_limite = db.session.execute(select(func.coalesce(func.max(Missao.id), 0))).scalar()
+    criadas = db.session.execute(comando_geracao(usuarios, inicio, fim, datetime.utcnow())).rowcount
+    if criadas:
+        alteracoes.registrar_em_massa(Missao, 'upsert', Missao.id > id_limite)
+    return criadas
+
+def gerar_para_usuario(user_id, hoje=None):
+    inicio, fim = semana(hoje)
+    usuarios = select(literal(user_id).label('id_usuario')).subquery('usuarios')
+    return _gerar(usuarios, inicio, fim)
+
+def gerar_semanais(hoje=None, lote=5000):
+    # Missões da semana para todos os usuários
+    inicio, fim = semana(hoje)
+    if not shards.ativo():
+        criadas = _gerar(select(Usuario.id.label('id_usuario')).subquery('usuarios'), inicio, fim)
+        db.session.commit()
+        cache.invalidar_todos()
+        return criadas
+
+    # Com shards a tabela usuarios fica no banco global: os ids de cada
+    # shard entram no INSERT como um array JSON (json_each), em lotes
+    criadas = 0
+    for indice in range(shards.total()):
+        ids = db.session.execute(
+            select(Usuario.id).where(Usuario.id % shards.total() == indice).order_by(Usuario.id)
+        ).scalars().all()
+        with shards.usar_shard(indice):
+            for posicao in range(0, len(ids), lote):
+                lista = func.json_each(json.dumps(ids[posicao:posicao + lote])).table_valued('value')
+                usuarios = select(lista.c.value.label('id_usuario')).subquery('usuarios')
+                criadas += _gerar(usuarios, inicio, fim)
+            db.session.commit()
+    cache.invalidar_todos()
+    return criadas
+
+def encerrar_vencidas(hoje=None):
+    # Fim de semana em UPDATEs por conjunto: primeiro as missões cuja
+    # condição final foi cumprida viram concluídas, depois todo o resto
+    # que passou do prazo vira expirada
+    hoje = hoje or date.today()
+    agora = datetime.utcnow()
+    vencidas = (Missao.status == 'pendente', Missao.data_fim < hoje)
+    total = 0
+
+    # Datas das semanas vencidas, para limitar a expansão das recorrências
+    inicio, fim = db.session.execute(select(func.min(Missao.data_inicio), func.max(Missao.data_fim)).where(*vencidas)).one()
+    for missao in MISSOES_SEMANAIS:
+        if missao['regra'].condicao_final is None or inicio is None:
+            continue
+        condicao = missao['regra'].condicao_final((inicio, fim + timedelta(days=1)))
+        filtros = (*vencidas, Missao.descricao == missao['descricao'], condicao)
+        alteracoes.registrar_em_massa(Missao, 'upsert', *filtros)
+        total += db.session.execute(
+            update(Missao).where(*filtros).values(status='concluida', data_conclusao=agora),
+            execution_options={'synchronize_session': False}
+        ).rowcount
+
+    alteracoes.registrar_em_massa(Missao, 'upsert', *vencidas)
+    total += db.session.execute(
+        update(Missao).where(*vencidas).values(status='expirada'),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+
+    db.session.commit()
+    if total:
+        cache.invalidar_todos()
+    return total
+
+def executar_semana():
+    # Tarefa agendada: encerra as semanas passadas e gera a atual
+    if not shards.ativo():
+        return {'encerradas': encerrar_vencidas(), 'criadas': gerar_semanais()}
+
+    encerradas = 0
+    for indice in range(shards.total()):
+        with shards.usar_shard(indice):
+            encerradas += encerrar_vencidas()
+    return {'encerradas': encerradas, 'criadas': gerar_semanais()}
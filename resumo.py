@@ -0,0 +1,207 @@
+from decimal import Decimal
+from sqlalchemy import func, extract, select, case, union_all
+from sqlalchemy.dialects.sqlite import insert
+from src.models.user import ResumoMensal, ResumoDiario, Transacao, Recorrencia, db
+from src.utils import ocorrencias
+from src.utils.periodo import intervalo_mes
+
+# Tabelas de agregados por usuário/mês e por usuário/dia (tipo/categoria),
+# mantidas na mesma transação das escritas em transacoes para que
+# dashboard, metas, relatórios e missões não precisem varrer o histórico.
+# Recorrências não entram nos rollups: as consultas de totais somam as
+# ocorrências expandidas do período (src.utils.ocorrencias).
+
+def _upsert(modelo=ResumoMensal, chave=('ano', 'mes')):
+    stmt = insert(modelo)
+    return stmt.on_conflict_do_update(
+        index_elements=['id_usuario', *chave, 'tipo', 'categoria'],
+        set_={
+            'total': modelo.__table__.c.total + stmt.excluded.total,
+            'quantidade': modelo.__table__.c.quantidade + stmt.excluded.quantidade
+        }
+    )
+
+def _upsert_diario():
+    return _upsert(ResumoDiario, ('data',))
+
+def _aplicar_delta(id_usuario, data_transacao, tipo, categoria, valor, quantidade):
+    db.session.execute(_upsert(), [{
+        'id_usuario': id_usuario,
+        'ano': data_transacao.year,
+        'mes': data_transacao.month,
+        'tipo': tipo,
+        'categoria': categoria,
+        'total': valor,
+        'quantidade': quantidade
+    }])
+    db.session.execute(_upsert_diario(), [{
+        'id_usuario': id_usuario,
+        'data': data_transacao,
+        'tipo': tipo,
+        'categoria': categoria,
+        'total': valor,
+        'quantidade': quantidade
+    }])
+
+def adicionar(transacao):
+    _aplicar_delta(
+        transacao.id_usuario,
+        transacao.data_transacao,
+        transacao.tipo,
+        transacao.categoria,
+        Decimal(str(transacao.valor)),
+        1
+    )
+
+def remover(transacao):
+    _aplicar_delta(
+        transacao.id_usuario,
+        transacao.data_transacao,
+        transacao.tipo,
+        transacao.categoria,
+        -Decimal(str(transacao.valor)),
+        -1
+    )
+
+    # Remover agregados que ficaram sem transações
+    ResumoMensal.query.filter(
+        ResumoMensal.id_usuario == transacao.id_usuario,
+        ResumoMensal.ano == transacao.data_transacao.year,
+        ResumoMensal.mes == transacao.data_transacao.month,
+        ResumoMensal.quantidade <= 0
+    ).delete(synchronize_session=False)
+    ResumoDiario.query.filter(
+        ResumoDiario.id_usuario == transacao.id_usuario,
+        ResumoDiario.data == transacao.data_transacao,
+        ResumoDiario.quantidade <= 0
+    ).delete(synchronize_session=False)
+
+def adicionar_lote(id_usuario, linhas):
+    # Agrega as linhas em memória e aplica um único upsert por grupo
+    grupos = {}
+    diarios = {}
+    for linha in linhas:
+        valor = Decimal(str(linha['valor']))
+        chave = (
+            linha['data_transacao'].year,
+            linha['data_transacao'].month,
+            linha['tipo'],
+            linha['categoria']
+        )
+        total, quantidade = grupos.get(chave, (Decimal('0'), 0))
+        grupos[chave] = (total + valor, quantidade + 1)
+
+        chave = (linha['data_transacao'], linha['tipo'], linha['categoria'])
+        total, quantidade = diarios.get(chave, (Decimal('0'), 0))
+        diarios[chave] = (total + valor, quantidade + 1)
+
+    if not grupos:
+        return
+
+    db.session.execute(_upsert(), [
+        {
+            'id_usuario': id_usuario,
+            'ano': ano,
+            'mes': mes,
+            'tipo': tipo,
+            'categoria': categoria,
+            'total': total,
+            'quantidade': quantidade
+        }
+        for (ano, mes, tipo, categoria), (total, quantidade) in grupos.items()
+    ])
+    db.session.execute(_upsert_diario(), [
+        {
+            'id_usuario': id_usuario,
+            'data': data,
+            'tipo': tipo,
+            'categoria': categoria,
+            'total': total,
+            'quantidade': quantidade
+        }
+        for (data, tipo, categoria), (total, quantidade) in diarios.items()
+    ])
+
+def limpar(id_usuario):
+    ResumoMensal.query.filter_by(id_usuario=id_usuario).delete(synchronize_session=False)
+    ResumoDiario.query.filter_by(id_usuario=id_usuario).delete(synchronize_session=False)
+
+def consulta_totais_mes(id_usuario, ano, mes):
+    # Agregação condicional: receitas e despesas em uma única consulta, com
+    # as ocorrências das recorrências do mês somadas aos rollups
+    expandidas = ocorrencias.expandir(*intervalo_mes(ano, mes), Recorrencia.id_usuario == id_usuario)
+    valores = union_all(
+        select(ResumoMensal.tipo, ResumoMensal.total).where(
+            ResumoMensal.id_usuario == id_usuario,
+            ResumoMensal.ano == ano,
+            ResumoMensal.mes == mes
+        ),
+        select(expandidas.c.tipo, expandidas.c.valor)
+    ).subquery('valores')
+    return select(
+        func.sum(case((valores.c.tipo == 'receita', valores.c.total), else_=0)),
+        func.sum(case((valores.c.tipo == 'despesa', valores.c.total), else_=0))
+    )
+
+def totais_mes(id_usuario, ano, mes, sessao=None):
+    sessao = sessao or db.session
+    receitas, despesas = sessao.execute(consulta_totais_mes(id_usuario, ano, mes)).one()
+    return float(receitas or 0), float(despesas or 0)
+
+def comandos_reconstrucao(id_usuario=None):
+    ano = extract('year', Transacao.data_transacao)
+    mes = extract('month', Transacao.data_transacao)
+    mensais = select(
+        Transacao.id_usuario,
+        ano,
+        mes,
+        Transacao.tipo,
+        Transacao.categoria,
+        func.sum(Transacao.valor),
+        func.count(Transacao.id)
+    ).group_by(
+        Transacao.id_usuario, ano, mes, Transacao.tipo, Transacao.categoria
+    )
+    diarios = select(
+        Transacao.id_usuario,
+        Transacao.data_transacao,
+        Transacao.tipo,
+        Transacao.categoria,
+        func.sum(Transacao.valor),
+        func.count(Transacao.id)
+    ).group_by(
+        Transacao.id_usuario, Transacao.data_transacao, Transacao.tipo, Transacao.categoria
+    )
+    if id_usuario is not None:
+        mensais = mensais.where(Transacao.id_usuario == id_usuario)
+        diarios = diarios.where(Transacao.id_usuario == id_usuario)
+
+    return {
+        ResumoMensal: insert(ResumoMensal).from_select(
+            ['id_usuario', 'ano', 'mes', 'tipo', 'categoria', 'total', 'quantidade'],
+            mensais
+        ),
+        ResumoDiario: insert(ResumoDiario).from_select(
+            ['id_usuario', 'data', 'tipo', 'categoria', 'total', 'quantidade'],
+            diarios
+        ),
+    }
+
+def reconstruir(id_usuario=None, modelos=(ResumoMensal, ResumoDiario)):
+    comandos = comandos_reconstrucao(id_usuario)
+    for modelo in modelos:
+        consulta = modelo.query
+        if id_usuario is not None:
+            consulta = consulta.filter_by(id_usuario=id_usuario)
+        consulta.delete(synchronize_session=False)
+
+        db.session.execute(comandos[modelo])
+
+def reconstruir_se_necessario():
+    # Bancos criados antes das tabelas de resumos precisam de carga inicial
+    if Transacao.query.first() is None:
+        return
+    vazios = [modelo for modelo in (ResumoMensal, ResumoDiario) if modelo.query.first() is None]
+    if vazios:
+        reconstruir(modelos=vazios)
+        db.session.commit()
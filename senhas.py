@@ -0,0 +1,93 @@
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+import os
+import threading
+
+# Hash de senhas fora da thread da requisição. PBKDF2/scrypt são CPU
+# intensivos; num pool de processos eles não seguram o GIL do worker e as
+# demais rotas continuam respondendo durante um pico de logins.
+
+class FilaSenhasCheia(Exception):
+    pass
+
+def _workers_padrao(processos):
+    # Os núcleos são divididos entre os workers do servidor; cpu_count em cada
+    # um deles somaria cpu² processos de hash
+    return max(1, (os.cpu_count() or 1) // max(processos, 1))
+
+_config = {
+    'metodo': os.environ.get('SENHA_HASH_METODO', 'scrypt'),
+    'workers': int(os.environ.get('SENHA_HASH_WORKERS') or _workers_padrao(int(os.environ.get('SERVIDOR_WORKERS', 1)))),
+    'max_fila': int(os.environ.get('SENHA_HASH_MAX_FILA', 64)),
+}
+
+_pool = None
+_pool_pid = None
+_prefixo = None
+_fila = 0
+_lock = threading.Lock()
+
+def configurar(metodo=None, workers=None, max_fila=None, processos=None):
+    global _pool, _prefixo
+    if metodo is not None:
+        _config['metodo'] = metodo
+        _prefixo = None
+    if workers is not None:
+        _config['workers'] = workers
+    elif processos is not None and not os.environ.get('SENHA_HASH_WORKERS'):
+        _config['workers'] = _workers_padrao(processos)
+    if max_fila is not None:
+        _config['max_fila'] = max_fila
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+            _pool = None
+
+def _obter_pool():
+    global _pool, _pool_pid
+    # Em servidores com prefork cada processo cria o seu próprio pool; o lock
+    # evita que logins simultâneos criem vários e percam todos menos um
+    with _lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ProcessPoolExecutor(max_workers=_config['workers'])
+            _pool_pid = os.getpid()
+        return _pool
+
+def _executar(funcao, *args):
+    global _fila
+    if _config['workers'] <= 0:
+        return funcao(*args)
+
+    with _lock:
+        if _fila >= _config['max_fila']:
+            raise FilaSenhasCheia('Servidor ocupado, tente novamente')
+        _fila += 1
+    try:
+        return _obter_pool().submit(funcao, *args).result()
+    finally:
+        with _lock:
+            _fila -= 1
+
+def gerar_hash(senha):
+    return _executar(generate_password_hash, senha, _config['metodo'])
+
+def verificar(senha_hash, senha):
+    return _executar(check_password_hash, senha_hash, senha)
+
+def prefixo_atual():
+    # 'scrypt' vira 'scrypt:32768:8:1'; o prefixo inclui método e custo
+    global _prefixo
+    if _prefixo is None:
+        _prefixo = generate_password_hash('', _config['metodo']).split('$', 1)[0]
+    return _prefixo
+
+def precisa_rehash(senha_hash):
+    return senha_hash.split('$', 1)[0] != prefixo_atual()
+
+def metricas():
+    return {
+        'fila': _fila,
+        'max_fila': _config['max_fila'],
+        'workers': _config['workers'],
+        'metodo': _config['metodo']
+    }
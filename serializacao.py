@@ -0,0 +1,109 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from operator import itemgetter
+from flask import current_app, request
+from sqlalchemy import Float, Numeric, cast, inspect
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Caminho rápido das listagens: em vez de hidratar objetos do ORM e chamar
+# to_dict() em cada um, a consulta seleciona as colunas e roda como Core na
+# conexão da sessão (sem identity map nem carregamento do ORM), cada linha
+# vira um dict pelos nomes das colunas e o
+# JSON sai do orjson quando instalado. Numeric chega como float, sem
+# Decimal; datas e horários são serializados pelo encoder no mesmo formato do
+# isoformat() usado nos to_dict().
+#
+# Com Accept: application/x-msgpack (e msgpack instalado) as mesmas rotas
+# respondem em MessagePack colunar: cada lista de registros vira
+# {'colunas': [...], 'valores': [[valores da coluna 1], ...]}, sem repetir
+# as chaves por linha; date e datetime usam o tipo Timestamp do
+# MessagePack (date = meia-noite UTC).
+
+MIMETYPE_MSGPACK = 'application/x-msgpack'
+
+_ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+
+def colunas(modelo):
+    # Colunas da tabela na ordem do to_dict(); Numeric vira REAL no próprio
+    # SQL (o SQLite guarda 100.0 como inteiro) e chega como float
+    return [
+        cast(coluna, Float).label(coluna.key) if isinstance(coluna.type, Numeric) else coluna
+        for coluna in modelo.__table__.c
+    ]
+
+def linhas(resultado):
+    # str(): consultas sobre UNION devolvem rótulos (subclasse de str) que o
+    # orjson não aceita como chave
+    chaves = [str(chave) for chave in resultado.keys()]
+    return [dict(zip(chaves, linha)) for linha in resultado]
+
+def executar(sessao, modelo, consulta):
+    # bind_arguments leva o mapper para que a consulta vá para o shard certo
+    conexao = sessao.connection(bind_arguments={'mapper': inspect(modelo)})
+    return linhas(conexao.execute(consulta))
+
+def _padrao(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f'Tipo não serializável: {type(valor).__name__}')
+
+def dumps(dados):
+    if orjson is not None:
+        return orjson.dumps(dados, default=_padrao)
+    return json.dumps(dados, default=_padrao, ensure_ascii=False, separators=(',', ':')).encode()
+
+def _colunar(dados):
+    if isinstance(dados, dict):
+        return {chave: _colunar(valor) for chave, valor in dados.items()}
+    if isinstance(dados, list) and all(isinstance(item, dict) for item in dados):
+        colunas = list(dados[0]) if dados else []
+        if len(colunas) == 1:
+            return {'colunas': colunas, 'valores': [[linha[colunas[0]] for linha in dados]]}
+        valores = zip(*map(itemgetter(*colunas), dados)) if colunas else []
+        return {'colunas': colunas, 'valores': [list(coluna) for coluna in valores]}
+    return dados
+
+def _padrao_msgpack(valor):
+    # Horários são UTC sem tzinfo em todo o app; a conta é feita à mão por ser
+    # bem mais barata que aritmética de timedelta por valor
+    if isinstance(valor, date):
+        segundos = (valor.toordinal() - _ORDINAL_EPOCA) * 86400
+        if isinstance(valor, datetime):
+            return msgpack.Timestamp(
+                segundos + valor.hour * 3600 + valor.minute * 60 + valor.second,
+                valor.microsecond * 1000
+            )
+        return msgpack.Timestamp(segundos, 0)
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f'Tipo não serializável: {type(valor).__name__}')
+
+def formatos():
+    return ['application/json', MIMETYPE_MSGPACK] if msgpack is not None else ['application/json']
+
+def formato(aceitos):
+    # aceitos: cabeçalho Accept já interpretado; JSON quando nada casar
+    return 'msgpack' if aceitos.best_match(formatos()) == MIMETYPE_MSGPACK else 'json'
+
+def codificar(dados, formato='json'):
+    if formato == 'msgpack':
+        return msgpack.packb(_colunar(dados), default=_padrao_msgpack), MIMETYPE_MSGPACK
+    return dumps(dados), 'application/json'
+
+def resposta(dados, status=200):
+    corpo, mimetype = codificar(dados, formato(request.accept_mimetypes))
+    resposta = current_app.response_class(corpo, status=status, mimetype=mimetype)
+    resposta.vary.add('Accept')
+    return resposta
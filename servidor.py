@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import sys
+# DON'T CHANGE THIS !!!
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from gunicorn.app.base import BaseApplication
+
+# Servidor de produção: gunicorn com workers pré-forkados a partir de um
+# master que já importou o app, então subir ou reiniciar um worker é só um
+# fork. O schema não é criado aqui; rode uma vez por deploy:
+#
+#     flask --app src.main preparar-banco
+#     python -m src.servidor                      (WSGI, app Flask)
+#     SERVIDOR_MODO=asgi python -m src.servidor   (ASGI, src.asgi)
+
+def opcoes():
+    modo = os.environ.get('SERVIDOR_MODO', 'wsgi')
+    threads = int(os.environ.get('SERVIDOR_THREADS', 1))
+    
+    if modo == 'asgi':
+        classe_worker = 'uvicorn.workers.UvicornWorker'
+    else:
+        classe_worker = 'gthread' if threads > 1 else 'sync'
+    
+    return {
+        'bind': os.environ.get('SERVIDOR_BIND', '0.0.0.0:5000'),
+        'workers': int(os.environ.get('SERVIDOR_WORKERS', multiprocessing.cpu_count() * 2 + 1)),
+        'threads': threads,
+        'worker_class': classe_worker,
+        'timeout': int(os.environ.get('SERVIDOR_TIMEOUT', 30)),
+        'graceful_timeout': int(os.environ.get('SERVIDOR_GRACEFUL_TIMEOUT', 30)),
+        'max_requests': int(os.environ.get('SERVIDOR_MAX_REQUESTS', 0)),
+        'max_requests_jitter': int(os.environ.get('SERVIDOR_MAX_REQUESTS_JITTER', 0)),
+        'preload_app': True,
+        'post_fork': _apos_fork,
+        'when_ready': _ao_iniciar,
+    }
+
+def _ao_iniciar(servidor):
+    # Tarefas periódicas rodam só no master, uma vez por máquina; as métricas
+    # gravadas por workers de uma execução anterior são descartadas
+    from src.main import app
+    from src.utils import agendador, metricas
+    metricas.limpar_diretorio()
+    agendador.iniciar(app)
+
+def _apos_fork(servidor, worker):
+    # Conexões abertas no master não podem ser compartilhadas entre processos
+    from src.main import app
+    from src.models.user import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+class Servidor(BaseApplication):
+    def __init__(self, aplicacao, opcoes):
+        self.aplicacao = aplicacao
+        self.opcoes = opcoes
+        super().__init__()
+    
+    def load_config(self):
+        for chave, valor in self.opcoes.items():
+            self.cfg.set(chave, valor)
+    
+    def load(self):
+        return self.aplicacao
+
+def main():
+    configuracao = opcoes()
+    
+    # Importa antes do fork: blueprints, modelos e engines ficam prontos no master
+    if configuracao['worker_class'].startswith('uvicorn'):
+        from src.asgi import app
+    else:
+        from src.main import app
+    
+    # O cache em memória é por processo: com mais de um worker ele não vê as
+    # invalidações dos outros, nem as das tarefas do agendador, que rodam no
+    # master (_ao_iniciar) mesmo com um único worker
+    from src.main import app as flask_app
+    from src.utils import agendador, cache, senhas
+    processos = configuracao['workers'] + (1 if agendador.tarefas() else 0)
+    cache.configurar(flask_app, processos)
+    # O pool de hash de senhas também é por processo: divide os núcleos entre os workers
+    senhas.configurar(processos=configuracao['workers'])
+    
+    Servidor(app, configuracao).run()
+
+if __name__ == '__main__':
+    main()
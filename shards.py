@@ -0,0 +1,186 @@
+from contextlib import contextmanager
+from flask import g, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, insert, select, func, text, inspect
+import os
+
+# Particionamento opcional por usuário. A tabela usuarios fica no banco
+# principal (diretório global); as tabelas com id_usuario vão para um de
+# N arquivos SQLite escolhido por id_usuario % N. Os ids de cada shard
+# começam em indice * FAIXA_IDS, então rotas que recebem só o id de um
+# registro (/transacoes/<id>, /metas/<id>, ...) acham o shard pelo próprio id.
+
+FAIXA_IDS = 10 ** 12
+
+_total = int(os.environ.get('SHARDS', 0))
+_diretorio = os.environ.get('SHARD_DIR')
+
+def ativo():
+    return _total > 0
+
+def total():
+    return _total
+
+def shard_do_usuario(user_id):
+    return int(user_id) % _total
+
+def shard_do_id(id_registro):
+    return int(id_registro) // FAIXA_IDS
+
+def tabelas_particionadas():
+    from src.models.user import db
+    return [
+        tabela for tabela in db.metadata.sorted_tables
+        if 'id_usuario' in tabela.c and tabela.name != 'usuarios'
+    ]
+
+def url_shard(diretorio, indice):
+    return f"sqlite:///{os.path.join(diretorio, f'shard_{indice}.db')}"
+
+def binds(diretorio_padrao, opcoes):
+    global _diretorio
+    if not ativo():
+        return {}
+    _diretorio = _diretorio or diretorio_padrao
+    os.makedirs(_diretorio, exist_ok=True)
+    return {
+        f'shard_{indice}': {'url': url_shard(_diretorio, indice), **opcoes}
+        for indice in range(_total)
+    }
+
+def selecionar(user_id):
+    if ativo():
+        g.shard = shard_do_usuario(user_id)
+
+def shard_atual():
+    indice = g.get('shard')
+    if indice is None:
+        raise RuntimeError('Nenhum shard selecionado para esta operação')
+    return indice
+
+@contextmanager
+def usar_shard(indice):
+    anterior = g.get('shard')
+    g.shard = indice
+    try:
+        yield
+    finally:
+        g.shard = anterior
+
+def _tabela(mapper, clause):
+    if mapper is not None:
+        return inspect(mapper).local_table
+    return getattr(clause, 'table', None)
+
+class SessaoParticionada(Session):
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and ativo():
+            tabela = _tabela(mapper, clause)
+            if tabela is not None and 'id_usuario' in tabela.c and tabela.name != 'usuarios':
+                return self._db.engines[f'shard_{shard_atual()}']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _selecionar_shard_da_requisicao():
+    argumentos = request.view_args or {}
+    if 'user_id' in argumentos:
+        g.shard = shard_do_usuario(argumentos['user_id'])
+        return
+    for nome in ('transacao_id', 'meta_id', 'missao_id', 'recorrencia_id'):
+        if nome in argumentos:
+            g.shard = shard_do_id(argumentos[nome])
+            return
+    dados = request.get_json(silent=True)
+    if isinstance(dados, dict) and dados.get('id_usuario') is not None:
+        g.shard = shard_do_usuario(dados['id_usuario'])
+
+def configurar(app):
+    if ativo():
+        app.before_request(_selecionar_shard_da_requisicao)
+
+def criar_shard(engine, indice, sequencia_alteracoes=0):
+    from src.models.user import db
+    tabelas = tabelas_particionadas()
+    db.metadata.create_all(engine, tables=tabelas)
+
+    with engine.begin() as conexao:
+        for tabela in tabelas:
+            if not tabela.kwargs.get('sqlite_autoincrement'):
+                continue
+            base = sequencia_alteracoes if tabela.name == 'alteracoes' else indice * FAIXA_IDS
+            conexao.execute(text(
+                'INSERT INTO sqlite_sequence (name, seq) '
+                'SELECT :nome, :seq WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = :nome)'
+            ), {'nome': tabela.name, 'seq': base})
+
+def criar_shards():
+    from src.models.user import db
+    for indice in range(_total):
+        criar_shard(db.engines[f'shard_{indice}'], indice)
+
+def migrar(origens, diretorio_destino, total_destino, lote=1000):
+    # Copia os dados de usuário das origens (app.db ou shards atuais) para
+    # total_destino shards novos. Os registros recebem ids na faixa do
+    # shard de destino; o log de alterações ganha um tombstone para o id
+    # antigo e um upsert para o novo, para que clientes sincronizados
+    # convirjam sem precisar de uma carga completa.
+    from src.models.user import Transacao, Meta, Missao, Configuracao, Recorrencia, Alteracao
+    from src.utils import resumo
+
+    os.makedirs(diretorio_destino, exist_ok=True)
+    sequencia = 0
+    for origem in origens:
+        with origem.connect() as conexao:
+            sequencia = max(sequencia, conexao.execute(select(func.max(Alteracao.id))).scalar() or 0)
+
+    destinos = [create_engine(url_shard(diretorio_destino, indice)) for indice in range(total_destino)]
+    for indice, destino in enumerate(destinos):
+        criar_shard(destino, indice, sequencia)
+
+    entidades = [
+        (Transacao, 'transacao'),
+        (Meta, 'meta'),
+        (Missao, 'missao'),
+        (Configuracao, 'configuracao'),
+        (Recorrencia, 'recorrencia'),
+    ]
+    copiados = {nome: 0 for _, nome in entidades}
+
+    for origem in origens:
+        with origem.connect() as conexao_origem:
+            for modelo, nome in entidades:
+                tabela = modelo.__table__
+                resultado = conexao_origem.execution_options(yield_per=lote).execute(
+                    select(tabela).order_by(tabela.c.id)
+                )
+                for particao in resultado.partitions():
+                    por_destino = {}
+                    for linha in particao:
+                        dados = dict(linha._mapping)
+                        por_destino.setdefault(dados['id_usuario'] % total_destino, []).append(dados)
+
+                    for indice, linhas in por_destino.items():
+                        ids_antigos = [dados.pop('id') for dados in linhas]
+                        with destinos[indice].begin() as conexao:
+                            novos_ids = conexao.execute(
+                                insert(tabela).returning(tabela.c.id, sort_by_parameter_order=True),
+                                linhas
+                            ).scalars().all()
+                            conexao.execute(insert(Alteracao.__table__), [
+                                registro
+                                for dados, antigo, novo in zip(linhas, ids_antigos, novos_ids)
+                                for registro in (
+                                    {'id_usuario': dados['id_usuario'], 'entidade': nome, 'id_registro': antigo, 'operacao': 'delete'},
+                                    {'id_usuario': dados['id_usuario'], 'entidade': nome, 'id_registro': novo, 'operacao': 'upsert'},
+                                )
+                                if antigo != novo or registro['operacao'] == 'upsert'
+                            ])
+                        copiados[nome] += len(linhas)
+
+    for destino in destinos:
+        with destino.begin() as conexao:
+            for comando in resumo.comandos_reconstrucao().values():
+                conexao.execute(comando)
+        destino.dispose()
+
+    return copiados
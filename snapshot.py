@@ -0,0 +1,288 @@
+import json
+import os
+import re
+import shutil
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import select, func, case, cast, Integer
+from src.models.user import Transacao, db
+from src.utils import shards
+
+# Snapshot analítico das transações em arquivos colunares mapeados em
+# memória. Cada coluna é um arquivo binário de tipo fixo; a categoria é
+# codificada por dicionário. As consultas entre usuários (mix de
+# categorias, gasto médio, retenção) rodam em NumPy sobre os mmaps, sem
+# hidratar objetos do ORM e sem tocar no banco em uso.
+#
+# Layout de cada versão (diretório <versao>/):
+#   id_usuario.bin  int32   usuário
+#   dia.bin         int32   dias desde 1970-01-01 (compatível com datetime64[D])
+#   centavos.bin    int64   valor em centavos
+#   tipo.bin        uint8   0 = receita, 1 = despesa
+#   categoria.bin   uint16  código em categorias (manifesto)
+# O manifesto atual.json aponta para a versão publicada e é trocado de forma
+# atômica; leitores com a versão anterior aberta continuam válidos.
+
+TAMANHO_LOTE = 100000
+
+# Versões mantidas em disco após publicar: a nova e a anterior, que
+# leitores abertos antes da troca ainda podem estar usando
+VERSOES_MANTIDAS = 2
+
+# Nome dos diretórios de versão (datetime.utcnow() em %Y%m%dT%H%M%S%f);
+# qualquer outra coisa no diretório não é tocada
+_VERSAO = re.compile(r'\d{8}T\d{12}')
+
+TIPOS = ('receita', 'despesa')
+
+COLUNAS = {
+    'id_usuario': 'int32',
+    'dia': 'int32',
+    'centavos': 'int64',
+    'tipo': 'uint8',
+    'categoria': 'uint16',
+}
+
+# Chaves de agrupamento aceitas por somar(); semana/mes/ano derivam de dia
+CHAVES = ('id_usuario', 'tipo', 'categoria', 'dia', 'semana', 'mes', 'ano')
+
+def diretorio_padrao():
+    return current_app.config['SNAPSHOT_DIR']
+
+def _engines():
+    if shards.ativo():
+        return [db.engines[f'shard_{indice}'] for indice in range(shards.total())]
+    # O pool somente leitura, quando existe, evita disputar conexões com as escritas
+    return [db.engines.get('leitura', db.engine)]
+
+def _consulta():
+    return select(
+        Transacao.id_usuario,
+        cast(func.julianday(Transacao.data_transacao) - 2440587.5, Integer),
+        cast(func.round(Transacao.valor * 100), Integer),
+        case((Transacao.tipo == 'despesa', 1), else_=0),
+        Transacao.categoria
+    )
+
+def gerar(diretorio=None):
+    import numpy as np
+
+    diretorio = diretorio or diretorio_padrao()
+    versao = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    destino = os.path.join(diretorio, versao)
+    os.makedirs(destino)
+
+    categorias = {}
+    linhas = 0
+    arquivos = {nome: open(os.path.join(destino, f'{nome}.bin'), 'wb') for nome in COLUNAS}
+    try:
+        for engine in _engines():
+            # Um único SELECT por conexão: leitura consistente mesmo com escritas em WAL
+            with engine.connect() as conexao:
+                resultado = conexao.execute(_consulta())
+                while True:
+                    lote = resultado.fetchmany(TAMANHO_LOTE)
+                    if not lote:
+                        break
+                    usuarios, dias, centavos, tipos, nomes = zip(*lote)
+                    codigos = [categorias.setdefault(nome, len(categorias)) for nome in nomes]
+                    if len(categorias) > np.iinfo(np.uint16).max + 1:
+                        raise ValueError('Categorias demais para o snapshot (limite de 65536)')
+
+                    for nome, valores in (
+                        ('id_usuario', usuarios), ('dia', dias), ('centavos', centavos),
+                        ('tipo', tipos), ('categoria', codigos)
+                    ):
+                        np.asarray(valores, dtype=COLUNAS[nome]).tofile(arquivos[nome])
+                    linhas += len(lote)
+    except Exception:
+        for arquivo in arquivos.values():
+            arquivo.close()
+        shutil.rmtree(destino, ignore_errors=True)
+        raise
+    for arquivo in arquivos.values():
+        arquivo.close()
+
+    manifesto = {
+        'versao': versao,
+        'linhas': linhas,
+        'colunas': COLUNAS,
+        'categorias': list(categorias),
+        'gerado_em': datetime.utcnow().isoformat(),
+    }
+    with open(os.path.join(destino, 'manifesto.json'), 'w') as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False)
+
+    # Publica a nova versão e remove as antigas
+    temporario = os.path.join(diretorio, 'atual.json.tmp')
+    with open(temporario, 'w') as arquivo:
+        json.dump({'versao': versao}, arquivo)
+    os.replace(temporario, os.path.join(diretorio, 'atual.json'))
+    _remover_antigas(diretorio, versao)
+
+    return linhas
+
+def _remover_antigas(diretorio, versao):
+    versoes = sorted(
+        nome for nome in os.listdir(diretorio)
+        if _VERSAO.fullmatch(nome) and nome <= versao and os.path.isdir(os.path.join(diretorio, nome))
+    )
+    for nome in versoes[:-VERSOES_MANTIDAS]:
+        shutil.rmtree(os.path.join(diretorio, nome), ignore_errors=True)
+
+class Snapshot:
+    def __init__(self, np, diretorio):
+        with open(os.path.join(diretorio, 'atual.json')) as arquivo:
+            versao = json.load(arquivo)['versao']
+        pasta = os.path.join(diretorio, versao)
+        with open(os.path.join(pasta, 'manifesto.json')) as arquivo:
+            manifesto = json.load(arquivo)
+
+        self.np = np
+        self.versao = versao
+        self.linhas = manifesto['linhas']
+        self.categorias = manifesto['categorias']
+        self.gerado_em = manifesto['gerado_em']
+        self._codigos = {nome: codigo for codigo, nome in enumerate(self.categorias)}
+        self.colunas = {
+            nome: (
+                np.memmap(os.path.join(pasta, f'{nome}.bin'), dtype=tipo, mode='r', shape=(self.linhas,))
+                if self.linhas else np.empty(0, dtype=tipo)
+            )
+            for nome, tipo in manifesto['colunas'].items()
+        }
+
+    def filtrar(self, id_usuario=None, usuarios=None, tipo=None, categoria=None, data_inicio=None, data_fim=None):
+        # Máscara booleana das linhas que atendem a todos os filtros (None = todas)
+        np = self.np
+        mascara = None
+
+        def combinar(condicao):
+            nonlocal mascara
+            mascara = condicao if mascara is None else mascara & condicao
+
+        if id_usuario is not None:
+            combinar(self.colunas['id_usuario'] == id_usuario)
+        if usuarios is not None:
+            combinar(np.isin(self.colunas['id_usuario'], np.asarray(list(usuarios), dtype=np.int32)))
+        if tipo is not None:
+            if tipo not in TIPOS:
+                raise ValueError('Tipo deve ser receita ou despesa')
+            combinar(self.colunas['tipo'] == TIPOS.index(tipo))
+        if categoria is not None:
+            codigo = self._codigos.get(categoria)
+            combinar(
+                self.colunas['categoria'] == codigo if codigo is not None
+                else np.zeros(self.linhas, dtype=bool)
+            )
+        if data_inicio is not None:
+            combinar(self.colunas['dia'] >= _dia(data_inicio))
+        if data_fim is not None:
+            combinar(self.colunas['dia'] <= _dia(data_fim))
+        return mascara
+
+    def _chave(self, nome, linhas):
+        # Valores inteiros da chave de agrupamento para as linhas selecionadas
+        np = self.np
+        if nome in ('id_usuario', 'tipo', 'categoria', 'dia'):
+            coluna = self.colunas[nome]
+            return coluna if linhas is None else coluna[linhas]
+        dias = self.colunas['dia'] if linhas is None else self.colunas['dia'][linhas]
+        if nome == 'semana':
+            # Semanas começando na segunda-feira (1970-01-01 foi uma quinta)
+            return (dias.astype(np.int64) + 3) // 7
+        if nome == 'mes':
+            return dias.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        return dias.astype('datetime64[D]').astype('datetime64[Y]').astype(np.int64)
+
+    def _rotulo(self, nome, valor):
+        np = self.np
+        if nome == 'tipo':
+            return TIPOS[valor]
+        if nome == 'categoria':
+            return self.categorias[valor]
+        if nome == 'dia':
+            return str(np.datetime64(valor, 'D'))
+        if nome == 'semana':
+            return str(np.datetime64(valor * 7 - 3, 'D'))
+        if nome == 'mes':
+            return str(np.datetime64(valor, 'M'))
+        if nome == 'ano':
+            return 1970 + valor
+        return valor
+
+    def somar(self, por=(), **filtros):
+        # Soma e contagem agrupadas por qualquer combinação de CHAVES
+        np = self.np
+        for nome in por:
+            if nome not in CHAVES:
+                raise ValueError(f"Chave de agrupamento inválida: {nome}")
+
+        mascara = self.filtrar(**filtros)
+        linhas = None if mascara is None else np.flatnonzero(mascara)
+        centavos = self.colunas['centavos'] if linhas is None else self.colunas['centavos'][linhas]
+
+        # Chave composta em base mista: cada chave vira um código 0..n-1
+        codigo = np.zeros(len(centavos), dtype=np.int64)
+        bases = []
+        combinacoes = 1
+        for nome in por:
+            valores = self._chave(nome, linhas)
+            minimo = int(valores.min()) if len(valores) else 0
+            maximo = int(valores.max()) if len(valores) else 0
+            base = maximo - minimo + 1
+            combinacoes *= base
+            if combinacoes >= 2 ** 62:
+                raise ValueError('Agrupamento com combinações demais')
+            codigo = codigo * base + (valores.astype(np.int64) - minimo)
+            bases.append((nome, minimo, base))
+
+        # Espaço de chaves denso usa bincount direto; esparso é compactado antes
+        if combinacoes <= max(4 * len(codigo), 1 << 16):
+            totais = np.bincount(codigo, weights=centavos, minlength=combinacoes)
+            quantidades = np.bincount(codigo, minlength=combinacoes)
+            grupos = np.flatnonzero(quantidades)
+            totais, quantidades = totais[grupos], quantidades[grupos]
+        else:
+            grupos, inverso = np.unique(codigo, return_inverse=True)
+            totais = np.bincount(inverso, weights=centavos)
+            quantidades = np.bincount(inverso)
+
+        # Decodifica as chaves em lote; cada valor distinto ganha rótulo uma vez só
+        rotulos = {}
+        restante = grupos
+        for nome, minimo, base in reversed(bases):
+            restante, posicao = np.divmod(restante, base)
+            distintos, indices = np.unique(posicao + minimo, return_inverse=True)
+            nomes = np.array([self._rotulo(nome, valor) for valor in distintos.tolist()], dtype=object)
+            rotulos[nome] = nomes[indices].tolist()
+
+        campos = (*por, 'total', 'quantidade')
+        colunas = [rotulos[nome] for nome in por] + [np.round(totais / 100, 2).tolist(), quantidades.tolist()]
+        return [dict(zip(campos, linha)) for linha in zip(*colunas)]
+
+    def usuarios_ativos(self, por='mes', **filtros):
+        # Usuários distintos com transação em cada período (base para retenção)
+        np = self.np
+        if por not in ('dia', 'semana', 'mes', 'ano'):
+            raise ValueError('Período inválido. Use dia, semana, mes ou ano')
+        mascara = self.filtrar(**filtros)
+        linhas = None if mascara is None else np.flatnonzero(mascara)
+        periodos = self._chave(por, linhas)
+        usuarios = self._chave('id_usuario', linhas)
+        # Par (período, usuário) numa só chave int64 para o unique ser um sort simples
+        pares = np.unique((periodos.astype(np.int64) << 32) | usuarios.astype(np.int64))
+        periodo, contagem = np.unique(pares >> 32, return_counts=True)
+        return [
+            {por: self._rotulo(por, valor), 'usuarios': quantidade}
+            for valor, quantidade in zip(periodo.tolist(), contagem.tolist())
+        ]
+
+def _dia(valor):
+    if isinstance(valor, str):
+        valor = date.fromisoformat(valor)
+    return (valor - date(1970, 1, 1)).days
+
+def abrir(diretorio=None):
+    import numpy as np
+    return Snapshot(np, diretorio or diretorio_padrao())
@@ -0,0 +1,98 @@
+from flask import Blueprint, jsonify, request
+from flask_cors import cross_origin
+from src.models.user import Transacao, Meta, Missao, Configuracao, Recorrencia, Alteracao
+from src.utils.armazenamento import sessao_leitura
+from sqlalchemy import func
+
+sync_bp = Blueprint('sync', __name__)
+
+LIMITE_PADRAO = 1000
+LIMITE_MAXIMO = 5000
+
+COLECOES = {
+    'transacao': ('transacoes', Transacao),
+    'meta': ('metas', Meta),
+    'missao': ('missoes', Missao),
+    'configuracao': ('configuracoes', Configuracao),
+    'recorrencia': ('recorrencias', Recorrencia),
+}
+
+def _resposta_vazia(cursor):
+    return {
+        'cursor': cursor,
+        'completo': False,
+        'tem_mais': False,
+        'alteracoes': {colecao: [] for colecao, _ in COLECOES.values()},
+        'removidos': {colecao: [] for colecao, _ in COLECOES.values()}
+    }
+
+def _cursor_atual(user_id):
+    return sessao_leitura().query(func.max(Alteracao.id)).filter(
+        Alteracao.id_usuario == user_id
+    ).scalar() or 0
+
+def _snapshot(user_id):
+    # Primeira sincronização: estado completo da conta e o cursor atual
+    resposta = _resposta_vazia(_cursor_atual(user_id))
+    resposta['completo'] = True
+    for colecao, modelo in COLECOES.values():
+        registros = sessao_leitura().query(modelo).filter_by(id_usuario=user_id).order_by(modelo.id).all()
+        resposta['alteracoes'][colecao] = [registro.to_dict() for registro in registros]
+    return resposta
+
+def _delta(user_id, since, limite):
+    alteracoes = sessao_leitura().query(Alteracao).filter(
+        Alteracao.id_usuario == user_id,
+        Alteracao.id > since
+    ).order_by(Alteracao.id).limit(limite + 1).all()
+    
+    tem_mais = len(alteracoes) > limite
+    alteracoes = alteracoes[:limite]
+    
+    resposta = _resposta_vazia(alteracoes[-1].id if alteracoes else since)
+    resposta['tem_mais'] = tem_mais
+    
+    # Apenas a última operação de cada registro importa
+    ultima_operacao = {}
+    for alteracao in alteracoes:
+        ultima_operacao[(alteracao.entidade, alteracao.id_registro)] = alteracao.operacao
+    
+    for entidade, (colecao, modelo) in COLECOES.items():
+        ids_alterados = {
+            id_registro for (nome, id_registro), operacao in ultima_operacao.items()
+            if nome == entidade and operacao == 'upsert'
+        }
+        ids_removidos = {
+            id_registro for (nome, id_registro), operacao in ultima_operacao.items()
+            if nome == entidade and operacao == 'delete'
+        }
+        
+        if ids_alterados:
+            registros = sessao_leitura().query(modelo).filter(
+                modelo.id_usuario == user_id,
+                modelo.id.in_(ids_alterados)
+            ).all()
+            resposta['alteracoes'][colecao] = [registro.to_dict() for registro in registros]
+            # Registros que sumiram depois do cursor lido também viram tombstone
+            ids_removidos |= ids_alterados - {registro.id for registro in registros}
+        
+        resposta['removidos'][colecao] = sorted(ids_removidos)
+    
+    return resposta
+
+@sync_bp.route('/sync/<int:user_id>', methods=['GET'])
+@cross_origin()
+def sincronizar(user_id):
+    try:
+        since = request.args.get('since', 0, type=int)
+        limite = request.args.get('limit', LIMITE_PADRAO, type=int)
+        limite = max(1, min(limite, LIMITE_MAXIMO))
+        
+        # Cursor desconhecido (ex.: dados migrados de shard) exige carga completa
+        if since <= 0 or since > _cursor_atual(user_id):
+            return jsonify(_snapshot(user_id)), 200
+        
+        return jsonify(_delta(user_id, since, limite)), 200
+        
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
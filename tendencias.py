@@ -0,0 +1,156 @@
+from flask import Blueprint, jsonify, request
+from flask_cors import cross_origin
+from src.models.user import ResumoDiario
+from src.utils import cache
+from src.utils.armazenamento import sessao_leitura
+from sqlalchemy import select, func, case, literal
+from datetime import datetime, date, timedelta
+
+tendencias_bp = Blueprint('tendencias', __name__)
+
+JANELA_PADRAO = 3
+LIMITE_PERIODOS = 1000
+
+def _voltar_meses(dia, meses):
+    total = dia.year * 12 + dia.month - 1 - meses
+    return date(total // 12, total % 12 + 1, 1)
+
+# granularidade: (início do período que contém a data, passo do calendário,
+# expressão SQL que leva uma data ao início do seu período, intervalo padrão)
+GRANULARIDADES = {
+    'dia': (
+        lambda dia: dia,
+        '+1 day',
+        lambda coluna: func.date(coluna),
+        lambda fim: fim - timedelta(days=29)
+    ),
+    'semana': (
+        lambda dia: dia - timedelta(days=dia.weekday()),
+        '+7 days',
+        lambda coluna: func.date(coluna, 'weekday 0', '-6 days'),
+        lambda fim: fim - timedelta(weeks=11)
+    ),
+    'mes': (
+        lambda dia: dia.replace(day=1),
+        '+1 month',
+        lambda coluna: func.strftime('%Y-%m-01', coluna),
+        lambda fim: _voltar_meses(fim, 11)
+    ),
+    'ano': (
+        lambda dia: dia.replace(month=1, day=1),
+        '+1 year',
+        lambda coluna: func.strftime('%Y-01-01', coluna),
+        lambda fim: date(fim.year - 4, 1, 1)
+    ),
+}
+
+def _ler_data(valor, nome):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Parâmetro {nome} deve estar no formato AAAA-MM-DD')
+
+def _contar_periodos(inicio, fim, granularidade):
+    if granularidade == 'dia':
+        return (fim - inicio).days + 1
+    if granularidade == 'semana':
+        return (fim - inicio).days // 7 + 1
+    if granularidade == 'mes':
+        return (fim.year - inicio.year) * 12 + fim.month - inicio.month + 1
+    return fim.year - inicio.year + 1
+
+def parametros_tendencias(args):
+    granularidade = args.get('granularidade', 'mes')
+    if granularidade not in GRANULARIDADES:
+        raise ValueError('Parâmetro granularidade deve ser dia, semana, mes ou ano')
+    truncar, _, _, inicio_padrao = GRANULARIDADES[granularidade]
+
+    fim = _ler_data(args['data_fim'], 'data_fim') if 'data_fim' in args else date.today()
+    inicio = _ler_data(args['data_inicio'], 'data_inicio') if 'data_inicio' in args else truncar(inicio_padrao(fim))
+    if inicio > fim:
+        raise ValueError('data_inicio deve ser anterior a data_fim')
+    if _contar_periodos(truncar(inicio), fim, granularidade) > LIMITE_PERIODOS:
+        raise ValueError(f'Intervalo muito longo: no máximo {LIMITE_PERIODOS} períodos por consulta')
+
+    janela = args.get('janela', JANELA_PADRAO, type=int)
+    if janela < 1:
+        raise ValueError('Parâmetro janela deve ser maior que zero')
+
+    return inicio, fim, granularidade, janela
+
+def consulta_tendencias(user_id, inicio, fim, granularidade, janela):
+    # Uma única consulta: calendário recursivo dos períodos (inclusive os
+    # vazios), totais do resumo diário por período e funções de janela
+    # para saldo acumulado e médias móveis
+    truncar, passo, periodo_da_data, _ = GRANULARIDADES[granularidade]
+    fim_exclusivo = fim + timedelta(days=1)
+
+    calendario = select(literal(truncar(inicio).isoformat()).label('periodo')).cte('calendario', recursive=True)
+    calendario = calendario.union_all(
+        select(func.date(calendario.c.periodo, passo)).where(func.date(calendario.c.periodo, passo) < fim_exclusivo.isoformat())
+    )
+
+    periodo = periodo_da_data(ResumoDiario.data)
+    totais = select(
+        periodo.label('periodo'),
+        func.sum(case((ResumoDiario.tipo == 'receita', ResumoDiario.total), else_=0)).label('receitas'),
+        func.sum(case((ResumoDiario.tipo == 'despesa', ResumoDiario.total), else_=0)).label('despesas')
+    ).where(
+        ResumoDiario.id_usuario == user_id,
+        ResumoDiario.data >= inicio,
+        ResumoDiario.data < fim_exclusivo
+    ).group_by(periodo).cte('totais')
+
+    saldo_inicial = select(func.coalesce(func.sum(
+        case((ResumoDiario.tipo == 'receita', ResumoDiario.total), else_=-ResumoDiario.total)
+    ), 0)).where(
+        ResumoDiario.id_usuario == user_id,
+        ResumoDiario.data < inicio
+    ).scalar_subquery()
+
+    receitas = func.coalesce(totais.c.receitas, 0)
+    despesas = func.coalesce(totais.c.despesas, 0)
+    saldo = receitas - despesas
+    ordem = calendario.c.periodo
+    movel = (-(janela - 1), 0)
+
+    return select(
+        calendario.c.periodo,
+        receitas.label('receitas'),
+        despesas.label('despesas'),
+        saldo.label('saldo'),
+        (saldo_inicial + func.sum(saldo).over(order_by=ordem, rows=(None, 0))).label('saldo_acumulado'),
+        func.avg(receitas).over(order_by=ordem, rows=movel).label('media_receitas'),
+        func.avg(despesas).over(order_by=ordem, rows=movel).label('media_despesas'),
+        func.avg(saldo).over(order_by=ordem, rows=movel).label('media_saldo'),
+        saldo_inicial.label('saldo_inicial')
+    ).select_from(
+        calendario.outerjoin(totais, totais.c.periodo == calendario.c.periodo)
+    ).order_by(ordem)
+
+def montar_tendencias(linhas, inicio, fim, granularidade, janela):
+    campos = ('receitas', 'despesas', 'saldo', 'saldo_acumulado', 'media_receitas', 'media_despesas', 'media_saldo')
+    return {
+        'granularidade': granularidade,
+        'data_inicio': inicio.isoformat(),
+        'data_fim': fim.isoformat(),
+        'janela': janela,
+        'saldo_inicial': round(float(linhas[0].saldo_inicial), 2) if linhas else 0.0,
+        'serie': [
+            {'periodo': linha.periodo, **{campo: round(float(getattr(linha, campo)), 2) for campo in campos}}
+            for linha in linhas
+        ]
+    }
+
+@tendencias_bp.route('/tendencias/<int:user_id>', methods=['GET'])
+@cross_origin()
+@cache.em_cache('tendencias')
+def get_tendencias(user_id):
+    try:
+        inicio, fim, granularidade, janela = parametros_tendencias(request.args)
+        linhas = sessao_leitura().execute(consulta_tendencias(user_id, inicio, fim, granularidade, janela)).all()
+        return jsonify(montar_tendencias(linhas, inicio, fim, granularidade, janela)), 200
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
@@ -1,17 +1,217 @@
 from flask import Blueprint, jsonify, request
 from flask_cors import cross_origin
-from src.models.user import Transacao, Usuario, db
-from datetime import datetime, date
-from sqlalchemy import func, extract
+from src.models.user import Transacao, Recorrencia, ResumoMensal, ResumoDiario, db
+from src.utils import resumo, cache, regras_missoes, previsao, serializacao, busca, ocorrencias
+from src.utils.armazenamento import sessao_leitura
+from src.utils.periodo import intervalo
+from datetime import datetime, date, timedelta
+from sqlalchemy import func, and_, or_, select, union_all, null, extract
+import base64
+import json
 
 transacao_bp = Blueprint('transacao', __name__)
 
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 500
+
+def _codificar_cursor(transacao):
+    # Ocorrência de recorrência (id nulo): a chave leva o id_recorrencia
+    chave = [transacao['data_transacao'].isoformat(), transacao['id']]
+    if transacao['id'] is None:
+        chave.append(transacao['id_recorrencia'])
+    chave = json.dumps(chave)
+    return base64.urlsafe_b64encode(chave.encode()).decode().rstrip('=')
+
+def _decodificar_cursor(cursor):
+    try:
+        preenchimento = '=' * (-len(cursor) % 4)
+        data_cursor, id_cursor, *recorrencia = json.loads(base64.urlsafe_b64decode(cursor + preenchimento))
+        data_cursor = datetime.strptime(data_cursor, '%Y-%m-%d').date()
+        if id_cursor is None:
+            return data_cursor, None, int(recorrencia[0])
+        return data_cursor, int(id_cursor), None
+    except (ValueError, TypeError, IndexError):
+        raise ValueError('Cursor inválido')
+
+def _ler_data(valor, nome):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Parâmetro {nome} deve estar no formato AAAA-MM-DD')
+
+def _periodo_listagem(args):
+    # Intervalo [inicio, fim) pedido, None quando aberto de um dos lados
+    inicio = fim = None
+    
+    mes = args.get('mes', type=int)
+    ano = args.get('ano', type=int)
+    if mes is not None and ano is None:
+        raise ValueError('Parâmetro mes exige ano')
+    if mes is not None and not 1 <= mes <= 12:
+        raise ValueError('Parâmetro mes deve estar entre 1 e 12')
+    if ano is not None:
+        inicio, fim = intervalo(ano=ano, mes=mes)
+    
+    # Intervalo de datas com data_fim inclusiva
+    if 'data_inicio' in args:
+        data_inicio = _ler_data(args['data_inicio'], 'data_inicio')
+        inicio = max(inicio, data_inicio) if inicio else data_inicio
+    if 'data_fim' in args:
+        data_fim = _ler_data(args['data_fim'], 'data_fim') + timedelta(days=1)
+        fim = min(fim, data_fim) if fim else data_fim
+    
+    return inicio, fim
+
+def _filtros_listagem(user_id, args, colunas=Transacao):
+    # colunas: o modelo Transacao ou as colunas das ocorrências expandidas
+    filtros = [colunas.id_usuario == user_id]
+    
+    inicio, fim = _periodo_listagem(args)
+    if inicio is not None:
+        filtros.append(colunas.data_transacao >= inicio)
+    if fim is not None:
+        filtros.append(colunas.data_transacao < fim)
+    
+    if 'tipo' in args:
+        filtros.append(colunas.tipo == args['tipo'])
+    if 'categoria' in args:
+        filtros.append(colunas.categoria == args['categoria'])
+    
+    return filtros
+
+def _filtros_cursor(expandidas, data_cursor, id_cursor, recorrencia_cursor):
+    # Ordem da página: data desc; no mesmo dia as transações gravadas (id
+    # desc) antes das ocorrências (id_recorrencia desc)
+    if id_cursor is not None:
+        return (
+            or_(Transacao.data_transacao < data_cursor,
+                and_(Transacao.data_transacao == data_cursor, Transacao.id < id_cursor)),
+            expandidas.data_transacao <= data_cursor,
+        )
+    return (
+        Transacao.data_transacao < data_cursor,
+        or_(expandidas.data_transacao < data_cursor,
+            and_(expandidas.data_transacao == data_cursor, expandidas.id_recorrencia < recorrencia_cursor)),
+    )
+
+def consulta_listagem(user_id, args):
+    # Compartilhada entre a rota WSGI e o modo ASGI
+    filtros = _filtros_listagem(user_id, args)
+    
+    limite = args.get('limit', LIMITE_PADRAO, type=int)
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    
+    # Ocorrências das recorrências só dentro do período pedido (e até o
+    # cursor), com os mesmos filtros das transações gravadas
+    inicio, fim = _periodo_listagem(args)
+    cursor = None
+    if args.get('cursor'):
+        cursor = _decodificar_cursor(args['cursor'])
+        fim = min(fim, cursor[0] + timedelta(days=1)) if fim else cursor[0] + timedelta(days=1)
+    expandidas = ocorrencias.expandir(inicio, fim, Recorrencia.id_usuario == user_id)
+    filtros_ocorrencias = _filtros_listagem(user_id, args, expandidas.c)
+    
+    # Paginação por chave, sem OFFSET; cada lado do UNION ALL já chega
+    # ordenado e limitado à página
+    if cursor:
+        filtro_gravadas, filtro_ocorrencias = _filtros_cursor(expandidas.c, *cursor)
+        filtros.append(filtro_gravadas)
+        filtros_ocorrencias.append(filtro_ocorrencias)
+    
+    gravadas = select(
+        *serializacao.colunas(Transacao),
+        null().label('id_recorrencia'),
+        null().label('ocorrencia')
+    ).where(*filtros).order_by(
+        Transacao.data_transacao.desc(),
+        Transacao.id.desc()
+    ).limit(limite + 1).subquery('gravadas')
+    recorrentes = select(*ocorrencias.na_listagem(expandidas)).where(*filtros_ocorrencias).order_by(
+        expandidas.c.data_transacao.desc(),
+        expandidas.c.id_recorrencia.desc()
+    ).limit(limite + 1).subquery('recorrentes')
+    
+    # id nulo (ocorrências) fica depois dos ids no DESC do SQLite
+    pagina = union_all(select(gravadas), select(recorrentes)).subquery('pagina')
+    consulta = select(pagina).order_by(
+        pagina.c.data_transacao.desc(),
+        pagina.c.id.desc(),
+        pagina.c.id_recorrencia.desc()
+    ).limit(limite + 1)
+    
+    return consulta, limite
+
+def pagina_listagem(transacoes, limite):
+    # transacoes: dicts de serializacao.linhas()
+    proximo_cursor = None
+    if len(transacoes) > limite:
+        transacoes = transacoes[:limite]
+        proximo_cursor = _codificar_cursor(transacoes[-1])
+    
+    return {
+        'transacoes': transacoes,
+        'proximo_cursor': proximo_cursor
+    }
+
+def consulta_busca(user_id, args):
+    # Mesmos filtros da listagem. O bm25 custa por linha encontrada, então só
+    # as JANELA_RANKING correspondências mais recentes (o índice entrega em
+    # ordem de rowid sem ordenar) são ranqueadas; a paginação é por número
+    # de página porque o rank não serve de chave estável
+    filtros = _filtros_listagem(user_id, args)
+    filtros.append(busca.correspondencia(args.get('q', ''), user_id))
+    
+    limite = args.get('limit', LIMITE_PADRAO, type=int)
+    limite = max(1, min(limite, LIMITE_MAXIMO))
+    pagina = args.get('pagina', 1, type=int)
+    if pagina < 1:
+        raise ValueError('Parâmetro pagina deve ser maior que zero')
+    
+    candidatas = select(
+        busca.indice.c.rowid.label('id'),
+        busca.indice.c.rank.label('rank')
+    ).select_from(
+        busca.indice.join(Transacao, Transacao.id == busca.indice.c.rowid)
+    ).where(*filtros).order_by(
+        busca.indice.c.rowid.desc()
+    ).limit(busca.JANELA_RANKING).subquery('candidatas')
+    
+    consulta = select(*serializacao.colunas(Transacao)).join_from(
+        candidatas, Transacao, Transacao.id == candidatas.c.id
+    ).order_by(
+        candidatas.c.rank,
+        Transacao.id.desc()
+    ).limit(limite + 1).offset((pagina - 1) * limite)
+    
+    return consulta, limite, pagina
+
 @transacao_bp.route('/transacoes/<int:user_id>', methods=['GET'])
 @cross_origin()
 def get_transacoes(user_id):
     try:
-        transacoes = Transacao.query.filter_by(id_usuario=user_id).order_by(Transacao.data_transacao.desc()).all()
-        return jsonify([transacao.to_dict() for transacao in transacoes]), 200
+        consulta, limite = consulta_listagem(user_id, request.args)
+        transacoes = serializacao.executar(sessao_leitura(), Transacao, consulta)
+        
+        return serializacao.resposta(pagina_listagem(transacoes, limite))
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
+    except Exception as e:
+        return jsonify({'erro': str(e)}), 500
+
+@transacao_bp.route('/transacoes/busca/<int:user_id>', methods=['GET'])
+@cross_origin()
+def buscar_transacoes(user_id):
+    try:
+        consulta, limite, pagina = consulta_busca(user_id, request.args)
+        transacoes = serializacao.executar(sessao_leitura(), Transacao, consulta)
+        
+        return serializacao.resposta({
+            'transacoes': transacoes[:limite],
+            'pagina': pagina,
+            'proxima_pagina': pagina + 1 if len(transacoes) > limite else None
+        })
+    except ValueError as e:
+        return jsonify({'erro': str(e)}), 400
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
@@ -31,11 +231,15 @@ def criar_transacao():
         )
         
         db.session.add(transacao)
+        resumo.adicionar(transacao)
+        concluidas = regras_missoes.avaliar(transacao.id_usuario, transacao.data_transacao)
         db.session.commit()
+        cache.invalidar(transacao.id_usuario)
         
         return jsonify({
             'mensagem': 'Transação criada com sucesso',
-            'transacao': transacao.to_dict()
+            'transacao': transacao.to_dict(),
+            'missoes_concluidas': [missao.to_dict() for missao in concluidas]
         }), 201
         
     except Exception as e:
@@ -49,6 +253,10 @@ def atualizar_transacao(transacao_id):
         transacao = Transacao.query.get_or_404(transacao_id)
         data = request.json
         
+        # Retirar os valores antigos do resumo antes de aplicar a alteração
+        resumo.remover(transacao)
+        data_anterior = transacao.data_transacao
+        
         transacao.tipo = data.get('tipo', transacao.tipo)
         transacao.valor = data.get('valor', transacao.valor)
         transacao.categoria = data.get('categoria', transacao.categoria)
@@ -57,11 +265,15 @@ def atualizar_transacao(transacao_id):
         if 'data_transacao' in data:
             transacao.data_transacao = datetime.strptime(data['data_transacao'], '%Y-%m-%d').date()
         
+        resumo.adicionar(transacao)
+        concluidas = regras_missoes.avaliar(transacao.id_usuario, data_anterior, transacao.data_transacao)
         db.session.commit()
+        cache.invalidar(transacao.id_usuario)
         
         return jsonify({
             'mensagem': 'Transação atualizada com sucesso',
-            'transacao': transacao.to_dict()
+            'transacao': transacao.to_dict(),
+            'missoes_concluidas': [missao.to_dict() for missao in concluidas]
         }), 200
         
     except Exception as e:
@@ -73,8 +285,12 @@ def atualizar_transacao(transacao_id):
 def deletar_transacao(transacao_id):
     try:
         transacao = Transacao.query.get_or_404(transacao_id)
+        user_id = transacao.id_usuario
+        resumo.remover(transacao)
         db.session.delete(transacao)
+        regras_missoes.avaliar(user_id, transacao.data_transacao)
         db.session.commit()
+        cache.invalidar(user_id)
         
         return jsonify({'mensagem': 'Transação deletada com sucesso'}), 200
         
@@ -84,6 +300,7 @@ def deletar_transacao(transacao_id):
 
 @transacao_bp.route('/dashboard/<int:user_id>', methods=['GET'])
 @cross_origin()
+@cache.em_cache('dashboard')
 def get_dashboard(user_id):
     try:
         hoje = date.today()
@@ -91,66 +308,91 @@ def get_dashboard(user_id):
         ano_atual = hoje.year
         
         # Calcular totais do mês atual
-        receitas = db.session.query(func.sum(Transacao.valor)).filter(
-            Transacao.id_usuario == user_id,
-            Transacao.tipo == 'receita',
-            extract('month', Transacao.data_transacao) == mes_atual,
-            extract('year', Transacao.data_transacao) == ano_atual
-        ).scalar() or 0
-        
-        despesas = db.session.query(func.sum(Transacao.valor)).filter(
-            Transacao.id_usuario == user_id,
-            Transacao.tipo == 'despesa',
-            extract('month', Transacao.data_transacao) == mes_atual,
-            extract('year', Transacao.data_transacao) == ano_atual
-        ).scalar() or 0
+        receitas, despesas = resumo.totais_mes(user_id, ano_atual, mes_atual, sessao_leitura())
         
         saldo_atual = float(receitas) - float(despesas)
         
+        # Previsão de fim de mês já calculada pelo job em lote
+        previsao_mes = sessao_leitura().execute(previsao.consulta_previsao(user_id, ano_atual, mes_atual)).scalar()
+        
         return jsonify({
             'saldo_atual': saldo_atual,
             'total_receita': float(receitas),
             'total_despesa': float(despesas),
             'mes': mes_atual,
-            'ano': ano_atual
+            'ano': ano_atual,
+            'previsao': previsao_mes.to_dict() if previsao_mes else None
         }), 200
         
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
 
+def consultas_relatorio(user_id):
+    hoje = date.today()
+    inicio = hoje - timedelta(days=29)
+    
+    # Relatório por categoria (últimos 30 dias), com as ocorrências do período
+    recentes = ocorrencias.expandir(inicio, None, Recorrencia.id_usuario == user_id, Recorrencia.tipo == 'despesa')
+    despesas = union_all(
+        select(ResumoDiario.categoria, ResumoDiario.total).where(
+            ResumoDiario.id_usuario == user_id,
+            ResumoDiario.tipo == 'despesa',
+            ResumoDiario.data > hoje - timedelta(days=30)
+        ),
+        select(recentes.c.categoria, recentes.c.valor)
+    ).subquery('despesas')
+    categorias = select(
+        despesas.c.categoria,
+        func.sum(despesas.c.total).label('total')
+    ).group_by(despesas.c.categoria)
+    
+    # Relatório mensal (últimos 6 meses, do mais antigo ao mais recente)
+    todas = ocorrencias.expandir(None, None, Recorrencia.id_usuario == user_id, Recorrencia.tipo == 'despesa')
+    meses = union_all(
+        select(ResumoMensal.mes, ResumoMensal.ano, ResumoMensal.total).where(
+            ResumoMensal.id_usuario == user_id,
+            ResumoMensal.tipo == 'despesa'
+        ),
+        select(
+            extract('month', todas.c.data_transacao),
+            extract('year', todas.c.data_transacao),
+            todas.c.valor
+        )
+    ).subquery('meses')
+    ultimos_meses = select(
+        meses.c.mes,
+        meses.c.ano,
+        func.sum(meses.c.total).label('total')
+    ).group_by(
+        meses.c.mes,
+        meses.c.ano
+    ).order_by(
+        meses.c.ano.desc(),
+        meses.c.mes.desc()
+    ).limit(6).subquery()
+    
+    relatorio_mensal = select(ultimos_meses).order_by(ultimos_meses.c.ano, ultimos_meses.c.mes)
+    
+    return categorias, relatorio_mensal
+
+def montar_relatorio(categorias, relatorio_mensal):
+    return {
+        'por_categoria': [{'categoria': cat.categoria, 'total': float(cat.total)} for cat in categorias],
+        'mensal': [{'mes': rel.mes, 'ano': rel.ano, 'total': float(rel.total)} for rel in relatorio_mensal]
+    }
+
 @transacao_bp.route('/relatorios/<int:user_id>', methods=['GET'])
 @cross_origin()
+@cache.em_cache('relatorios')
 def get_relatorios(user_id):
     try:
-        # Relatório por categoria (últimos 30 dias)
-        categorias = db.session.query(
-            Transacao.categoria,
-            func.sum(Transacao.valor).label('total')
-        ).filter(
-            Transacao.id_usuario == user_id,
-            Transacao.tipo == 'despesa'
-        ).group_by(Transacao.categoria).all()
-        
-        # Relatório mensal (últimos 6 meses)
-        relatorio_mensal = db.session.query(
-            extract('month', Transacao.data_transacao).label('mes'),
-            extract('year', Transacao.data_transacao).label('ano'),
-            func.sum(Transacao.valor).label('total')
-        ).filter(
-            Transacao.id_usuario == user_id,
-            Transacao.tipo == 'despesa'
-        ).group_by(
-            extract('month', Transacao.data_transacao),
-            extract('year', Transacao.data_transacao)
-        ).order_by(
-            extract('year', Transacao.data_transacao),
-            extract('month', Transacao.data_transacao)
-        ).limit(6).all()
+        sessao = sessao_leitura()
+        consulta_categorias, consulta_mensal = consultas_relatorio(user_id)
         
-        return jsonify({
-            'por_categoria': [{'categoria': cat.categoria, 'total': float(cat.total)} for cat in categorias],
-            'mensal': [{'mes': rel.mes, 'ano': rel.ano, 'total': float(rel.total)} for rel in relatorio_mensal]
-        }), 200
+        categorias = sessao.execute(consulta_categorias).all()
+        relatorio_mensal = sessao.execute(consulta_mensal).all()
+        
+        return jsonify(montar_relatorio(categorias, relatorio_mensal)), 200
         
     except Exception as e:
         return jsonify({'erro': str(e)}), 500
@@ -1,8 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from src.utils import senhas
+from src.utils.shards import SessaoParticionada
 from datetime import datetime
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessaoParticionada})
 
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
@@ -16,15 +17,20 @@ class Usuario(db.Model):
     
     # Relacionamentos
     transacoes = db.relationship('Transacao', backref='usuario', lazy=True, cascade='all, delete-orphan')
+    recorrencias = db.relationship('Recorrencia', backref='usuario', lazy=True, cascade='all, delete-orphan')
     metas = db.relationship('Meta', backref='usuario', lazy=True, cascade='all, delete-orphan')
     missoes = db.relationship('Missao', backref='usuario', lazy=True, cascade='all, delete-orphan')
     configuracao = db.relationship('Configuracao', backref='usuario', uselist=False, cascade='all, delete-orphan')
+    resumos = db.relationship('ResumoMensal', backref='usuario', lazy=True, cascade='all, delete-orphan')
 
     def set_senha(self, senha):
-        self.senha_hash = generate_password_hash(senha)
+        self.senha_hash = senhas.gerar_hash(senha)
 
     def check_senha(self, senha):
-        return check_password_hash(self.senha_hash, senha)
+        return senhas.verificar(self.senha_hash, senha)
+
+    def precisa_rehash(self):
+        return senhas.precisa_rehash(self.senha_hash)
 
     def to_dict(self):
         return {
@@ -47,6 +53,12 @@ class Transacao(db.Model):
     descricao = db.Column(db.Text)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_transacoes_usuario_data', 'id_usuario', 'data_transacao'),
+        db.Index('idx_transacoes_categoria', 'categoria'),
+        {'sqlite_autoincrement': True},
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -59,6 +71,43 @@ class Transacao(db.Model):
             'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None
         }
 
+class Recorrencia(db.Model):
+    __tablename__ = 'recorrencias'
+
+    # Regra de transação recorrente: as ocorrências não são gravadas em
+    # transacoes, são expandidas nas consultas (src.utils.ocorrencias)
+    id = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    tipo = db.Column(db.String(10), nullable=False)  # 'receita' ou 'despesa'
+    valor = db.Column(db.Numeric(10, 2), nullable=False)
+    categoria = db.Column(db.String(50), nullable=False)
+    descricao = db.Column(db.Text)
+    frequencia = db.Column(db.String(10), nullable=False)  # 'semanal', 'mensal' ou 'anual'
+    data_inicio = db.Column(db.Date, nullable=False)  # primeira ocorrência; define o dia das seguintes
+    data_fim = db.Column(db.Date)  # inclusiva; nula = sem fim
+    data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
+    data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_recorrencias_usuario', 'id_usuario', 'data_inicio'),
+        {'sqlite_autoincrement': True},
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'id_usuario': self.id_usuario,
+            'tipo': self.tipo,
+            'valor': float(self.valor),
+            'categoria': self.categoria,
+            'descricao': self.descricao,
+            'frequencia': self.frequencia,
+            'data_inicio': self.data_inicio.isoformat() if self.data_inicio else None,
+            'data_fim': self.data_fim.isoformat() if self.data_fim else None,
+            'data_criacao': self.data_criacao.isoformat() if self.data_criacao else None,
+            'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
+        }
+
 class Meta(db.Model):
     __tablename__ = 'metas'
     
@@ -71,7 +120,11 @@ class Meta(db.Model):
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint('id_usuario', 'mes', 'ano'),)
+    __table_args__ = (
+        db.UniqueConstraint('id_usuario', 'mes', 'ano'),
+        db.Index('idx_metas_usuario_periodo', 'id_usuario', 'ano', 'mes'),
+        {'sqlite_autoincrement': True},
+    )
 
     def to_dict(self):
         return {
@@ -99,6 +152,13 @@ class Missao(db.Model):
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     data_conclusao = db.Column(db.DateTime)
 
+    __table_args__ = (
+        db.Index('idx_missoes_usuario_status', 'id_usuario', 'status'),
+        db.Index('idx_missoes_usuario_inicio', 'id_usuario', 'data_inicio'),
+        db.Index('idx_missoes_status_fim', 'status', 'data_fim'),
+        {'sqlite_autoincrement': True},
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -126,6 +186,8 @@ class Configuracao(db.Model):
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow)
     data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = ({'sqlite_autoincrement': True},)
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -139,3 +201,103 @@ class Configuracao(db.Model):
             'data_atualizacao': self.data_atualizacao.isoformat() if self.data_atualizacao else None
         }
 
+
+class ResumoMensal(db.Model):
+    __tablename__ = 'resumos_mensais'
+
+    id = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    tipo = db.Column(db.String(10), nullable=False)  # 'receita' ou 'despesa'
+    categoria = db.Column(db.String(50), nullable=False)
+    total = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('id_usuario', 'ano', 'mes', 'tipo', 'categoria'),)
+
+    def to_dict(self):
+        return {
+            'id_usuario': self.id_usuario,
+            'ano': self.ano,
+            'mes': self.mes,
+            'tipo': self.tipo,
+            'categoria': self.categoria,
+            'total': float(self.total),
+            'quantidade': self.quantidade
+        }
+
+class ResumoDiario(db.Model):
+    __tablename__ = 'resumos_diarios'
+
+    id = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    data = db.Column(db.Date, nullable=False)
+    tipo = db.Column(db.String(10), nullable=False)  # 'receita' ou 'despesa'
+    categoria = db.Column(db.String(50), nullable=False)
+    total = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('id_usuario', 'data', 'tipo', 'categoria'),)
+
+    def to_dict(self):
+        return {
+            'id_usuario': self.id_usuario,
+            'data': self.data.isoformat() if self.data else None,
+            'tipo': self.tipo,
+            'categoria': self.categoria,
+            'total': float(self.total),
+            'quantidade': self.quantidade
+        }
+
+class Previsao(db.Model):
+    __tablename__ = 'previsoes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    ano = db.Column(db.Integer, nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    economia_atual = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    economia_prevista = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    desvio = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    probabilidade_meta = db.Column(db.Numeric(5, 4))  # nula quando não há meta no mês
+    data_calculo = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('id_usuario', 'ano', 'mes'),)
+
+    def to_dict(self):
+        return {
+            'ano': self.ano,
+            'mes': self.mes,
+            'economia_atual': float(self.economia_atual),
+            'economia_prevista': float(self.economia_prevista),
+            'desvio': float(self.desvio),
+            'probabilidade_meta': float(self.probabilidade_meta) if self.probabilidade_meta is not None else None,
+            'data_calculo': self.data_calculo.isoformat() if self.data_calculo else None
+        }
+
+class Alteracao(db.Model):
+    __tablename__ = 'alteracoes'
+
+    # id é a sequência de sincronização: cresce a cada escrita e nunca é reutilizado
+    id = db.Column(db.Integer, primary_key=True)
+    id_usuario = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    entidade = db.Column(db.String(20), nullable=False)  # 'transacao', 'meta', 'missao', 'configuracao', 'recorrencia'
+    id_registro = db.Column(db.Integer, nullable=False)
+    operacao = db.Column(db.String(10), nullable=False)  # 'upsert' ou 'delete'
+    data_alteracao = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_alteracoes_usuario_seq', 'id_usuario', 'id'),
+        {'sqlite_autoincrement': True},
+    )
+
+    def to_dict(self):
+        return {
+            'seq': self.id,
+            'id_usuario': self.id_usuario,
+            'entidade': self.entidade,
+            'id_registro': self.id_registro,
+            'operacao': self.operacao,
+            'data_alteracao': self.data_alteracao.isoformat() if self.data_alteracao else None
+        }